@@ -0,0 +1,168 @@
+"""
+Zero-downtime data reloads.
+
+A reload builds a new database snapshot (a DuckDB file with the views) next to the
+live one, opens a pool on it and warms it: every view is scanned once so Parquet
+footers are in the page cache, and the player index, column catalog, template context and
+rollup router are rebuilt from it. Only then is it swapped in as the shared pool.
+Queries and streams already running finish on the old snapshot, which is closed
+and deleted once its last cursor is returned.
+
+Reloads are started by `POST /admin/reload` or by a watcher that polls the Parquet
+files and reloads once a change has settled.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from db.duckdb_init import SNAPSHOT_DIR, build_snapshot, data_version
+from etl.rollups import refresh as refresh_rollups
+from .db_handler import open_pool, result_cache, swap_pool
+from .warmup import scan_views
+
+# --- Reload Configuration ---
+# Seconds between checks of the Parquet files for changes; 0 turns the watcher off
+RELOAD_WATCH_INTERVAL = float(os.getenv("RELOAD_WATCH_INTERVAL", "30"))
+# Rebuild stale rollup days before building the snapshot
+RELOAD_REFRESH_ROLLUPS = os.getenv("RELOAD_REFRESH_ROLLUPS", "1") == "1"
+# Token for the admin endpoints (X-Admin-Token header); they are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class ReloadInProgress(Exception):
+    """Raised when a reload is requested while another one is running."""
+
+
+def _remove_snapshot(path: Path):
+    # The database file opened at startup is rebuilt by start.sh; only reload snapshots are ours to delete
+    if path.parent != SNAPSHOT_DIR:
+        return
+    for file in (path, path.with_suffix(".duckdb.wal")):
+        try:
+            file.unlink(missing_ok=True)
+        except OSError as e:
+            logging.warning(f"Could not delete old snapshot {file}: {e}")
+    logging.info(f"Old snapshot {path.name} closed and deleted.")
+
+
+class DataReloader:
+    """Builds, warms and swaps in database snapshots, one reload at a time."""
+
+    def __init__(self, loaders: list[tuple[Callable, str]] = ()):
+        """
+        Args:
+            loaders: (function, warning) pairs. Each function is called with a cursor on the
+                new snapshot before it goes live; the warning is logged if it fails.
+        """
+        self.loaders = list(loaders)
+        self.version = data_version()
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.failures = 0
+        self.last: dict = {}
+
+    def _warm(self, con) -> dict[str, float]:
+        """Scans every view once and runs the loaders. Returns seconds per view."""
+        timings = scan_views(con)
+        for loader, warning in self.loaders:
+            try:
+                loader(con)
+            except Exception as e:
+                logging.warning(f"{warning}: {e}")
+        return timings
+
+    def reload(self, reason: str = "admin") -> dict:
+        """
+        Builds a snapshot of the current Parquet files and swaps it in. Blocking.
+
+        Returns:
+            The new data version, snapshot path and timings.
+
+        Raises:
+            ReloadInProgress: If another reload is running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("A reload is already running.")
+        started = time.perf_counter()
+        try:
+            rebuilt_days = refresh_rollups() if RELOAD_REFRESH_ROLLUPS else 0
+            version = data_version()
+            snapshot = build_snapshot()
+            pool = None
+            try:
+                pool = open_pool(snapshot)
+                warm_started = time.perf_counter()
+                with pool.cursor() as con:
+                    view_seconds = self._warm(con)
+                warm_seconds = time.perf_counter() - warm_started
+            except Exception:
+                if pool is not None:
+                    pool.close()
+                _remove_snapshot(snapshot)
+                raise
+
+            old = swap_pool(pool)
+            result_cache.expire_version()
+            if old is not None:
+                old.retire(pool, on_close=lambda path=old.db_file: _remove_snapshot(path))
+            self.version = version
+            self.reloads += 1
+            self.last = {
+                "reason": reason,
+                "version": version,
+                "snapshot": snapshot.name,
+                "rollup_days_rebuilt": rebuilt_days,
+                "views": view_seconds,
+                "warm_seconds": round(warm_seconds, 3),
+                "seconds": round(time.perf_counter() - started, 3),
+                "finished_at": time.time(),
+            }
+            logging.info(f"Reloaded data ({reason}): version {version}, snapshot {snapshot.name}, "
+                         f"{self.last['seconds']:.2f}s including {warm_seconds:.2f}s of warm-up.")
+            return self.last
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"Data reload ({reason}) failed; still serving the previous snapshot: {e}")
+            raise
+        finally:
+            self._lock.release()
+
+    async def watch(self, interval: float = RELOAD_WATCH_INTERVAL):
+        """
+        Polls the Parquet files every `interval` seconds and reloads once a new data version
+        has been seen unchanged on two polls in a row, so a batch of files being written is
+        picked up as a whole.
+        """
+        pending = None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                version = await asyncio.to_thread(data_version)
+            except Exception as e:
+                logging.warning(f"Could not check the data version: {e}")
+                continue
+            if version == self.version:
+                pending = None
+            elif version != pending:
+                pending = version
+            else:
+                pending = None
+                try:
+                    await asyncio.to_thread(self.reload, "watch")
+                except Exception:
+                    pass  # Another reload is running, or this one failed (and was logged); tried again two polls later
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_reload_seconds": self.last.get("seconds", 0),
+            "last": self.last,
+        }
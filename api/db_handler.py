@@ -1,18 +1,357 @@
+import asyncio
 import duckdb
+import functools
+import io
+import itertools
+import json
+import shutil
+import tempfile
+import time
+import pyarrow as pa
 from pathlib import Path
-import pandas as pd
 import logging
-import numpy as np
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterator
+from db.duckdb_init import DB_FILE
+from .metrics import slow_query_log
+from .result_cache import ResultCache
 
-# --- USE ABSOLUTE PATHS ---
-PROJECT_ROOT = Path(__file__).parent.parent
-DB_FILE = PROJECT_ROOT / "data" / "mlb.duckdb"
+# --- Connection Pool Configuration ---
+POOL_SIZE = int(os.getenv("DUCKDB_POOL_SIZE", "4"))
+POOL_TIMEOUT_SECONDS = float(os.getenv("DUCKDB_POOL_TIMEOUT", "30"))
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", str(os.cpu_count() or 1)))
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "1GB")
+# DuckDB's Parquet metadata cache. With one file per game date, DuckDB 0.10 re-checks every cached
+# footer for every column when it plans a query, which costs more than reading the footers again.
+DUCKDB_OBJECT_CACHE = os.getenv("DUCKDB_OBJECT_CACHE", "0") == "1"
+# Queries still running after this many seconds are interrupted
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT", "30"))
+# Queries running at least this long go to the slow-query log with their DuckDB profile; 0 turns profiling off
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "1"))
+# Rows per batch when streaming results
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "10000"))
+# A stream has QUERY_TIMEOUT to produce its first batch. Sending the rest, which includes waiting on
+# a slow client, may take up to this many seconds in all; 0 means no limit.
+STREAM_TIMEOUT_SECONDS = float(os.getenv("STREAM_TIMEOUT", "0"))
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+class QueryTimeout(Exception):
+    """The query ran past its deadline and was interrupted."""
+
+
+@contextmanager
+def deadline(con: duckdb.DuckDBPyConnection, seconds: float | None = QUERY_TIMEOUT_SECONDS):
+    """
+    Interrupts the query running on `con` if the `with` block is still going after `seconds`.
+
+    Yields:
+        An event that is set once the deadline has interrupted the query, for callers that
+        handle the interruption inside the block.
+
+    Raises:
+        QueryTimeout: If the query was interrupted by the deadline.
+    """
+    fired = threading.Event()
+    if not seconds:
+        yield fired
+        return
+    lock = threading.Lock()
+    state = {"done": False}
+
+    def fire():
+        with lock:
+            # Never interrupt a cursor that has moved on to another request
+            if not state["done"]:
+                fired.set()
+                con.interrupt()
+
+    timer = threading.Timer(seconds, fire)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield fired
+    # Batches read through Arrow surface the interrupt as an Arrow error
+    except (duckdb.InterruptException, pa.ArrowException) as e:
+        if fired.is_set():
+            raise QueryTimeout(f"Query cancelled after {seconds:g}s.") from e
+        raise
+    finally:
+        with lock:
+            state["done"] = True
+        timer.cancel()
+
+
+@contextmanager
+def registered(con: duckdb.DuckDBPyConnection, tables: dict[str, pa.Table] | None):
+    """Registers Arrow tables (e.g. materialized row sets) on `con` for the duration of the `with` block."""
+    tables = tables or {}
+    for name, table in tables.items():
+        con.register(name, table)
+    try:
+        yield
+    finally:
+        for name in tables:
+            con.unregister(name)
+
+
+class ConnectionPool:
+    """
+    A long-lived, read-only DuckDB database handle with a bounded pool of cursors.
+
+    Every cursor shares the same underlying database instance, so the buffer pool
+    and catalog survive between requests. A cursor is only
+    ever used by one thread at a time.
+    """
+
+    def __init__(self, db_file: Path, size: int, threads: int, memory_limit: str, profile: bool = False):
+        self.size = size
+        self._con = duckdb.connect(
+            database=str(db_file),
+            read_only=True,
+            config={
+                "threads": threads,
+                "memory_limit": memory_limit,
+                "enable_object_cache": DUCKDB_OBJECT_CACHE,
+            },
+        )
+        self._cursors = queue.LifoQueue(maxsize=size)
+        # Each cursor writes the JSON profile of its last query to its own file
+        self._profile_dir = tempfile.mkdtemp(prefix="duckdb-profile-") if profile else None
+        self._profile_paths: dict[int, str] = {}
+        for i in range(size):
+            cur = self._con.cursor()
+            if self._profile_dir is not None:
+                path = str(Path(self._profile_dir) / f"cursor-{i}.json")
+                cur.execute("PRAGMA enable_profiling = 'json'")
+                cur.execute(f"PRAGMA profiling_output = '{path}'")
+                self._profile_paths[id(cur)] = path
+            self._cursors.put(cur)
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._closed = False
+        # Set by retire(): new checkouts go to the successor, and the pool closes once idle
+        self._successor: "ConnectionPool | None" = None
+        self._on_close: Callable[[], None] | None = None
+
+    @contextmanager
+    def cursor(self, timeout: float | None = POOL_TIMEOUT_SECONDS):
+        """
+        Checks out a cursor for the duration of the `with` block.
+
+        Raises:
+            TimeoutError: If no cursor becomes available within `timeout` seconds.
+        """
+        with self._lock:
+            successor = self._successor
+            if successor is None:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                self._in_use += 1
+        if successor is not None:
+            # Retired by a reload: callers that still hold this pool get the new snapshot
+            with successor.cursor(timeout) as cur:
+                yield cur
+            return
+        try:
+            cur = self._cursors.get(timeout=timeout)
+        except queue.Empty:
+            self._release()
+            raise TimeoutError(f"No DuckDB cursor available after {timeout}s.")
+        try:
+            yield cur
+        finally:
+            self._cursors.put(cur)
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._in_use -= 1
+            idle = self._successor is not None and self._in_use == 0
+        if idle:
+            self.close()
+
+    def retire(self, successor: "ConnectionPool", on_close: Callable[[], None] | None = None):
+        """
+        Hands new checkouts to `successor` and closes this pool as soon as the cursors
+        still checked out (queries or streams in flight) are returned.
+
+        Args:
+            successor: The pool that replaces this one.
+            on_close: Called after the pool is closed, e.g. to delete its snapshot file.
+        """
+        with self._lock:
+            self._successor = successor
+            self._on_close = on_close
+            idle = self._in_use == 0
+        if idle:
+            self.close()
+
+    def last_profile(self, cur: duckdb.DuckDBPyConnection) -> dict | None:
+        """The DuckDB profile of the last query run on `cur`, or None if profiling is off."""
+        path = self._profile_paths.get(id(cur))
+        if path is None:
+            # The cursor may have come from the successor of a retired pool
+            return self._successor.last_profile(cur) if self._successor is not None else None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read the query profile: {e}")
+            return None
+
+    def close(self):
+        """Closes every pooled cursor and the underlying database handle."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        while True:
+            try:
+                self._cursors.get_nowait().close()
+            except queue.Empty:
+                break
+        self._con.close()
+        if self._profile_dir is not None:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+        if self._on_close is not None:
+            self._on_close()
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+# Blocking DuckDB work runs here, never on the event loop. One worker per cursor,
+# so a dispatched query never queues behind the pool.
+_executor: ThreadPoolExecutor | None = None
+
+# Cached results are Arrow tables, so their exact size is known
+result_cache = ResultCache()
+
+
+def init_pool() -> ConnectionPool | None:
+    """
+    Opens the shared database handle. Called once at API startup; safe to call again.
+
+    Returns:
+        The active pool, or None if the database file does not exist.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        if not DB_FILE.exists():
+            logging.error(f"Database file not found at {DB_FILE}. Please run `python -m db.duckdb_init`.")
+            return None
+        _pool = open_pool(DB_FILE)
+        _start_executor()
+        return _pool
+
+
+def open_pool(db_file: Path) -> ConnectionPool:
+    """Opens a pool on `db_file` with the configured size, threads and memory limit."""
+    pool = ConnectionPool(db_file, POOL_SIZE, DUCKDB_THREADS, DUCKDB_MEMORY_LIMIT, profile=SLOW_QUERY_SECONDS > 0)
+    logging.info(
+        f"Opened DuckDB pool at {db_file} "
+        f"(cursors={POOL_SIZE}, threads={DUCKDB_THREADS}, memory_limit={DUCKDB_MEMORY_LIMIT})."
+    )
+    return pool
+
+
+def swap_pool(new_pool: ConnectionPool) -> ConnectionPool | None:
+    """
+    Makes `new_pool` the shared pool. Requests that start after this use it; the caller
+    retires the returned old pool so queries in flight finish on it.
+    """
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, new_pool
+        _start_executor()
+    return old
+
+
+def _start_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="duckdb")
+
+
+def close_pool():
+    """Closes the shared database handle. Called at API shutdown."""
+    global _pool, _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+            logging.info("DuckDB pool closed.")
+
+
+def _fetch_arrow(pool: ConnectionPool, sql_query: str, context: dict | None = None,
+                 tables: dict[str, pa.Table] | None = None) -> pa.Table:
+    with pool.cursor() as con, registered(con, tables), deadline(con):
+        logging.info(f"Executing query: {sql_query}")
+        start = time.perf_counter()
+        # Arrow keeps NULLs as real nulls, so no NaN clean-up pass is needed
+        table = con.execute(sql_query).arrow()
+        seconds = time.perf_counter() - start
+        if SLOW_QUERY_SECONDS and seconds >= SLOW_QUERY_SECONDS:
+            slow_query_log.record(sql_query, seconds, pool.last_profile(con), rows=table.num_rows, **(context or {}))
+        return table
+
+
+def execute_arrow(sql_query: str, context: dict | None = None, tables: dict[str, pa.Table] | None = None) -> pa.Table | None:
+    """
+    Executes a given SQL query on a cursor borrowed from the shared connection pool.
+    Results are served from the result cache while the underlying data is unchanged.
+
+    Args:
+        sql_query: The SQL query string to execute.
+        context: Extra fields (e.g. the question) for the slow-query log entry, if the query is slow.
+        tables: Arrow tables the query reads by name, registered on its cursor while it runs.
+
+    Returns:
+        The result as an Arrow table, or None if an error occurs.
+
+    Raises:
+        QueryTimeout: If the query runs longer than QUERY_TIMEOUT seconds.
+    """
+    pool = _pool or init_pool()
+    if pool is None:
+        return None
+
+    try:
+        return result_cache.get_or_compute(sql_query, lambda: _fetch_arrow(pool, sql_query, context, tables))
+
+    except QueryTimeout:
+        raise
+    except Exception as e:
+        logging.error(f"An error occurred while executing query: {e}")
+        return None
+
+
+def fetch_arrow(sql_query: str) -> pa.Table:
+    """
+    Runs a query on a pooled cursor, bypassing the result cache, e.g. for results kept
+    elsewhere. Errors propagate.
+    """
+    pool = _pool or init_pool()
+    if pool is None:
+        raise RuntimeError("Database is not available.")
+    return _fetch_arrow(pool, sql_query)
+
+
 def execute_query(sql_query: str) -> list[dict]:
     """
-    Connects to the DuckDB database and executes a given SQL query.
+    Executes a given SQL query and returns its rows.
 
     Args:
         sql_query: The SQL query string to execute.
@@ -21,27 +360,138 @@ def execute_query(sql_query: str) -> list[dict]:
         A list of dictionaries, where each dictionary represents a row.
         Returns an empty list if an error occurs or no data is found.
     """
-    if not DB_FILE.exists():
-        logging.error(f"Database file not found at {DB_FILE}. Please run `python -m db.duckdb_init`.")
-        return []
+    table = execute_arrow(sql_query)
+    return table.to_pylist() if table is not None else []
+
+
+def rows_to_json(table: pa.Table) -> bytes:
+    """
+    Encodes a result table as a JSON array of row objects using DuckDB's native
+    JSON writer, without building Python objects for each row.
+    """
+    if table.num_rows == 0:
+        return b"[]"
+    pool = _pool or init_pool()
+    with pool.cursor() as con:
+        con.register("_result", table)
+        try:
+            rows = con.execute("SELECT to_json(_result) FROM _result").arrow().column(0)
+        finally:
+            con.unregister("_result")
+    return b"[" + ",".join(rows.to_pylist()).encode("utf-8") + b"]"
+
 
-    con = None
+def open_stream(sql_query: str, fmt: str = "ndjson", batch_rows: int = STREAM_BATCH_ROWS,
+                tables: dict[str, pa.Table] | None = None) -> Iterator[bytes]:
+    """
+    Executes a query and returns an iterator over its result in encoded chunks,
+    fetching `batch_rows` rows at a time so memory stays flat regardless of result size.
+
+    The query runs and its first batch is fetched before this function returns, so errors
+    surface here rather than half-way through a response; only this part is bounded by
+    QUERY_TIMEOUT. The pooled cursor is held until the iterator is exhausted or closed, and
+    the stream is interrupted if it is still running after STREAM_TIMEOUT seconds (if set).
+    A stream that fails part-way ends with an error record, see `_iterate_batches`.
+
+    Args:
+        sql_query: The SQL query string to execute.
+        fmt: "arrow" for an Arrow IPC stream of record batches, otherwise NDJSON (one row object per line).
+        batch_rows: Rows fetched from DuckDB per chunk.
+        tables: Arrow tables the query reads by name, registered on its cursor until the stream ends.
+    """
+    pool = _pool or init_pool()
+    if pool is None:
+        raise RuntimeError("Database is not available.")
+
+    stack = ExitStack()
+    con = stack.enter_context(pool.cursor())
+    stack.enter_context(registered(con, tables))
+    timed_out = stack.enter_context(deadline(con, STREAM_TIMEOUT_SECONDS))
     try:
-        # Connect in read-only mode for safety in an API context
-        con = duckdb.connect(database=str(DB_FILE), read_only=True)
-        logging.info(f"Executing query: {sql_query}")
-        
-        results_df = con.execute(sql_query).fetchdf()
-        
-        # Replace all occurrences of NaN (which is not valid JSON) with None (which becomes null).
-        results_df_cleaned = results_df.replace({np.nan: None})
-        
-        # Convert the cleaned DataFrame to a list of dictionaries
-        return results_df_cleaned.to_dict('records')
+        logging.info(f"Streaming query ({fmt}): {sql_query}")
+        with deadline(con, QUERY_TIMEOUT_SECONDS):
+            if fmt == "arrow":
+                reader = con.execute(sql_query).fetch_record_batch(batch_rows)
+            else:
+                # DuckDB encodes each row as JSON natively
+                reader = con.execute(f"SELECT to_json(_row) FROM ({sql_query}) AS _row").fetch_record_batch(batch_rows)
+            try:
+                first = [reader.read_next_batch()]
+            except StopIteration:
+                first = []
+    except Exception:
+        stack.close()
+        raise
+    return _iterate_batches(reader, first, fmt, stack, timed_out)
 
-    except Exception as e:
-        logging.error(f"An error occurred while executing query: {e}")
-        return []
-    finally:
-        if con:
-            con.close()
\ No newline at end of file
+
+def _iterate_batches(reader: pa.RecordBatchReader, first: list[pa.RecordBatch], fmt: str,
+                     stack: ExitStack, timed_out: threading.Event) -> Iterator[bytes]:
+    """
+    Encodes the batches. If reading fails part-way, the body ends with an error record instead
+    of just stopping: an `{"error": ...}` line for NDJSON, or for Arrow an empty batch whose
+    custom metadata has an `error` key, before the end-of-stream marker.
+    """
+    def describe(e: Exception) -> str:
+        logging.error(f"Stream interrupted after {rows:,} rows: {e}")
+        if timed_out.is_set():
+            return f"The stream was cancelled after {STREAM_TIMEOUT_SECONDS:g}s."
+        return f"The stream failed: {e}"
+
+    rows = 0
+    with stack:
+        if fmt == "arrow":
+            buffer = io.BytesIO()
+            with pa.ipc.new_stream(buffer, reader.schema) as writer:
+                try:
+                    for batch in itertools.chain(first, reader):
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                except Exception as e:
+                    writer.write_batch(pa.RecordBatch.from_pylist([], schema=reader.schema),
+                                       custom_metadata={"error": describe(e)})
+            # End-of-stream marker written on close
+            yield buffer.getvalue()
+        else:
+            try:
+                for batch in itertools.chain(first, reader):
+                    if batch.num_rows:
+                        rows += batch.num_rows
+                        yield ("\n".join(batch.column(0).to_pylist()) + "\n").encode("utf-8")
+            except Exception as e:
+                yield json.dumps({"error": describe(e)}).encode("utf-8") + b"\n"
+
+
+def run_with_cursor(func, *args, tables: dict[str, pa.Table] | None = None):
+    """Calls `func(cursor, *args)` with a cursor borrowed from the shared pool, with `tables` registered on it."""
+    pool = _pool or init_pool()
+    if pool is None:
+        raise RuntimeError("Database is not available.")
+    with pool.cursor() as con, registered(con, tables):
+        return func(con, *args)
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """
+    Runs a blocking database function on the bounded DuckDB executor so the
+    event loop stays free for other requests.
+    """
+    with _pool_lock:
+        _start_executor()
+        executor = _executor
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def execute_query_async(sql_query: str) -> list[dict]:
+    """Non-blocking wrapper around `execute_query` for use inside request handlers."""
+    return await run_in_executor(execute_query, sql_query)
+
+
+async def execute_arrow_async(sql_query: str, context: dict | None = None,
+                              tables: dict[str, pa.Table] | None = None) -> pa.Table | None:
+    """Non-blocking wrapper around `execute_arrow` for use inside request handlers."""
+    return await run_in_executor(execute_arrow, sql_query, context, tables)
@@ -1,16 +1,173 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from urllib.parse import quote
+from typing import Literal
+import pyarrow as pa
+import asyncio
+import hmac
 import logging
-from .db_handler import execute_query
-from .sql_generator import nl_to_sql
+from .db_handler import (
+    execute_arrow, execute_arrow_async, fetch_arrow, run_in_executor, run_with_cursor, rows_to_json, open_stream, init_pool, close_pool,
+    result_cache, QueryTimeout,
+)
+from .data_reload import ADMIN_TOKEN, RELOAD_WATCH_INTERVAL, DataReloader, ReloadInProgress
+from .player_index import get_player_index, load_player_index
+from .prompt_builder import load_column_catalog
+from .metrics import (
+    RESPONSE_BYTES, RESULT_ROWS, SERVER_TIMING, REGISTRY, StageTimer, StatsCollector, render_metrics,
+)
+from .query_router import QueryRouter, RoutedQuery
+from .session_cache import ScopedQuery, SessionCache
+from .warmup import PLAN_STATEMENT, Warmup, load_statements, read_dimensions, run_statements, scan_views
+from .sql_guard import QueryRejected, ScanCapacityExceeded, SqlGuard
+from .pagination import MAX_PAGE_SIZE, InvalidCursorError, decode_cursor, encode_cursor, page_sql
+from .serializers import ARROW_STREAM_MEDIA_TYPE, NDJSON_MEDIA_TYPE, render_response
+from .sql_templates import load_template_context
+from .sql_generator import (
+    translate, template_stats, get_llm_client, close_llm_client, get_translation_cache, close_translation_cache,
+)
 from fastapi.middleware.cors import CORSMiddleware
 
 
+# Rewrites eligible aggregates on v_statcast to read the pre-aggregated rollups
+query_router = QueryRouter(version=result_cache.current_version)
+# Keeps the rows a conversation has filtered to, so follow-ups skip the Parquet scan
+session_cache = SessionCache(version=result_cache.current_version, execute=fetch_arrow)
+# Checks the plan of every statement before it runs
+sql_guard = SqlGuard(version=result_cache.current_version)
+
+REGISTRY.register_stats(StatsCollector(
+    "hotcorner_result_cache", "Result cache", result_cache.stats,
+    counters=("hits", "misses", "coalesced", "evictions"), gauges=("entries", "bytes", "hit_rate")))
+REGISTRY.register_stats(StatsCollector(
+    "hotcorner_translation_cache", "Translation cache", lambda: get_translation_cache().stats(),
+    counters=("memory_hits", "disk_hits", "misses"), gauges=("entries", "hit_rate")))
+REGISTRY.register_stats(StatsCollector(
+    "hotcorner_guard", "SQL guard", sql_guard.stats, counters=("checked", "rejected", "limited", "heavy", "busy")))
+REGISTRY.register_stats(StatsCollector(
+    "hotcorner_rollup", "Rollup routing", query_router.stats, counters=("routed", "not_routed", "mismatches")))
+REGISTRY.register_stats(StatsCollector(
+    "hotcorner_session_cache", "Materialized row sets", session_cache.stats,
+    counters=("hits", "misses", "materialized", "too_large", "failures", "evictions", "expired"),
+    gauges=("entries", "bytes")))
+
+
+# Derived state rebuilt from the database at startup and after every data reload
+STATE_LOADERS = [
+    # Name -> MLBAM ID index used to resolve players before SQL generation
+    (load_player_index, "Player index not loaded; names will not be resolved to IDs"),
+    # Column names and types of the views, for the per-question schema in the prompt
+    (load_column_catalog, "Column catalog not loaded; using the built-in column list"),
+    # Player roles and the latest season, for the template fast path
+    (load_template_context, "Template context not loaded; player questions will go to the LLM"),
+    (query_router.load, "Rollup views not loaded; queries will run on v_statcast"),
+]
+# Builds and swaps in a fresh database snapshot when the Parquet files change
+data_reloader = DataReloader(STATE_LOADERS)
+
+
+def warm_statement(sql: str, run: bool = True):
+    """Routes, checks and (with `run`) executes `sql` the way /query would, filling the plan and result caches."""
+    guarded = run_with_cursor(sql_guard.check, query_router.route(sql).sql, True)
+    if run:
+        execute_arrow(guarded.sql)
+
+
+async def verified_route(sql: str) -> RoutedQuery:
+    """
+    `query_router.route`, with the rollup rewrite checked against the original statement in verify mode.
+    Both statements are checked by the guard and run with its LIMIT, in the original's heavy-scan slot.
+    If the guard refuses either of them, or the comparison cannot be made, the rewrite is served unverified.
+    """
+    routed = await run_in_executor(query_router.route, sql)
+    if not query_router.verify or routed.rollup is None:
+        return routed
+    try:
+        original = await run_in_executor(run_with_cursor, sql_guard.check, sql, True)
+        rewritten = await run_in_executor(run_with_cursor, sql_guard.check, routed.sql, True)
+        release = await sql_guard.acquire(original)
+    except (QueryRejected, ScanCapacityExceeded) as e:
+        logging.info(f"Not verifying the rollup rewrite: {e}")
+        return routed
+    try:
+        expected = await run_in_executor(execute_arrow, original.sql)
+        actual = await run_in_executor(execute_arrow, rewritten.sql)
+    except QueryTimeout as e:
+        logging.info(f"Not verifying the rollup rewrite: {e}")
+        return routed
+    finally:
+        release()
+    if expected is not None and original.row_limit is not None and expected.num_rows >= original.row_limit:
+        # Cut at the LIMIT, the two answers may hold different rows
+        logging.info("Not verifying the rollup rewrite: the original answer reached the guard's row limit.")
+        return routed
+    return query_router.compare(sql, routed, expected, actual)
+
+
+async def scope_to_row_set(sql: str, previous_sql: str | None) -> ScopedQuery:
+    """
+    `session_cache.prepare`, with the query that fetches a new row set checked by the guard and
+    run in a heavy-scan slot like any other. If the guard refuses it, no row set is built.
+    """
+    build_sql = await run_in_executor(session_cache.build_sql, sql, previous_sql)
+    if build_sql is None:
+        return await run_in_executor(session_cache.prepare, sql)
+    try:
+        guarded = await run_in_executor(run_with_cursor, sql_guard.check, build_sql, False)
+        release = await sql_guard.acquire(guarded)
+    except (QueryRejected, ScanCapacityExceeded) as e:
+        logging.info(f"Not materializing the rows of the previous statement: {e}")
+        return await run_in_executor(session_cache.prepare, sql)
+    try:
+        return await run_in_executor(session_cache.prepare, sql, previous_sql)
+    finally:
+        release()
+
+
+# Runs in the background after startup; /health/ready answers 503 until it is done.
+# Cheapest first, so a question that arrives early finds the most already loaded.
+warmup = Warmup([
+    ("llm", get_llm_client),
+    ("plans", lambda: warm_statement(PLAN_STATEMENT, run=False)),
+    ("dimensions", lambda: run_with_cursor(read_dimensions)),
+    ("views", lambda: run_with_cursor(scan_views)),
+    ("queries", lambda: run_statements(warm_statement, load_statements())),
+])
+
+REGISTRY.register_stats(StatsCollector(
+    "hotcorner_data_reload", "Data reloads", data_reloader.stats,
+    counters=("reloads", "failures"), gauges=("last_reload_seconds",)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the long-lived DuckDB handle once per process and release it and the LLM client on shutdown.
+    # The LLM client is created by the warm-up, or by the first question that needs it.
+    init_pool()
+    for loader, warning in STATE_LOADERS:
+        try:
+            await run_in_executor(run_with_cursor, loader)
+        except Exception as e:
+            logging.warning(f"{warning}: {e}")
+    get_translation_cache()
+    warming = asyncio.create_task(warmup.run())
+    watcher = asyncio.create_task(data_reloader.watch()) if RELOAD_WATCH_INTERVAL > 0 else None
+    yield
+    warming.cancel()
+    if watcher is not None:
+        watcher.cancel()
+    await close_llm_client()
+    close_translation_cache()
+    close_pool()
+
 # Initialize the FastAPI app
 app = FastAPI(
     title="Baseball Data API",
     description="An API to query MLB Statcast data using natural language.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 origins = [
@@ -25,6 +182,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read where the time went
+    expose_headers=["Server-Timing", "X-Served-By", "X-SQL-Query", "X-Next-Cursor", "X-Row-Limit"],
 )
 
 # Setup basic logging
@@ -35,11 +194,80 @@ class QueryRequest(BaseModel):
     question: str
     previous_sql: str | None = None
     seasons: list[int] | None = None # Optional for future use
+    # records: list of row objects (default, used by the frontend)
+    # columns: column-oriented JSON; json: records shape encoded natively by DuckDB; arrow: Arrow IPC stream
+    format: Literal["records", "columns", "json", "arrow"] = "records"
+    # Stream the full result in batches: an Arrow IPC stream for format="arrow", NDJSON otherwise
+    stream: bool = False
+    # Cursor pagination: set page_size, then pass back the returned next_cursor for the following page
+    page_size: int | None = Field(default=None, ge=1, le=MAX_PAGE_SIZE)
+    cursor: str | None = None
+
+def render_result(sql_query: str, table: pa.Table, fmt: str, extra: dict | None = None):
+    rows_json = rows_to_json(table) if fmt == "json" else None
+    response = render_response(sql_query, table, fmt, rows_json, extra)
+    # Every format says which path answered, not only Arrow (whose extra fields all become headers)
+    served_by = (extra or {}).get("served_by")
+    if served_by is not None:
+        response.headers["X-Served-By"] = served_by
+    return response
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Welcome to the Baseball Data API!"}
 
+@app.get("/health/ready")
+def readiness():
+    """Readiness probe: 200 once the database is open and the warm-up has finished."""
+    if init_pool() is None:
+        raise HTTPException(status_code=503, detail="Database is not available.")
+    if not warmup.ready:
+        raise HTTPException(status_code=503, detail="Warming up.")
+    return {"status": "ready", "warmup": warmup.stats()}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"translation": get_translation_cache().stats(), "results": result_cache.stats(), "routing": query_router.stats(),
+            "templates": template_stats(), "guard": sql_guard.stats(), "sessions": session_cache.stats(),
+            "reload": data_reloader.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/reload")
+async def reload_data(x_admin_token: str | None = Header(default=None)):
+    """Builds a snapshot of the current Parquet files, warms it and swaps it in without dropping requests."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    try:
+        return await asyncio.to_thread(data_reloader.reload, "admin")
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed; still serving the previous snapshot: {e}")
+
+@app.get("/players/resolve")
+def resolve_player(name: str = Query(..., min_length=2)):
+    index = get_player_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Player index is not loaded.")
+    return {"name": name, "matches": [match.to_dict() for match in index.resolve(name)]}
+
+def _finish_stream(chunks, release, fmt: str):
+    """Yields the stream's chunks, then records its size and frees its heavy-scan slot once it ends or the client goes away."""
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        release()
+        RESPONSE_BYTES.observe(sent, format=fmt)
+
 @app.post("/query")
 async def handle_query(request: QueryRequest):
     """
@@ -48,20 +276,121 @@ async def handle_query(request: QueryRequest):
     **MVP Stub:** For now, it ignores the question and runs a hardcoded SQL query.
     """
     logging.info(f"Received query request for question: '{request.question}'")
-    
+    timer = StageTimer()
+    served_by, status = "none", 200
 
     try:
-        # 1. Generate SQL from the natural language question
-        generated_sql = nl_to_sql(request.question, request.previous_sql)
+        # 1. Generate SQL from the natural language question, or resume it from a pagination cursor
+        offset = 0
+        if request.cursor:
+            try:
+                state = decode_cursor(request.cursor)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if state["version"] != result_cache.current_version():
+                raise HTTPException(status_code=409, detail="The data changed since this cursor was issued; rerun the query.")
+            generated_sql, offset = state["sql"], state["offset"]
+            served_by = "cursor"
+        else:
+            with timer.stage("translate"):
+                translation = await translate(request.question, request.previous_sql)
+            generated_sql, served_by = translation.sql, translation.served_by
 
-        # 2. Execute the generated SQL
-        results = execute_query(generated_sql)
-        
-        if not results:
+        # 2. Read a rollup instead of raw pitches when it gives the same answer
+        with timer.stage("route"):
+            routed = await verified_route(generated_sql)
+
+        # A page is bounded by its own LIMIT, so the guard checks the page as it will run and adds no cap of its own
+        page_size = None if request.stream else request.page_size
+
+        def statement(sql: str) -> str:
+            return page_sql(sql, offset, page_size) if page_size else sql
+
+        try:
+            # 3. Reject plans over the cost budget and cap the row count
+            with timer.stage("plan"):
+                guarded = await run_in_executor(run_with_cursor, sql_guard.check, statement(routed.sql), not request.stream)
+
+            # 4. Read the rows an earlier step of the conversation already filtered to, instead of the Parquet files
+            scoped = ScopedQuery(routed.sql)
+            if routed.rollup is None:
+                with timer.stage("materialize"):
+                    scoped = await scope_to_row_set(routed.sql, request.previous_sql)
+                    if scoped.row_set is not None:
+                        guarded = await run_in_executor(
+                            run_with_cursor, sql_guard.check, statement(scoped.sql), not request.stream, tables=scoped.tables)
+
+            # 5. Wait for a slot if the scan is large
+            with timer.stage("queue"):
+                release = await sql_guard.acquire(guarded)
+        except QueryRejected as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except ScanCapacityExceeded as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        # Context for the slow-query log
+        context = {"question": request.question, "served_by": served_by,
+                   "estimated_rows": guarded.scanned_rows, "estimated_files": guarded.files, "row_set": scoped.row_set}
+
+        # 6a. Streaming: rows go out batch by batch and never sit in memory as a whole
+        if request.stream:
+            fmt = "arrow" if request.format == "arrow" else "ndjson"
+            try:
+                with timer.stage("execute"):
+                    chunks = await run_in_executor(open_stream, guarded.sql, fmt, tables=scoped.tables)
+            except BaseException:
+                release()
+                raise
+            headers = {"X-SQL-Query": quote(generated_sql), "X-Served-By": served_by}
+            if SERVER_TIMING:
+                headers["Server-Timing"] = timer.server_timing()
+            return StreamingResponse(
+                _finish_stream(chunks, release, fmt),
+                media_type=ARROW_STREAM_MEDIA_TYPE if fmt == "arrow" else NDJSON_MEDIA_TYPE,
+                headers=headers,
+            )
+
+        # 6b. Execute the generated SQL (or one page of it) off the event loop
+        try:
+            with timer.stage("execute"):
+                table = await execute_arrow_async(guarded.sql, context, scoped.tables)
+        finally:
+            release()
+        if table is None:
+            table = pa.table({})
+
+        if table.num_rows == 0:
             logging.info("Query executed successfully but returned no results.")
-        
-        return {"sql_query": generated_sql, "results": results}
-    
+
+        extra = {"served_by": served_by}
+        if page_size:
+            next_cursor = None
+            if table.num_rows > page_size:
+                table = table.slice(0, page_size)
+                next_cursor = encode_cursor(generated_sql, offset + page_size, result_cache.current_version())
+            extra["next_cursor"] = next_cursor
+        elif guarded.row_limit is not None and table.num_rows >= guarded.row_limit:
+            # The result was cut at the guard's LIMIT
+            extra["row_limit"] = guarded.row_limit
+
+        # 7. Serialize in the requested format, also off the event loop
+        with timer.stage("serialize"):
+            response = await run_in_executor(render_result, generated_sql, table, request.format, extra)
+        RESULT_ROWS.observe(table.num_rows, format=request.format)
+        RESPONSE_BYTES.observe(len(response.body), format=request.format)
+        if SERVER_TIMING:
+            response.headers["Server-Timing"] = timer.server_timing()
+        return response
+
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except QueryTimeout as e:
+        status = 504
+        logging.warning(f"Query timed out: {e}")
+        raise HTTPException(status_code=504, detail=f"The query took too long and was cancelled. {e}")
     except Exception as e:
+        status = 500
         logging.error(f"An internal server error occurred: {e}")
-        raise HTTPException(status_code=500, detail="Failed to process the query.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to process the query.")
+    finally:
+        timer.finish(served_by, status)
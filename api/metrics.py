@@ -0,0 +1,244 @@
+"""
+Request metrics in the Prometheus text format, per-stage timings and the slow-query log.
+
+Metrics live in process memory and are rendered on `GET /metrics`. Counters that
+other components already keep (cache hits, guard rejections, ...) are read from
+their `stats()` at scrape time instead of being counted twice.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# --- Metrics Configuration ---
+# Send a Server-Timing header with the duration of each stage of /query
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+# Optional JSON-lines file for slow queries; they are always logged as warnings too
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG")
+# Operators kept per slow-query entry, slowest first
+SLOW_QUERY_TOP_OPERATORS = 10
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BYTE_BUCKETS = (1_024, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216, 67_108_864)
+PREFIX = "hotcorner"
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets, with their sum and count, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts, sum, count]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class StatsCollector:
+    """
+    Exposes numbers from a component's `stats()` dict at scrape time:
+    `counters` as `<prefix>_<key>_total`, `gauges` as `<prefix>_<key>`.
+    """
+
+    def __init__(self, prefix: str, help: str, stats: Callable[[], dict], counters=(), gauges=()):
+        self.prefix, self.help, self.stats = prefix, help, stats
+        self.counters, self.gauges = counters, gauges
+
+    def families(self) -> list[tuple[str, str, str, list]]:
+        try:
+            stats = self.stats()
+        except Exception as e:
+            logging.warning(f"Could not collect {self.prefix} metrics: {e}")
+            return []
+        families = []
+        for key in self.counters:
+            families.append((f"{self.prefix}_{key}_total", "counter", f"{self.help}: {key}", [({}, stats.get(key, 0))]))
+        for key in self.gauges:
+            families.append((f"{self.prefix}_{key}", "gauge", f"{self.help}: {key}", [({}, stats.get(key, 0))]))
+        return families
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: list[StatsCollector] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, collector: StatsCollector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in metric.samples()]
+        for collector in self._collectors:
+            for name, kind, help, samples in collector.families():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+QUERY_SECONDS = REGISTRY.register(Histogram(
+    f"{PREFIX}_query_seconds", "End-to-end /query latency", LATENCY_BUCKETS, ("served_by", "status")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    f"{PREFIX}_query_stage_seconds", "Time spent in each stage of /query", LATENCY_BUCKETS, ("stage",)))
+LLM_SECONDS = REGISTRY.register(Histogram(
+    f"{PREFIX}_llm_request_seconds", "LLM chat completion round trips", LATENCY_BUCKETS, ("outcome",)))
+RESULT_ROWS = REGISTRY.register(Histogram(
+    f"{PREFIX}_query_result_rows", "Rows returned per query", ROW_BUCKETS, ("format",)))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    f"{PREFIX}_query_response_bytes", "Response body size per query", BYTE_BUCKETS, ("format",)))
+SLOW_QUERIES = REGISTRY.register(Counter(
+    f"{PREFIX}_slow_queries_total", "Queries over SLOW_QUERY_SECONDS"))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class StageTimer:
+    """Times the stages of one request, for the stage histogram and the Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: list[tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Stages and the total so far as a Server-Timing header value, in milliseconds."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+        return ", ".join(entries + [f"total;dur={self.elapsed() * 1000:.1f}"])
+
+    def finish(self, served_by: str, status: int):
+        for name, seconds in self.stages:
+            STAGE_SECONDS.observe(seconds, stage=name)
+        QUERY_SECONDS.observe(self.elapsed(), served_by=served_by, status=status)
+
+
+def summarize_profile(profile: dict) -> list[dict]:
+    """The slowest operators of a DuckDB JSON profile, with their timings and output rows."""
+    operators = []
+    stack = list(profile.get("children", []))
+    while stack:
+        node = stack.pop()
+        stack.extend(node.get("children", []))
+        operators.append({
+            "operator": node.get("name", "").strip(),
+            "seconds": node.get("timing", 0.0),
+            "rows": node.get("cardinality", 0),
+            "info": node.get("extra_info", "").replace("[INFOSEPARATOR]", "|").replace("\n", " ").strip(),
+        })
+    operators.sort(key=lambda op: op["seconds"], reverse=True)
+    return operators[:SLOW_QUERY_TOP_OPERATORS]
+
+
+class SlowQueryLog:
+    """Records queries over the slow threshold with their DuckDB operator profile."""
+
+    def __init__(self, path: str | None = SLOW_QUERY_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, seconds: float, profile: dict | None, **context):
+        SLOW_QUERIES.inc()
+        operators = summarize_profile(profile) if profile else []
+        slowest = ", ".join(f"{op['operator']} {op['seconds'] * 1000:.0f}ms" for op in operators[:3])
+        logging.warning(f"Slow query ({seconds:.2f}s; {slowest}): {sql}")
+        if not self.path:
+            return
+        entry = {"ts": time.time(), "seconds": round(seconds, 4), "sql": sql, **context, "operators": operators}
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            logging.error(f"Could not write the slow-query log: {e}")
+
+
+slow_query_log = SlowQueryLog()
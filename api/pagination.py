@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+from .sql_utils import parse_sql
+
+# Cursors are signed so clients cannot use them to run arbitrary SQL. Set a fixed
+# secret when running several workers, otherwise each process only accepts its own cursors.
+CURSOR_SECRET = os.getenv("CURSOR_SECRET") or secrets.token_hex(32)
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "10000"))
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed, tampered with, or stale."""
+
+
+def _sign(payload: bytes) -> str:
+    return hmac.new(CURSOR_SECRET.encode("utf-8"), payload, hashlib.sha256).hexdigest()[:32]
+
+
+def encode_cursor(sql_query: str, offset: int, data_version: str) -> str:
+    """Builds an opaque cursor pointing at `offset` rows into the result of `sql_query`."""
+    payload = json.dumps({"sql": sql_query, "offset": offset, "version": data_version}, separators=(",", ":")).encode("utf-8")
+    token = payload + b"." + _sign(payload).encode("ascii")
+    return base64.urlsafe_b64encode(token).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Verifies and unpacks a cursor.
+
+    Returns:
+        A dict with `sql`, `offset` and `version` keys.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded or its signature does not match.
+    """
+    try:
+        token = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        payload, signature = token.rsplit(b".", 1)
+    except (ValueError, UnicodeEncodeError):
+        raise InvalidCursorError("Malformed cursor.")
+    if not hmac.compare_digest(_sign(payload).encode("ascii"), signature):
+        raise InvalidCursorError("Cursor signature mismatch.")
+    return json.loads(payload)
+
+
+def is_ordered(sql_query: str) -> bool:
+    """Whether the statement sorts its result with an outer ORDER BY."""
+    tree = parse_sql(sql_query)
+    if tree is None or len(tree.get("statements", [])) != 1:
+        return False
+    return any(m.get("type") == "ORDER_MODIFIER" for m in tree["statements"][0]["node"].get("modifiers", []))
+
+
+def page_sql(sql_query: str, offset: int, page_size: int) -> str:
+    """
+    Wraps a query so it returns one page of rows. One extra row is fetched to
+    tell whether another page follows.
+
+    DuckDB gives no stable row order to unsorted results (hash aggregates on several
+    threads come out in a different order each run), so a statement without an ORDER BY
+    is sorted on all of its columns, and each page continues where the previous one ended.
+    """
+    order = "" if is_ordered(sql_query) else " ORDER BY ALL"
+    return f"SELECT * FROM ({sql_query}) AS _page{order} LIMIT {page_size + 1} OFFSET {offset}"
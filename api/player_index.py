@@ -0,0 +1,205 @@
+import difflib
+import logging
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Minimum difflib ratio for a fuzzy name match
+FUZZY_CUTOFF = 0.88
+MAX_CANDIDATES = 3
+# Leading characters of the surname that a misspelled name must share with a fuzzy candidate,
+# when it shares no whole token with it
+SURNAME_PREFIX = 3
+# Capitalized words a question may start with, or dates, that are also surnames; never read alone as a player
+_NOT_SURNAMES = frozenset("""
+    what who which when where how why show list give find get compare rank top best most least
+    average total career season year month day week game games team league
+    january february march april may june july august september october november december
+    monday tuesday wednesday thursday friday saturday sunday
+""".split())
+_NON_NAME = re.compile(r"[^a-z0-9 ]+")
+_POSSESSIVE = re.compile(r"(?:'s|’s|s')$", re.IGNORECASE)
+_TOKEN = re.compile(r"[\w'’.-]+")
+
+PLAYERS_SQL = """
+SELECT m.key_mlbam, m.name_first, m.name_last,
+       YEAR(TRY_CAST(l.debut AS DATE)) AS debut_year, YEAR(TRY_CAST(l.finalGame AS DATE)) AS final_year
+FROM v_player_map m
+LEFT JOIN v_lahman_people l ON l.retroID = m.key_retro
+"""
+# Used when v_lahman_people is missing or has no retroID column
+PLAYERS_SQL_MAP_ONLY = "SELECT key_mlbam, name_first, name_last, NULL AS debut_year, NULL AS final_year FROM v_player_map"
+
+
+def fold_name(name: str) -> str:
+    """Lower-cases, strips accents and punctuation, and collapses whitespace: 'José Ramírez' -> 'jose ramirez'."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_only = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return " ".join(_NON_NAME.sub(" ", ascii_only.replace(".", "")).split())
+
+
+@dataclass(frozen=True)
+class Player:
+    mlbam_id: int
+    name_first: str
+    name_last: str
+    debut_year: int | None = None
+    final_year: int | None = None
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.name_first} {self.name_last}"
+
+
+@dataclass(frozen=True)
+class PlayerMatch:
+    player: Player
+    matched_text: str
+    match_type: str  # "exact", "folded", "surname" or "fuzzy"
+    score: float
+
+    def to_dict(self) -> dict:
+        return {
+            "mlbam_id": self.player.mlbam_id,
+            "name_first": self.player.name_first,
+            "name_last": self.player.name_last,
+            "debut_year": self.player.debut_year,
+            "final_year": self.player.final_year,
+            "matched_text": self.matched_text,
+            "match_type": self.match_type,
+            "score": round(self.score, 3),
+        }
+
+
+def _rank(player: Player) -> tuple:
+    # Prefer major leaguers (they have a Lahman debut), then the most recent careers
+    return (player.debut_year is not None, player.final_year or 0, player.debut_year or 0)
+
+
+class PlayerIndex:
+    """
+    In-memory name -> player index for resolving names to MLBAM IDs.
+
+    Lookups try, in order: an exact full-name match, an accent/punctuation-folded
+    match (also accepting 'Last, First'), and a fuzzy match on the folded name.
+    Fuzzy matching only compares names that share a token, or the start of the
+    surname, with the query. A surname on its own resolves when it picks out one player.
+    """
+
+    def __init__(self, players: list[Player]):
+        self.players = players
+        self._exact: dict[str, list[Player]] = {}
+        self._folded: dict[str, list[Player]] = {}
+        for player in players:
+            self._exact.setdefault(player.full_name, []).append(player)
+            self._folded.setdefault(fold_name(player.full_name), []).append(player)
+        # Folded surname -> players; folded token or surname prefix -> folded names, for fuzzy candidates
+        self._surnames: dict[str, list[Player]] = {}
+        self._by_token: dict[str, set[str]] = {}
+        self._by_prefix: dict[str, set[str]] = {}
+        for name, bucket in self._folded.items():
+            for token in name.split():
+                self._by_token.setdefault(token, set()).add(name)
+            for player in bucket:
+                surname = fold_name(player.name_last)
+                self._surnames.setdefault(surname, []).append(player)
+                self._by_prefix.setdefault(surname[:SURNAME_PREFIX], set()).add(name)
+        for bucket in (*self._exact.values(), *self._folded.values(), *self._surnames.values()):
+            bucket.sort(key=_rank, reverse=True)
+        # Longest indexed name in tokens, to bound the n-gram scan over questions
+        self.max_tokens = max((len(name.split()) for name in self._folded), default=0)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def resolve(self, name: str, fuzzy: bool = True) -> list[PlayerMatch]:
+        """Resolves a single name to up to MAX_CANDIDATES players, best first."""
+        name = _POSSESSIVE.sub("", name.strip())
+        if "," in name:
+            last, _, first = name.partition(",")
+            name = f"{first.strip()} {last.strip()}"
+        if name in self._exact:
+            return [PlayerMatch(p, name, "exact", 1.0) for p in self._exact[name][:MAX_CANDIDATES]]
+        folded = fold_name(name)
+        if folded in self._folded:
+            return [PlayerMatch(p, name, "folded", 1.0) for p in self._folded[folded][:MAX_CANDIDATES]]
+        player = self._by_surname(folded)
+        if player is not None:
+            return [PlayerMatch(player, name, "surname", 1.0)]
+        tokens = folded.split()
+        if not fuzzy or len(tokens) < 2 or len(folded) < 5:
+            return []
+        names = self._by_prefix.get(tokens[-1][:SURNAME_PREFIX], set()).union(
+            *(self._by_token.get(token, ()) for token in tokens))
+        matches = []
+        for candidate in difflib.get_close_matches(folded, names, n=MAX_CANDIDATES, cutoff=FUZZY_CUTOFF):
+            score = difflib.SequenceMatcher(None, folded, candidate).ratio()
+            matches.extend(PlayerMatch(p, name, "fuzzy", score) for p in self._folded[candidate])
+        matches.sort(key=lambda m: (m.score, _rank(m.player)), reverse=True)
+        return matches[:MAX_CANDIDATES]
+
+    def _by_surname(self, surname: str) -> Player | None:
+        """The player a folded surname alone refers to: the only one, or the only one with the most recent career."""
+        players = self._surnames.get(surname, [])
+        if len(players) > 1 and _rank(players[0])[:2] == _rank(players[1])[:2]:
+            return None
+        return players[0] if players else None
+
+    def find_in_text(self, text: str) -> list[PlayerMatch]:
+        """
+        Finds player names mentioned in free text, longest spans first.
+        Exact and folded matches are tried on every span; fuzzy matching only on
+        capitalized multi-word spans, which are the likely names. A single word is
+        read as a surname only if it is capitalized and not a common question word.
+        """
+        tokens = [_POSSESSIVE.sub("", t).strip(".-") for t in _TOKEN.findall(text)]
+        found: list[PlayerMatch] = []
+        used = [False] * len(tokens)
+        for width in range(min(self.max_tokens, 4), 0, -1):
+            for start in range(len(tokens) - width + 1):
+                if any(used[start:start + width]):
+                    continue
+                span = tokens[start:start + width]
+                if width == 1 and (not span[0][:1].isupper() or fold_name(span[0]) in _NOT_SURNAMES):
+                    continue
+                fuzzy = all(t[:1].isupper() for t in span)
+                matches = self.resolve(" ".join(span), fuzzy=fuzzy)
+                if matches:
+                    found.extend(matches)
+                    used[start:start + width] = [True] * width
+        return found
+
+
+_index: PlayerIndex | None = None
+_index_lock = threading.Lock()
+
+
+def load_player_index(con) -> PlayerIndex:
+    """
+    Builds the index from v_player_map (joined to v_lahman_people for career years)
+    using the given DuckDB connection, and makes it the process-wide index.
+    """
+    global _index
+    try:
+        rows = con.execute(PLAYERS_SQL).fetchall()
+    except Exception as e:
+        logging.warning(f"Could not join v_lahman_people for career years ({e}); indexing v_player_map only.")
+        rows = con.execute(PLAYERS_SQL_MAP_ONLY).fetchall()
+    players = [
+        Player(int(mlbam_id), name_first, name_last, debut_year, final_year)
+        for mlbam_id, name_first, name_last, debut_year, final_year in rows
+        if mlbam_id is not None and name_first and name_last
+    ]
+    index = PlayerIndex(players)
+    with _index_lock:
+        _index = index
+    logging.info(f"Loaded player index with {len(index)} players.")
+    return index
+
+
+def get_player_index() -> PlayerIndex | None:
+    """Returns the loaded index, or None if it has not been loaded (e.g. no player tables)."""
+    return _index
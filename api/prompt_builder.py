@@ -0,0 +1,389 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Views the LLM may query, in the order they are listed in the prompt. Rollups are not
+# listed; the query router uses them behind the LLM's back.
+PROMPT_VIEWS = ["v_statcast", "v_plate_appearances", "v_lahman_people", "v_player_map"]
+
+# Short descriptions of the Statcast columns, keyed by column name. They are shared with
+# v_plate_appearances (a column means the same in both) and are also what retrieval matches on.
+STATCAST_DESCRIPTIONS = {
+    # Game context
+    "game_date": "date of the game",
+    "game_year": "season; partition column, always filter on it with dates",
+    "game_month": "month 1-12; partition column",
+    "game_pk": "game ID",
+    "game_type": "R regular season, F wild card, D division series, L league championship, W world series, S spring",
+    "home_team": "home team abbreviation, e.g. NYY",
+    "away_team": "away team abbreviation",
+    "inning": "inning number",
+    "inning_topbot": "Top (away team bats) or Bot (home team bats)",
+    "outs_when_up": "outs before the play",
+    "on_1b": "runner on first base (MLBAM ID), NULL if empty",
+    "on_2b": "runner on second base (MLBAM ID), NULL if empty",
+    "on_3b": "runner on third base (MLBAM ID), NULL if empty",
+    "home_score": "home score before the pitch",
+    "away_score": "away score before the pitch",
+    "bat_score": "batting team score before the pitch",
+    "fld_score": "fielding team score before the pitch",
+    "post_home_score": "home score after the pitch",
+    "post_away_score": "away score after the pitch",
+    "post_bat_score": "batting team score after the pitch",
+    "post_fld_score": "fielding team score after the pitch",
+    "home_score_diff": "home minus away score",
+    "bat_score_diff": "batting minus fielding score",
+    "home_win_exp": "home team win expectancy",
+    "bat_win_exp": "batting team win expectancy",
+    "delta_home_win_exp": "change in home win expectancy on the play",
+    "delta_run_exp": "change in run expectancy on the pitch (run value)",
+    "delta_pitcher_run_exp": "run value for the pitcher",
+    # Players
+    "player_name": "pitcher name, 'Last, First'",
+    "pitcher": "pitcher MLBAM ID",
+    "batter": "batter MLBAM ID",
+    "stand": "batter side, L or R",
+    "p_throws": "pitcher hand, L or R",
+    "age_pit": "pitcher age",
+    "age_bat": "batter age",
+    "age_pit_legacy": "pitcher age, legacy definition",
+    "age_bat_legacy": "batter age, legacy definition",
+    "n_thruorder_pitcher": "times through the order for the pitcher",
+    "n_priorpa_thisgame_player_at_bat": "batter's earlier plate appearances this game",
+    "pitcher_days_since_prev_game": "pitcher rest days",
+    "batter_days_since_prev_game": "batter days since previous game",
+    "pitcher_days_until_next_game": "pitcher days until next game",
+    "batter_days_until_next_game": "batter days until next game",
+    **{f"fielder_{n}": f"MLBAM ID of the fielder at position {n}" for n in range(2, 10)},
+    "if_fielding_alignment": "infield alignment, e.g. Standard, Infield shift",
+    "of_fielding_alignment": "outfield alignment",
+    # Plate appearance / pitch outcome
+    "at_bat_number": "plate appearance number within the game",
+    "pitch_number": "pitch number within the plate appearance",
+    "events": "plate appearance outcome on its last pitch, e.g. strikeout, walk, single, home_run, field_out; NULL otherwise",
+    "description": "pitch outcome, e.g. ball, called_strike, swinging_strike, foul, hit_into_play",
+    "des": "text description of the play",
+    "type": "B ball, S strike, X in play",
+    "balls": "balls in the count",
+    "strikes": "strikes in the count",
+    "zone": "strike zone location 1-9, 11-14 outside",
+    # Pitch
+    "pitch_type": "pitch type code, e.g. FF, SL, CH, CU, SI, FC",
+    "pitch_name": "pitch type name, e.g. 4-Seam Fastball, Slider",
+    "release_speed": "pitch velocity in mph",
+    "effective_speed": "perceived velocity in mph",
+    "release_spin_rate": "spin rate in rpm",
+    "spin_axis": "spin axis in degrees",
+    "release_extension": "release extension in feet",
+    "release_pos_x": "horizontal release point, ft",
+    "release_pos_y": "release distance from home plate, ft",
+    "release_pos_z": "vertical release point, ft",
+    "arm_angle": "pitcher arm angle in degrees",
+    "pfx_x": "horizontal movement, ft",
+    "pfx_z": "vertical movement, ft",
+    "api_break_z_with_gravity": "vertical break including gravity, ft",
+    "api_break_x_arm": "horizontal break toward the arm side, ft",
+    "api_break_x_batter_in": "horizontal break toward the batter, ft",
+    "plate_x": "horizontal location at the plate, ft",
+    "plate_z": "height at the plate, ft",
+    "sz_top": "top of the strike zone, ft",
+    "sz_bot": "bottom of the strike zone, ft",
+    "vx0": "velocity x at release",
+    "vy0": "velocity y at release",
+    "vz0": "velocity z at release",
+    "ax": "acceleration x",
+    "ay": "acceleration y",
+    "az": "acceleration z",
+    # Batted ball and swing
+    "launch_speed": "exit velocity in mph",
+    "launch_angle": "launch angle in degrees",
+    "hit_distance_sc": "projected hit distance in feet",
+    "hyper_speed": "adjusted exit velocity",
+    "launch_speed_angle": "batted ball class 1-6, 6 = barrel",
+    "bb_type": "batted ball type: ground_ball, line_drive, fly_ball, popup",
+    "hit_location": "fielder position that fielded the ball",
+    "hc_x": "hit coordinate x",
+    "hc_y": "hit coordinate y",
+    "estimated_ba_using_speedangle": "expected batting average (xBA)",
+    "estimated_woba_using_speedangle": "expected wOBA (xwOBA)",
+    "estimated_slg_using_speedangle": "expected slugging (xSLG)",
+    "woba_value": "wOBA value of the outcome",
+    "woba_denom": "1 if the plate appearance counts toward wOBA",
+    "babip_value": "1 if the outcome counts as a hit for BABIP",
+    "iso_value": "isolated power value of the outcome",
+    "bat_speed": "bat speed in mph",
+    "swing_length": "swing length in feet",
+    "attack_angle": "bat attack angle in degrees",
+    "attack_direction": "bat attack direction in degrees",
+    "swing_path_tilt": "swing path tilt in degrees",
+    "intercept_ball_minus_batter_pos_x_inches": "contact point x relative to the batter, inches",
+    "intercept_ball_minus_batter_pos_y_inches": "contact point y relative to the batter, inches",
+}
+COLUMN_DESCRIPTIONS = {
+    **STATCAST_DESCRIPTIONS,
+    "pitches": "pitches seen in the plate appearance",
+    # Lahman / player map
+    "nameFirst": "first name",
+    "nameLast": "last name",
+    "debut": "MLB debut date",
+    "finalGame": "last MLB game date",
+    "birthYear": "birth year",
+    "birthCountry": "birth country",
+    "bats": "batting side",
+    "throws": "throwing hand",
+    "key_mlbam": "MLBAM ID, matches batter/pitcher",
+    "key_retro": "Retrosheet ID",
+    "name_first": "first name",
+    "name_last": "last name",
+}
+
+# Words and phrases users say for a column that its name and description do not contain
+COLUMN_KEYWORDS = {
+    "release_speed": ["velocity", "velo", "fastest", "hardest thrown", "throws hard", "speed"],
+    "release_spin_rate": ["spin", "rpm"],
+    "launch_speed": ["exit velocity", "ev", "hardest hit", "hit hard", "hard hit", "barrel"],
+    "launch_angle": ["la", "sweet spot", "barrel"],
+    "launch_speed_angle": ["barrel", "barrels"],
+    "hit_distance_sc": ["longest", "homer distance", "how far"],
+    "description": ["whiff", "swing", "swinging", "called strike", "csw", "chase", "foul", "take"],
+    "events": ["strikeout", "strikeouts", "walk", "walks", "home run", "homer", "hit", "hits",
+               "single", "double", "triple", "out", "outcome", "result"],
+    "pitch_type": ["fastball", "slider", "changeup", "curveball", "sinker", "cutter", "sweeper", "splitter", "arsenal", "mix", "usage"],
+    "pitch_name": ["fastball", "slider", "changeup", "curveball", "sinker", "cutter", "sweeper", "splitter", "arsenal", "mix", "usage"],
+    "zone": ["in the zone", "out of zone", "chase", "location"],
+    "plate_x": ["location", "inside", "outside", "heatmap"],
+    "plate_z": ["location", "high", "low", "elevated", "heatmap"],
+    "pfx_x": ["movement", "arm side run", "sweep", "break"],
+    "pfx_z": ["movement", "ride", "rise", "drop", "break", "induced vertical"],
+    "stand": ["lefty", "lefties", "righty", "righties", "left-handed", "right-handed", "lhb", "rhb", "platoon", "handed"],
+    "p_throws": ["lefty", "lefties", "righty", "righties", "left-handed", "right-handed", "lhp", "rhp", "southpaw"],
+    "home_team": ["team", "home", "ballpark", "stadium"],
+    "away_team": ["team", "road", "away", "visiting"],
+    "inning_topbot": ["team", "batting team"],
+    "estimated_woba_using_speedangle": ["xwoba", "expected woba", "quality of contact"],
+    "estimated_ba_using_speedangle": ["xba", "expected average"],
+    "estimated_slg_using_speedangle": ["xslg", "expected slugging"],
+    "woba_value": ["woba"],
+    "delta_run_exp": ["run value", "rv"],
+    "bat_speed": ["swing speed", "bat speed"],
+    "game_type": ["playoff", "playoffs", "postseason", "world series", "spring training", "regular season"],
+    "inning": ["first inning", "late innings", "extra innings", "ninth"],
+    "balls": ["count", "full count", "3-2", "0-2", "ahead", "behind"],
+    "strikes": ["count", "full count", "two strikes", "0-2", "ahead", "behind"],
+    "effective_speed": ["perceived velocity"],
+    "release_extension": ["extension"],
+    "debut": ["debut", "rookie", "career"],
+    "finalGame": ["retired", "career", "last game"],
+}
+
+# Columns listed for every question, per view
+CORE_COLUMNS = {
+    "v_statcast": ["game_date", "game_year", "game_month", "pitcher", "player_name", "batter", "pitch_type",
+                   "pitch_name", "description", "events", "des"],
+    "v_plate_appearances": ["game_pk", "at_bat_number", "game_date", "game_year", "game_month", "batter", "pitcher",
+                            "player_name", "events", "des"],
+    "v_lahman_people": ["playerID", "nameFirst", "nameLast", "debut", "finalGame"],
+    "v_player_map": ["key_mlbam", "key_retro", "name_first", "name_last"],
+}
+# Columns known to exist when the views cannot be introspected (no database at startup)
+FALLBACK_VIEW_COLUMNS = {
+    "v_statcast": list(STATCAST_DESCRIPTIONS),
+    "v_plate_appearances": CORE_COLUMNS["v_plate_appearances"] + [
+        "game_type", "stand", "p_throws", "home_team", "away_team", "inning", "inning_topbot", "pitches", "balls",
+        "strikes", "outs_when_up", "bb_type", "hit_location", "launch_speed", "launch_angle", "hit_distance_sc",
+        "launch_speed_angle", "estimated_ba_using_speedangle", "estimated_woba_using_speedangle",
+        "estimated_slg_using_speedangle", "woba_value", "woba_denom", "babip_value", "iso_value", "delta_run_exp",
+    ],
+    "v_lahman_people": CORE_COLUMNS["v_lahman_people"] + ["birthYear", "birthCountry", "bats", "throws"],
+    "v_player_map": CORE_COLUMNS["v_player_map"],
+}
+# Extra columns per view picked by retrieval, on top of the core columns
+MAX_RETRIEVED_COLUMNS = 8
+# Minimum retrieval score for a column to be listed
+MIN_COLUMN_SCORE = 3
+# Words found in the names or descriptions of more columns than this ("pitch", "home", "type")
+# do not single out a column, so retrieval ignores them
+MAX_WORD_COLUMNS = 3
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "by", "to", "and", "or", "with", "what", "which", "who", "how",
+    "many", "much", "is", "was", "were", "are", "did", "do", "does", "his", "her", "their", "me", "show", "give",
+    "list", "top", "most", "best", "per", "each", "all", "from", "at", "this", "that", "last", "it", "s",
+    "rate", "average", "avg", "number", "total", "percentage",
+}
+
+
+def _words(text: str) -> list[str]:
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word in _STOP_WORDS:
+            continue
+        # Crude plural stripping so "strikeouts" matches "strikeout"
+        words.append(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word)
+    return words
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    type: str | None
+    description: str | None
+
+    def render(self) -> str:
+        parts = [self.name]
+        if self.type:
+            parts.append(self.type)
+        line = " ".join(parts)
+        return f"{line}: {self.description}" if self.description else line
+
+
+class ColumnCatalog:
+    """
+    Columns of the views the LLM may query, with types and short descriptions, and
+    a keyword-scoring retriever that picks the ones relevant to a question.
+    """
+
+    def __init__(self, view_columns: dict[str, list[tuple[str, str | None]]]):
+        self.views = {
+            view: [Column(name, column_type, COLUMN_DESCRIPTIONS.get(name)) for name, column_type in columns]
+            for view, columns in view_columns.items()
+        }
+        # Per column: words from its name (weight 2) and description (weight 1); keyword phrases score 3
+        self._name_words: dict[str, set[str]] = {}
+        self._description_words: dict[str, set[str]] = {}
+        phrases: dict[str, set[str]] = {}
+        for columns in self.views.values():
+            for column in columns:
+                self._name_words[column.name] = set(_words(column.name.replace("_", " ")))
+                self._description_words[column.name] = set(_words(column.description or ""))
+                for phrase in COLUMN_KEYWORDS.get(column.name, []):
+                    phrases.setdefault(" ".join(_words(phrase)), set()).add(column.name)
+        # Longest phrases first, so "home run" is matched before "home" and "run"
+        self._phrases = sorted(phrases.items(), key=lambda item: -len(item[0].split()))
+        column_counts = Counter(w for name in self._name_words for w in self._name_words[name] | self._description_words[name])
+        self._generic_words = {w for w, n in column_counts.items() if n > MAX_WORD_COLUMNS}
+
+    @classmethod
+    def fallback(cls) -> "ColumnCatalog":
+        return cls({view: [(name, None) for name in columns] for view, columns in FALLBACK_VIEW_COLUMNS.items()})
+
+    def scores(self, question: str) -> Counter:
+        """Retrieval score of every column for a question."""
+        text = f" {' '.join(_words(question))} "
+        scores = Counter()
+        for phrase, columns in self._phrases:
+            if f" {phrase} " in text:
+                for column in columns:
+                    scores[column] += 3
+                # A matched phrase consumes its words
+                text = text.replace(f" {phrase} ", " ")
+        words = set(text.split()) - self._generic_words
+        for column, name_words in self._name_words.items():
+            scores[column] += 2 * len(words & name_words) + len(words & self._description_words[column])
+        return scores
+
+    def relevant_columns(self, question: str, previous_sql: str | None = None) -> dict[str, list[Column]]:
+        """
+        Returns, per view, the core columns plus the best-scoring columns for the question.
+        Columns used in `previous_sql` are always kept, so follow-ups can modify it.
+        """
+        scores = self.scores(question)
+        previous = set(_WORD.findall(previous_sql)) if previous_sql else set()
+        selected = {}
+        for view, columns in self.views.items():
+            core = set(CORE_COLUMNS.get(view, []))
+            ranked = sorted((c for c in columns if c.name not in core and scores[c.name] >= MIN_COLUMN_SCORE),
+                            key=lambda c: -scores[c.name])
+            retrieved = {c.name for c in ranked[:MAX_RETRIEVED_COLUMNS]}
+            selected[view] = [c for c in columns if c.name in core or c.name in retrieved or c.name in previous]
+        return selected
+
+    def render(self, question: str, previous_sql: str | None = None) -> str:
+        """The per-question schema section of the prompt."""
+        sections = []
+        for view, columns in self.relevant_columns(question, previous_sql).items():
+            sections.append(f"{view}:\n" + "\n".join(f"- {c.render()}" for c in columns))
+        return "Relevant columns (name type: description):\n" + "\n".join(sections)
+
+
+_catalog: ColumnCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def load_column_catalog(con) -> ColumnCatalog:
+    """Introspects the prompt views with the given DuckDB connection and makes the result the process-wide catalog."""
+    global _catalog
+    view_columns = {}
+    for view in PROMPT_VIEWS:
+        try:
+            view_columns[view] = [(row[0], row[1]) for row in con.execute(f"DESCRIBE {view}").fetchall()]
+        except Exception as e:
+            logging.warning(f"Could not describe {view} ({e}); using the built-in column list.")
+            view_columns[view] = [(name, None) for name in FALLBACK_VIEW_COLUMNS[view]]
+    catalog = ColumnCatalog(view_columns)
+    with _catalog_lock:
+        _catalog = catalog
+    logging.info(f"Loaded column catalog for {len(view_columns)} views.")
+    return catalog
+
+
+def get_column_catalog() -> ColumnCatalog:
+    """Returns the loaded catalog, or one built from the static column lists if none was loaded."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ColumnCatalog.fallback()
+        return _catalog
+
+
+SYSTEM_PROMPT = """You write DuckDB SQL for MLB Statcast questions. Output only the raw SQL query, no prose or code fences.
+
+Views:
+- v_statcast: one row per pitch. Use for pitch-level questions (velocity, spin, pitch types, pitch outcomes).
+- v_plate_appearances: one row per plate appearance, unique on (game_pk, at_bat_number). Use for at-bat outcomes (strikeouts, walks, hits, home runs).
+- v_lahman_people: biographical and career data.
+- v_player_map: key_mlbam (= batter/pitcher IDs) with name_first, name_last.
+The user message lists the relevant columns of each view. Use only listed columns.
+
+Rules:
+1. Pitch outcomes come from description ('swinging_strike', 'called_strike', ...). At-bat outcomes come from events in v_plate_appearances ('strikeout', 'walk', 'home_run', ...). Never infer outcomes from des.
+2. Count at-bat outcomes with COUNT(*) over v_plate_appearances. Never count outcomes over v_statcast.
+3. Identify players by ID: WHERE pitcher = <id> or WHERE batter = <id>, using "Resolved players". If several are listed for one name, pick the one whose career fits (usually the most recent). If a player is not resolved: pitchers by player_name = 'Last, First', hitters by des LIKE 'First Last%', Lahman by nameFirst/nameLast.
+4. player_name is the pitcher. To show a hitter's name, JOIN v_player_map ON batter = key_mlbam and select name_first, name_last.
+5. With date or season filters on v_statcast or v_plate_appearances, also filter game_year (and game_month within one month), e.g. game_date BETWEEN '2024-05-01' AND '2024-05-07' AND game_year = 2024 AND game_month = 5.
+6. Start FROM the view the question is about; join only when needed.
+7. Single-value answers (e.g. a debut date) return one row: DISTINCT or LIMIT 1.
+8. When listing specific pitches or plays, include context columns (player, date, teams, des).
+9. If "Previous SQL" is given, the request modifies it: keep its FROM, WHERE, GROUP BY and ORDER BY and change only what is asked (e.g. add a column)."""
+
+# Changes whenever the prompt text or the column notes change, so cached translations are invalidated
+PROMPT_FINGERPRINT = hashlib.sha256(
+    "\n".join([SYSTEM_PROMPT, repr(sorted(COLUMN_DESCRIPTIONS.items())), repr(sorted(COLUMN_KEYWORDS.items())),
+               repr(sorted(CORE_COLUMNS.items())), f"{MAX_RETRIEVED_COLUMNS}/{MIN_COLUMN_SCORE}"]).encode("utf-8")
+).hexdigest()
+
+
+def build_messages(question: str, previous_sql: str | None = None, resolved_players: str = "") -> list[dict]:
+    """
+    Builds the chat messages for one question.
+
+    The system message is identical for every request, so providers can cache it as a
+    prompt prefix. Everything that depends on the question (the relevant columns, resolved
+    players, previous SQL) goes in the user message after it.
+    """
+    parts = [get_column_catalog().render(question, previous_sql)]
+    if resolved_players:
+        parts.append(f"Resolved players:\n{resolved_players}")
+    if previous_sql:
+        parts.append(f"Previous SQL: {previous_sql}")
+    parts.append(f"Request: {question}")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(parts)},
+    ]
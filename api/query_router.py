@@ -0,0 +1,317 @@
+import copy
+import decimal
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+import pyarrow as pa
+
+from db.duckdb_init import PARQUET_DIR
+from etl.rollups import MEASURE_SUFFIXES, PITCH_COUNT_COLUMN, ROLLUPS, Rollup, stale_days
+from .sql_utils import (
+    aggregate_functions, column_name, parse_expression, parse_sql, render_expression, render_sql, single_select, walk,
+)
+
+# --- Routing Configuration ---
+# Rewrite eligible aggregate queries on v_statcast to read a rollup instead
+ROLLUP_ROUTING = os.getenv("ROLLUP_ROUTING", "1") == "1"
+# Also run the original query and serve it instead if the answers differ
+ROLLUP_VERIFY = os.getenv("ROLLUP_VERIFY", "0") == "1"
+# Relative tolerance when comparing floating-point results (sums are added in a different order)
+VERIFY_REL_TOL = 1e-9
+
+SOURCE_VIEW = "v_statcast"
+PARTITION_KEYS = {"game_year", "game_month"}
+
+# Aggregates over a measurement column x, in terms of the rollup's x_sum/x_count/x_min/x_max columns
+MEASURE_AGGREGATES = {
+    "count": 'COALESCE(SUM("{column}_count"), 0)::BIGINT',
+    "sum": 'SUM("{column}_sum")',
+    "avg": 'SUM("{column}_sum") / NULLIF(SUM("{column}_count"), 0)',
+    "mean": 'SUM("{column}_sum") / NULLIF(SUM("{column}_count"), 0)',
+    "min": 'MIN("{column}_min")',
+    "max": 'MAX("{column}_max")',
+}
+# Aggregates over an expression of key columns, weighted by the rollup's pitch count.
+# __arg__ stands for the original argument.
+KEY_AGGREGATES = {
+    "count_star": f"COALESCE(SUM({PITCH_COUNT_COLUMN}), 0)::BIGINT",
+    "count": f"COALESCE(SUM(CASE WHEN __arg__ IS NOT NULL THEN {PITCH_COUNT_COLUMN} END), 0)::BIGINT",
+    "sum": f"SUM(__arg__ * {PITCH_COUNT_COLUMN})",
+    "avg": f"SUM(__arg__ * {PITCH_COUNT_COLUMN}) / NULLIF(SUM(CASE WHEN __arg__ IS NOT NULL THEN {PITCH_COUNT_COLUMN} END), 0)",
+    "mean": f"SUM(__arg__ * {PITCH_COUNT_COLUMN}) / NULLIF(SUM(CASE WHEN __arg__ IS NOT NULL THEN {PITCH_COUNT_COLUMN} END), 0)",
+}
+# Aggregates whose result over key columns is the same on the rollup as on the pitches
+KEY_PRESERVING_AGGREGATES = {"min", "max", "any_value", "arbitrary", "first", "last"}
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class NotRoutable(Exception):
+    """The query cannot be answered exactly from a rollup."""
+
+
+@dataclass(frozen=True)
+class RoutedQuery:
+    sql: str
+    # Rollup view the query was rewritten to read, or None if it runs on the pitches
+    rollup: str | None = None
+
+
+@dataclass(frozen=True)
+class _Target:
+    rollup: Rollup
+    keys: frozenset[str]
+    measures: frozenset[str]
+
+
+def _fill(template: str, **names) -> dict:
+    """Parses an expression template, substituting `column` and the __arg__ placeholder node."""
+    node = parse_expression(template.format(**names))
+    argument = names.get("argument")
+    if argument is None:
+        return node
+
+    def substitute(value):
+        if isinstance(value, dict):
+            if column_name(value) == "__arg__":
+                return copy.deepcopy(argument)
+            return {k: substitute(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [substitute(v) for v in value]
+        return value
+
+    return substitute(node)
+
+
+class _Rewriter:
+    """Rewrites one SELECT node against one rollup, raising NotRoutable as soon as something does not fit."""
+
+    def __init__(self, target: _Target, aliases: set[str]):
+        self.target = target
+        self.aliases = aliases
+        self.aggregates = 0
+
+    def _only_keys(self, node) -> bool:
+        names = [column_name(n) for n in walk(node) if n.get("class") == "COLUMN_REF"]
+        return all(name in self.target.keys for name in names)
+
+    def _aggregate(self, node: dict) -> dict:
+        name = node["function_name"].lower()
+        children = node["children"]
+        if node.get("order_bys", {}).get("orders") or (node.get("filter") and not self._only_keys(node["filter"])):
+            raise NotRoutable(f"{name}() with ORDER BY or a filter on non-key columns")
+        nested = [n for n in walk(children) if n.get("class") in ("WINDOW", "SUBQUERY")
+                  or (n.get("class") == "FUNCTION" and n["function_name"].lower() in aggregate_functions())]
+        if len(children) > 1 or nested:
+            raise NotRoutable(f"unsupported arguments to {name}()")
+
+        child = children[0] if children else None
+        if child is not None and self._only_keys(child):
+            if node["distinct"] or name in KEY_PRESERVING_AGGREGATES:
+                return node
+            if name not in KEY_AGGREGATES:
+                raise NotRoutable(f"{name}() over key columns")
+            replacement = _fill(KEY_AGGREGATES[name], argument=child)
+        elif child is None:
+            if name != "count_star":
+                raise NotRoutable(f"{name}() without arguments")
+            replacement = _fill(KEY_AGGREGATES[name])
+        else:
+            column = column_name(child)
+            if column not in self.target.measures or name not in MEASURE_AGGREGATES or node["distinct"]:
+                raise NotRoutable(f"{name}() over {column or 'an expression'}")
+            replacement = _fill(MEASURE_AGGREGATES[name], column=column)
+
+        if node.get("filter"):
+            for inner in walk(replacement):
+                if inner.get("class") == "FUNCTION" and inner["function_name"].lower() in ("sum", "min", "max"):
+                    inner["filter"] = copy.deepcopy(node["filter"])
+        replacement["alias"] = node.get("alias", "")
+        return replacement
+
+    def rewrite(self, value, allow_aliases: bool = False):
+        if isinstance(value, list):
+            return [self.rewrite(v, allow_aliases) for v in value]
+        if not isinstance(value, dict):
+            return value
+        kind = value.get("class")
+        if kind in ("SUBQUERY", "WINDOW"):
+            raise NotRoutable(f"{kind.lower()} expressions")
+        if kind == "COLUMN_REF":
+            name = column_name(value)
+            if name in self.target.keys or (allow_aliases and name in self.aliases):
+                return value
+            raise NotRoutable(f"column {name} is not a rollup key")
+        if kind == "FUNCTION" and value["function_name"].lower() in aggregate_functions():
+            self.aggregates += 1
+            return self._aggregate(value)
+        return {k: self.rewrite(v, allow_aliases) for k, v in value.items()}
+
+
+def rewrite_for_rollup(select: dict, target: _Target) -> dict:
+    """
+    Returns a copy of a single-table SELECT on v_statcast rewritten to read `target`.
+
+    Raises:
+        NotRoutable: If the query is not an aggregate over the rollup's keys and measures.
+    """
+    source = select["from_table"]
+    if source.get("type") != "BASE_TABLE" or source["table_name"].lower() != SOURCE_VIEW or source.get("schema_name"):
+        raise NotRoutable(f"not a query on {SOURCE_VIEW} alone")
+    if select["cte_map"]["map"] or select.get("qualify") or select.get("sample") or source.get("sample"):
+        raise NotRoutable("CTEs, QUALIFY or SAMPLE")
+
+    aliases = {item["alias"] for item in select["select_list"] if item.get("alias")}
+    rewriter = _Rewriter(target, aliases)
+    routed = copy.deepcopy(select)
+    select_list = []
+    for item in select["select_list"]:
+        rewritten = rewriter.rewrite(item)
+        if rewritten is not item and not item.get("alias"):
+            # Keep the result column named after the original expression
+            rewritten["alias"] = render_expression(item)
+        select_list.append(rewritten)
+    routed["select_list"] = select_list
+    routed["where_clause"] = rewriter.rewrite(select["where_clause"])
+    routed["group_expressions"] = rewriter.rewrite(select["group_expressions"], allow_aliases=True)
+    routed["having"] = rewriter.rewrite(select["having"], allow_aliases=True)
+    routed["modifiers"] = rewriter.rewrite(select["modifiers"], allow_aliases=True)
+
+    grouped = bool(select["group_expressions"]) or select["aggregate_handling"] == "FORCE_AGGREGATES"
+    if not grouped and not rewriter.aggregates:
+        # Without aggregation the pitches themselves are the answer
+        raise NotRoutable("not an aggregate query")
+    # Keep qualified references (v_statcast.pitcher) valid on the new table
+    routed["from_table"] = {**source, "table_name": target.rollup.view, "alias": source.get("alias") or source["table_name"]}
+    return routed
+
+
+def _normalize(value):
+    if isinstance(value, (float, decimal.Decimal)):
+        return float(value)
+    return value
+
+
+def _row_key(row: tuple) -> tuple:
+    return tuple((v is None, type(v).__name__, round(v, 6) if isinstance(v, float) else v) for v in row)
+
+
+def tables_match(expected: pa.Table, actual: pa.Table, rel_tol: float = VERIFY_REL_TOL) -> bool:
+    """
+    Compares two results as multisets of rows: same column names, same rows,
+    floating-point values equal up to `rel_tol`.
+    """
+    if expected.column_names != actual.column_names or expected.num_rows != actual.num_rows:
+        return False
+    left = sorted((tuple(map(_normalize, row.values())) for row in expected.to_pylist()), key=_row_key)
+    right = sorted((tuple(map(_normalize, row.values())) for row in actual.to_pylist()), key=_row_key)
+    for left_row, right_row in zip(left, right):
+        for a, b in zip(left_row, right_row):
+            if isinstance(a, float) and isinstance(b, (int, float)):
+                if not math.isclose(a, b, rel_tol=rel_tol, abs_tol=rel_tol):
+                    return False
+            elif a != b:
+                return False
+    return True
+
+
+class QueryRouter:
+    """
+    Sends eligible aggregate queries on v_statcast to the smallest rollup that can
+    answer them exactly.
+
+    A rollup is only used while it exists as a view and none of its game dates are
+    stale (older than, or missing next to, the pitch files). That is re-checked
+    whenever the data version changes.
+    """
+
+    def __init__(self, version: Callable[[], str], enabled: bool = ROLLUP_ROUTING, verify: bool = ROLLUP_VERIFY):
+        self.version = version
+        self.enabled = enabled
+        self.verify = verify
+        self._views: dict[str, set[str]] = {}
+        self._usable: list[_Target] = []
+        self._usable_version = None
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.not_routed = 0
+        self.verified = 0
+        self.mismatches = 0
+
+    def load(self, con):
+        """Reads the columns of each rollup view with the given DuckDB cursor. Called at startup."""
+        views = {}
+        for rollup in ROLLUPS:
+            try:
+                views[rollup.view] = {row[0] for row in con.execute(f"DESCRIBE {rollup.view}").fetchall()}
+            except Exception:
+                logging.info(f"Rollup view '{rollup.view}' not found; queries will not be routed to it.")
+        with self._lock:
+            self._views = views
+            self._usable_version = None
+
+    def _targets(self) -> list[_Target]:
+        version = self.version()
+        with self._lock:
+            if version == self._usable_version:
+                return self._usable
+            usable = []
+            for rollup in ROLLUPS:
+                columns = self._views.get(rollup.view)
+                if columns is None:
+                    continue
+                stale = stale_days(rollup, PARQUET_DIR)
+                if stale:
+                    logging.warning(f"Rollup '{rollup.name}' is stale for {len(stale)} day(s); run `python -m etl.rollups`.")
+                    continue
+                measures = {c[:-len("_sum")] for c in columns if c.endswith("_sum")}
+                keys = {c for c in columns if c != PITCH_COUNT_COLUMN and not c.endswith(MEASURE_SUFFIXES)}
+                usable.append(_Target(rollup, frozenset(keys | PARTITION_KEYS), frozenset(measures)))
+            self._usable, self._usable_version = usable, version
+            return usable
+
+    def route(self, sql: str) -> RoutedQuery:
+        """Returns the SQL to run: rewritten to read a rollup when possible, otherwise unchanged."""
+        if not self.enabled or SOURCE_VIEW not in sql.lower():
+            return RoutedQuery(sql)
+        select = single_select(parse_sql(sql))
+        if select is not None:
+            for target in self._targets():
+                try:
+                    routed = rewrite_for_rollup(select, target)
+                except NotRoutable as e:
+                    logging.debug(f"Not routed to {target.rollup.view}: {e}")
+                    continue
+                self.routed += 1
+                return RoutedQuery(render_sql({"statements": [{"node": routed}]}), target.rollup.view)
+        self.not_routed += 1
+        return RoutedQuery(sql)
+
+    def compare(self, sql: str, routed: RoutedQuery, expected: pa.Table | None, actual: pa.Table | None) -> RoutedQuery:
+        """
+        Compares the answer of the original statement `sql` (`expected`) with that of its
+        rollup rewrite `routed` (`actual`). If they differ the mismatch is logged and the
+        original query is returned instead.
+        """
+        self.verified += 1
+        if expected is None or actual is None or not tables_match(expected, actual):
+            self.mismatches += 1
+            logging.error(f"Rollup answer differs from {SOURCE_VIEW}; serving the original query.\n"
+                          f"  original: {sql}\n  routed:   {routed.sql}")
+            return RoutedQuery(sql)
+        return routed
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "verify": self.verify,
+            "rollups": [target.rollup.view for target in self._usable],
+            "routed": self.routed,
+            "not_routed": self.not_routed,
+            "verified": self.verified,
+            "mismatches": self.mismatches,
+        }
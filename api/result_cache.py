@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from db.duckdb_init import data_version
+
+# --- Cache Configuration ---
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESULT_CACHE_MAX_ENTRY_BYTES", str(32 * 1024 * 1024)))
+# How often (seconds) to re-stat the Parquet files behind the views
+DATA_VERSION_CHECK_INTERVAL = float(os.getenv("DATA_VERSION_CHECK_INTERVAL", "5"))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Collapses whitespace outside of quoted strings and identifiers and drops
+    trailing semicolons, so formatting differences map to the same cache key.
+    """
+    out = []
+    quote = None
+    pending_space = False
+    for char in sql.strip():
+        if quote:
+            out.append(char)
+            if char == quote:
+                quote = None
+            continue
+        if char.isspace():
+            pending_space = True
+            continue
+        if pending_space and out:
+            out.append(" ")
+        pending_space = False
+        if char in ("'", '"'):
+            quote = char
+        out.append(char)
+    return "".join(out).rstrip(";").rstrip()
+
+
+class ResultCache:
+    """
+    A byte-bounded LRU of query results (Arrow tables, sized by their buffers), keyed on
+    (data version, canonical SQL).
+
+    When the data version changes, every entry from the old version is dropped.
+    Concurrent misses for the same key are collapsed into a single execution;
+    the other callers wait for and share its result.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, max_entry_bytes: int = RESULT_CACHE_MAX_ENTRY_BYTES,
+                 sizeof: Callable[[Any], int] = lambda table: table.nbytes,
+                 version_check_interval: float = DATA_VERSION_CHECK_INTERVAL):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.sizeof = sizeof
+        self.version_check_interval = version_check_interval
+        self._entries: OrderedDict[tuple[str, str], tuple[Any, int]] = OrderedDict()
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def current_version(self) -> str:
+        """Returns the data version, re-checking the files at most every `version_check_interval` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version_checked_at < self.version_check_interval:
+                return self._version
+        version = data_version()
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                if self._version is not None:
+                    logging.info(f"Data version changed {self._version} -> {version}; dropping cached results.")
+                self._version = version
+                self._entries.clear()
+                self.total_bytes = 0
+        return version
+
+    def expire_version(self):
+        """Makes the next lookup re-check the data version instead of waiting for the interval, e.g. after a reload."""
+        with self._lock:
+            self._version_checked_at = float("-inf")
+
+    def get_or_compute(self, sql: str, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result for `sql`, or runs `compute()` once and caches it.
+        Exceptions raised by `compute` are propagated to every waiting caller and never cached.
+        """
+        key = (self.current_version(), canonicalize_sql(sql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: tuple[str, str], value: Any):
+        if key[0] != self._version:
+            return  # Data changed while this query ran
+        size = self.sizeof(value)
+        if size > self.max_entry_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "data_version": self._version,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,79 @@
+import decimal
+from urllib.parse import quote
+
+import orjson
+import pyarrow as pa
+import pyarrow.types as pat
+from fastapi import Response
+
+# Supported values of QueryRequest.format
+RESULT_FORMATS = ("records", "columns", "json", "arrow")
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value):
+    # orjson handles str/int/float/bool/None/date/datetime natively; DuckDB DECIMALs arrive as Decimal
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return str(value)
+
+
+def dumps(value) -> bytes:
+    """Encodes a value to JSON bytes with orjson. NaN and Infinity become null."""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _column_values(column: pa.ChunkedArray):
+    # Null-free numeric columns go to orjson as a numpy view, skipping Python objects entirely
+    if column.null_count == 0 and (pat.is_integer(column.type) or pat.is_floating(column.type)):
+        return column.to_numpy()
+    return column.to_pylist()
+
+
+def columns_payload(table: pa.Table) -> dict:
+    """Column-oriented shape: one list of values per column, plus the column names and types."""
+    return {
+        "columns": [{"name": field.name, "type": str(field.type)} for field in table.schema],
+        "data": {name: _column_values(table.column(name)) for name in table.column_names},
+    }
+
+
+def arrow_ipc_bytes(table: pa.Table) -> bytes:
+    """Serializes a table as an Arrow IPC stream."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def render_response(sql_query: str, table: pa.Table, fmt: str, rows_json: bytes | None = None,
+                    extra: dict | None = None) -> Response:
+    """
+    Builds the HTTP response for a query result in the requested format.
+
+    Args:
+        sql_query: The SQL that produced the table, echoed back to the client.
+        table: The query result.
+        fmt: One of RESULT_FORMATS.
+        rows_json: For the "json" format, the rows already encoded as a JSON array.
+        extra: Additional top-level fields (e.g. `next_cursor`). For the "arrow" format
+            they are sent as `X-Next-Cursor`-style headers instead.
+    """
+    extra = extra or {}
+    if fmt == "arrow":
+        headers = {"X-SQL-Query": quote(sql_query)}
+        for key, value in extra.items():
+            if value is not None:
+                headers["X-" + key.replace("_", " ").title().replace(" ", "-")] = str(value)
+        return Response(content=arrow_ipc_bytes(table), media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+    if fmt == "json":
+        body = b'{"sql_query":' + dumps(sql_query) + b',"results":' + (rows_json or b"[]")
+        for key, value in extra.items():
+            body += b"," + dumps(key) + b":" + dumps(value)
+        return Response(content=body + b"}", media_type="application/json")
+    if fmt == "columns":
+        payload = {"sql_query": sql_query, **columns_payload(table), **extra}
+    else:
+        payload = {"sql_query": sql_query, "results": table.to_pylist(), **extra}
+    return Response(content=dumps(payload), media_type="application/json")
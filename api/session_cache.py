@@ -0,0 +1,346 @@
+"""
+Materialized row sets for follow-up questions.
+
+A follow-up ("add spin rate") arrives with the previous statement in `previous_sql`, and
+the prompt asks the model to keep its FROM and WHERE. Without help, every step of such
+a conversation rescans the Parquet files to find almost the same rows again.
+
+When a follow-up keeps every WHERE predicate of the previous statement, the rows those
+predicates select from the view are fetched once, with the columns the follow-up refers
+to, and kept as an Arrow table. The follow-up, and every later statement whose WHERE
+still contains all of those predicates and whose columns the table has, then reads the
+table instead of the view. It is registered on the cursor that runs the query, which
+still applies its own full WHERE, so narrower follow-ups stay exact.
+
+The query that fetches a row set is built from the client's `previous_sql`, so callers
+get it from `build_sql` first and run it past the cost guard, and `prepare` only
+fetches it when asked to.
+
+Row sets are keyed on the view, the predicates, the columns and the data version, not
+on the user, so two conversations about the same player share one. They are held within
+a byte budget, least recently used first, and dropped after SESSION_CACHE_TTL seconds
+unused. Filters matching more than SESSION_CACHE_MAX_ROWS rows are not materialized.
+"""
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable
+
+import pyarrow as pa
+
+from .sql_utils import parse_sql, render_expression, render_sql, single_select, walk
+
+# --- Session Cache Configuration ---
+SESSION_CACHE = os.getenv("SESSION_CACHE", "1") == "1"
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_CACHE_MAX_ENTRY_BYTES = int(os.getenv("SESSION_CACHE_MAX_ENTRY_BYTES", str(64 * 1024 * 1024)))
+# Filters matching more rows than this are left to the Parquet scan
+SESSION_CACHE_MAX_ROWS = int(os.getenv("SESSION_CACHE_MAX_ROWS", "200000"))
+# Seconds a row set is kept without being used
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "1800"))
+
+# Views whose filtered rows can be materialized
+MATERIALIZED_VIEWS = {"v_statcast", "v_plate_appearances"}
+# Predicates calling these can select different rows each time
+NONDETERMINISTIC_FUNCTIONS = {
+    "random", "setseed", "uuid", "gen_random_uuid", "now", "today", "current_date", "current_time",
+    "current_timestamp", "get_current_time", "get_current_timestamp", "transaction_timestamp",
+}
+# Filters found to match too many rows, remembered so they are not fetched again
+TOO_LARGE_MEMORY = 256
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@dataclass(frozen=True)
+class FilteredScan:
+    """A single-view SELECT, with its WHERE split into normalized AND-ed predicates."""
+    tree: dict
+    view: str
+    # Normalized SQL of each predicate -> its syntax tree node
+    predicates: dict[str, dict]
+    # Lower-cased names the statement refers to, or None if it selects every column (`*`, COLUMNS(...))
+    columns: frozenset[str] | None
+
+
+@dataclass
+class RowSet:
+    name: str
+    view: str
+    predicates: frozenset[str]
+    # None if the row set has every column of the view
+    columns: frozenset[str] | None
+    table: pa.Table
+    version: str
+    nbytes: int
+    last_used: float = field(default_factory=time.monotonic)
+    hits: int = 0
+
+
+@dataclass(frozen=True)
+class ScopedQuery:
+    sql: str
+    # Arrow tables to register on the cursor that runs `sql`
+    tables: dict[str, pa.Table] = field(default_factory=dict)
+    # Name of the row set the query reads, or None if it runs on the views
+    row_set: str | None = None
+
+
+def _conjuncts(node: dict) -> list[dict]:
+    if node.get("type") == "CONJUNCTION_AND":
+        return [c for child in node["children"] for c in _conjuncts(child)]
+    return [node]
+
+
+def _unqualified(node: dict, names: set[str]) -> dict:
+    """Copy of `node` with `v_statcast.pitcher`-style references to the scanned view reduced to `pitcher`."""
+    node = copy.deepcopy(node)
+    for ref in walk(node):
+        if ref.get("class") == "COLUMN_REF" and len(ref["column_names"]) == 2 and ref["column_names"][0].lower() in names:
+            ref["column_names"] = ref["column_names"][1:]
+    return node
+
+
+def referenced_columns(tree: dict) -> frozenset[str] | None:
+    """
+    Lower-cased parts of every column reference in `tree`, or None if it selects every
+    column. Aliases and table names come along; they match no column and are harmless.
+    """
+    names = set()
+    for node in walk(tree):
+        if node.get("class") == "STAR":
+            return None
+        if node.get("class") == "COLUMN_REF":
+            names.update(part.lower() for part in node["column_names"])
+    return frozenset(names)
+
+
+def covers(columns: frozenset[str] | None, needed: frozenset[str] | None) -> bool:
+    """Whether a row set with `columns` has every column a statement referring to `needed` may read."""
+    return columns is None or (needed is not None and needed <= columns)
+
+
+def filtered_scan(sql: str | None) -> FilteredScan | None:
+    """
+    Parses `sql` if it is a single SELECT reading one materializable view directly, with a
+    deterministic WHERE clause. Returns None for anything else.
+    """
+    if not sql:
+        return None
+    tree = parse_sql(sql)
+    select = single_select(tree)
+    if select is None or select["cte_map"]["map"] or not select.get("where_clause"):
+        return None
+    source = select["from_table"]
+    if source.get("type") != "BASE_TABLE" or source.get("schema_name") or source.get("sample") \
+            or source["table_name"].lower() not in MATERIALIZED_VIEWS:
+        return None
+    if any(n.get("class") == "FUNCTION" and n["function_name"].lower() in NONDETERMINISTIC_FUNCTIONS
+           for n in walk(select["where_clause"])):
+        return None
+    names = {source["table_name"].lower(), (source.get("alias") or "").lower()} - {""}
+    predicates = {}
+    for conjunct in _conjuncts(select["where_clause"]):
+        node = _unqualified(conjunct, names)
+        predicates[render_expression(node)] = node
+    return FilteredScan(tree, source["table_name"].lower(), predicates, referenced_columns(tree))
+
+
+def _row_set_name(view: str, predicates: frozenset[str], columns: frozenset[str] | None, version: str) -> str:
+    parts = [view, version, *sorted(predicates), "\x1e", *sorted(columns or ["*"])]
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f"_rows_{digest[:16]}"
+
+
+def _row_set_query(scan: FilteredScan, columns: frozenset[str] | None) -> str:
+    """SELECT of `columns` (only those the view has) from `scan`'s view, filtered by its predicates."""
+    where = " AND ".join(f"({text})" for text in sorted(scan.predicates))
+    if columns is None:
+        return f"SELECT * FROM {scan.view} WHERE {where}"
+    names = ", ".join("'" + name.replace("'", "''") + "'" for name in sorted(columns))
+    return f"SELECT COLUMNS(c -> lower(c) IN ({names})) FROM {scan.view} WHERE {where}"
+
+
+class SessionCache:
+    """Builds, finds and evicts materialized row sets, and rewrites statements to read them."""
+
+    def __init__(self, version: Callable[[], str], execute: Callable[[str], pa.Table], enabled: bool = SESSION_CACHE,
+                 max_bytes: int = SESSION_CACHE_MAX_BYTES, max_entry_bytes: int = SESSION_CACHE_MAX_ENTRY_BYTES,
+                 max_rows: int = SESSION_CACHE_MAX_ROWS, ttl_seconds: float = SESSION_CACHE_TTL):
+        """
+        Args:
+            version: Returns the current data version; row sets of other versions are dropped.
+            execute: Runs a SELECT and returns its result as an Arrow table, without caching it.
+        """
+        self.version = version
+        self.execute = execute
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self._row_sets: OrderedDict[str, RowSet] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._too_large: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = self.misses = self.materialized = self.too_large = self.failures = 0
+        self.evictions = self.expired = 0
+
+    def _drop(self, name: str):
+        row_set = self._row_sets.pop(name)
+        self.total_bytes -= row_set.nbytes
+
+    def _sweep(self, version: str):
+        """Drops row sets of an older data version or unused for longer than the TTL. Caller holds the lock."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        for name, row_set in list(self._row_sets.items()):
+            if row_set.version != version or row_set.last_used < cutoff:
+                self._drop(name)
+                self.expired += 1
+
+    def _find(self, scan: FilteredScan, version: str, count: bool = True) -> RowSet | None:
+        """The smallest row set whose predicates `scan` all keeps and that has the columns it reads."""
+        with self._lock:
+            self._sweep(version)
+            candidates = [r for r in self._row_sets.values()
+                          if r.view == scan.view and r.predicates <= scan.predicates.keys()
+                          and covers(r.columns, scan.columns)]
+            if not count:
+                return min(candidates, key=lambda r: r.table.num_rows, default=None)
+            if not candidates:
+                return None
+            row_set = min(candidates, key=lambda r: r.table.num_rows)
+            row_set.last_used = time.monotonic()
+            row_set.hits += 1
+            self._row_sets.move_to_end(row_set.name)
+            self.hits += 1
+            return row_set
+
+    def _build(self, scan: FilteredScan, columns: frozenset[str] | None, version: str) -> RowSet | None:
+        """
+        Fetches `columns` of the rows `scan`'s predicates select from its view, once per filter
+        even when called concurrently.
+        """
+        predicates = frozenset(scan.predicates)
+        name = _row_set_name(scan.view, predicates, columns, version)
+        with self._lock:
+            if name in self._too_large:
+                return None
+            future = self._inflight.get(name)
+            leader = future is None
+            if leader:
+                future = self._inflight[name] = Future()
+        if not leader:
+            return future.result()
+
+        row_set = None
+        where = " AND ".join(f"({text})" for text in sorted(predicates))
+        try:
+            started = time.perf_counter()
+            table = self.execute(f"{_row_set_query(scan, columns)} LIMIT {self.max_rows + 1}")
+            seconds = time.perf_counter() - started
+            if table.num_rows > self.max_rows or table.nbytes > self.max_entry_bytes:
+                logging.info(f"Not materializing {scan.view} WHERE {where}: more than {self.max_rows:,} rows "
+                             f"or {self.max_entry_bytes / 1e6:.0f} MB.")
+                with self._lock:
+                    self.too_large += 1
+                    self._too_large[name] = None
+                    while len(self._too_large) > TOO_LARGE_MEMORY:
+                        self._too_large.popitem(last=False)
+            else:
+                row_set = RowSet(name, scan.view, predicates, columns, table, version, table.nbytes)
+                current = self.version()
+                with self._lock:
+                    self.materialized += 1
+                    if version == current:  # Otherwise the data changed while the rows were fetched
+                        self._row_sets[name] = row_set
+                        self.total_bytes += row_set.nbytes
+                        while self.total_bytes > self.max_bytes and len(self._row_sets) > 1:
+                            self._drop(next(iter(self._row_sets)))
+                            self.evictions += 1
+                logging.info(f"Materialized {table.num_rows:,} rows ({table.nbytes / 1e6:.1f} MB) of "
+                             f"{scan.view} WHERE {where} as {name} in {seconds:.2f}s.")
+        except Exception as e:
+            self.failures += 1
+            logging.warning(f"Could not materialize the rows of {scan.view} for a follow-up: {e}")
+        finally:
+            with self._lock:
+                del self._inflight[name]
+            future.set_result(row_set)
+        return row_set
+
+    def _follows(self, scan: FilteredScan, previous_sql: str | None) -> FilteredScan | None:
+        """`previous_sql` parsed, if `scan` keeps every one of its predicates."""
+        previous = filtered_scan(previous_sql)
+        if previous is not None and previous.view == scan.view and previous.predicates.keys() <= scan.predicates.keys():
+            return previous
+        return None
+
+    def build_sql(self, sql: str, previous_sql: str | None) -> str | None:
+        """
+        The query `prepare(sql, previous_sql)` would run to materialize a row set (without its
+        row cap), or None if it would run none. Callers check it before letting `prepare` run it.
+        """
+        if not self.enabled:
+            return None
+        scan = filtered_scan(sql)
+        if scan is None or self._find(scan, self.version(), count=False) is not None:
+            return None
+        previous = self._follows(scan, previous_sql)
+        if previous is None:
+            return None
+        with self._lock:
+            if _row_set_name(previous.view, frozenset(previous.predicates), scan.columns, self.version()) in self._too_large:
+                return None
+        return _row_set_query(previous, scan.columns)
+
+    def prepare(self, sql: str, previous_sql: str | None = None) -> ScopedQuery:
+        """
+        Returns `sql` rewritten to read a materialized row set when one covers it. A statement
+        that keeps every predicate of `previous_sql` first materializes that filter's rows,
+        with the columns `sql` refers to; see `build_sql`. Anything else is returned unchanged. Blocking.
+        """
+        if not self.enabled:
+            return ScopedQuery(sql)
+        scan = filtered_scan(sql)
+        if scan is None:
+            return ScopedQuery(sql)
+        version = self.version()
+        row_set = self._find(scan, version)
+        if row_set is None:
+            previous = self._follows(scan, previous_sql)
+            if previous is not None:
+                self.misses += 1
+                row_set = self._build(previous, scan.columns, version)
+        if row_set is None:
+            return ScopedQuery(sql)
+
+        # Qualified references (v_statcast.pitcher) keep working through the alias
+        select = single_select(scan.tree)
+        source = select["from_table"]
+        select["from_table"] = {**source, "table_name": row_set.name, "alias": source.get("alias") or source["table_name"]}
+        return ScopedQuery(render_sql(scan.tree), {row_set.name: row_set.table}, row_set.name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._row_sets),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "rows": sum(r.table.num_rows for r in self._row_sets.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "materialized": self.materialized,
+                "too_large": self.too_large,
+                "failures": self.failures,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
@@ -1,118 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
 import os
 import logging
-from openai import OpenAI
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-import httpx
+
+# openai and httpx are imported by get_llm_client, so questions answered by templates never load them
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+from .metrics import LLM_SECONDS
+from .player_index import get_player_index
+from .prompt_builder import PROMPT_FINGERPRINT, build_messages
+from .sql_templates import match_template
+from .translation_cache import TranslationCache
 
 load_dotenv()
 API_KEY = os.getenv("OPENAI_API_KEY")
+BASE_URL = os.getenv("OPENAI_BASE_URL")  # Optional, e.g. a local stub server for load tests
 MODEL = "gpt-4o-mini"
+
+# --- LLM Client Configuration ---
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT", "30"))
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def nl_to_sql(question: str, previous_sql: str | None = None) -> str:
-    http_client = httpx.Client(proxies=None)
-    client = OpenAI(api_key=API_KEY, http_client=http_client)
-    
-    system_prompt = f"""
-You are an expert DuckDB SQL code generator. Your goal is to write the most efficient query possible.
-
-Here are all columns available in statcast pitch data for SQL queries:
-pitch_type,game_date,release_speed,release_pos_x,release_pos_z,player_name,batter,pitcher,
-events,description,zone,des,game_type,stand,p_throws,home_team,away_team,type,hit_location,bb_type,
-balls,strikes,game_year,pfx_x,pfx_z,plate_x,plate_z,on_3b,on_2b,on_1b,outs_when_up,inning,
-inning_topbot,hc_x,hc_y,
-tfs_deprecated,tfs_zulu_deprecated,umpire,sv_id,vx0,vy0,vz0,ax,ay,az,sz_top,sz_bot,hit_distance_sc,
-launch_speed,launch_angle,effective_speed,release_spin_rate,release_extension,game_pk,fielder_2,
-fielder_3,fielder_4,fielder_5,fielder_6,fielder_7,fielder_8,fielder_9,release_pos_y,
-estimated_ba_using_speedangle,estimated_woba_using_speedangle,woba_value,woba_denom,babip_value,
-iso_value,launch_speed_angle,at_bat_number,pitch_number,pitch_name,home_score,away_score,bat_score,
-fld_score,post_away_score,post_home_score,post_bat_score,post_fld_score,if_fielding_alignment,
-of_fielding_alignment,spin_axis,delta_home_win_exp,delta_run_exp,bat_speed,swing_length,
-estimated_slg_using_speedangle,delta_pitcher_run_exp,hyper_speed,home_score_diff,bat_score_diff,
-home_win_exp,bat_win_exp,age_pit_legacy,age_bat_legacy,age_pit,age_bat,n_thruorder_pitcher,
-n_priorpa_thisgame_player_at_bat,pitcher_days_since_prev_game,batter_days_since_prev_game,
-pitcher_days_until_next_game,batter_days_until_next_game,api_break_z_with_gravity,
-api_break_x_arm,api_break_x_batter_in,arm_angle,attack_angle,attack_direction,swing_path_tilt,
-intercept_ball_minus_batter_pos_x_inches,intercept_ball_minus_batter_pos_y_inches
-
-Here is a sample row based on the above:
-2841,FF,2025-07-25,100.0,-2.24,6.04,Halvorsen,Seth,702616,678020,field_out,hit_into_play,
-2,Jackson Holliday flies out to left fielder Jor...,R,L,R,
-BAL,COL,X,7,fly_ball,2,2,2025,-1.04,1.16,-0.22,2.95,<NA>,<NA>,<NA>,2,9,Bot,28.6,91.34,
-<NA>,<NA>,<NA>,<NA>,8.104533,-145.277869,-5.909473,-16.665086,33.898785,-14.591134,3.39,
-1.6,357,96.1,32,100.9,2187,6.9,777020,696100,669911,642731,606115,678662,687597,666160,
-671289,53.62,0.209,0.361,0.0,1,0,0,5,74,5,4-Seam Fastball,5,6,5,6,6,5,5,6,Standard,Standard,
-220,-0.044,-0.223,71.4,6.2,0.674,0.223,96.1,-1,-1,0.044,0.044,25,21,25,22,1,4,3,1,3,1,1.13,
-1.04,-1.04,48.2,3.887941,16.383637,25.786774,39.142809,21.003173
-
-**DATABASE SCHEMA:**
-1.  `v_statcast`: Game event data. Contains `player_name` ('Last, First') and the `pitcher` ID. **Use this for questions about game events (speed, spin, pitch types).**
-2.  `v_lahman_people`: Biographical data. Contains `nameFirst`, `nameLast`, `debut`, `throws`, etc. **Use this for questions about player careers.**
-3.  `v_player_map`: Links the other two views.
-
-Here are some of the most relevant columns in the `v_statcast` view:
-- `pitch_type`, `game_date`, `release_speed`, `release_spin_rate`
-- `player_name` (Pitcher's Name: 'Last, First')
-- `pitcher` (Pitcher's MLBAM ID)
-- `batter` (Batter's MLBAM ID)
-- `events` (The final outcome of the at-bat, e.g., 'strikeout', 'home_run'. Can be NULL.)
-- `description` (The outcome of the individual pitch, e.g., 'ball', 'called_strike', 'swinging_strike'.)
-- `des` (A human-readable text description of the entire at-bat's outcome.)
-
-**LOGICAL HIERARCHY FOR QUERIES (CRITICAL):**
-When a question involves both a player and a specific pitch outcome, you MUST prioritize the data columns in this order:
-1.  **For Individual Pitch Outcomes:** The `description` column is the absolute source of truth (e.g., 'swinging_strike', 'called_strike').
-2.  **For At-Bat Outcomes:** The `events` column is the source of truth (e.g., 'strikeout', 'walk', 'home_run').
-3.  **For Identifying the Hitter in an At-Bat:** The `des` column should be used ONLY to identify the hitter involved (e.g., `WHERE des LIKE 'Jackson Holliday%'`). Do not use it to determine the outcome of a specific pitch if `description` or `events` is more appropriate.
-
-**HITTER INFORMATION LOGIC:**
-- **To identify a hitter in a query,** filter `v_statcast` using a `LIKE` clause on the `des` column. Example: `WHERE des LIKE 'Player Name%'`.
-- **To display a hitter's name in the results,** you MUST `JOIN` to the `v_player_map` view using the condition `v_statcast.batter = v_player_map.key_mlbam`. You can then select `name_first` and `name_last`.
-
-**QUERY STRATEGY:**
-0.  **Follow the Logical Hierarchy** described above to choose the right columns for filtering.
-1.  **IDENTIFY THE CORE QUESTION:** What is the user asking about? What information would they actually want and care about? 
-    - When the user asks for specific pitches and events, include basic data as well to give more context about the players, date, game, etc (and the column 'des', not 'description')
-2.  **CHOOSE THE STARTING TABLE:**
-    - If it's a game event question (e.g., "fastest pitch"), your `FROM` clause MUST start with `v_statcast`.
-    - If it's a biographical question (e.g., "debut date"), your `FROM` clause SHOULD start with `v_lahman_people`.
-3.  **JOIN ONLY WHEN NECESSARY:** Only join to other tables if the question requires data from them.
-4.  **USE `DISTINCT` or `LIMIT 1` for single-value answers:** If a user asks for a single piece of information that doesn't change (like a debut date), ensure you return only one row.
-5.  **Start with the most relevant table:** `v_statcast` for game events, `v_lahman_people` for career data.
-6.  **To count at-bat outcomes** (like strikeouts or home runs), you MUST use `COUNT(DISTINCT at_bat_number)` to avoid overcounting based on pitches.
-
-**Player Name Logic:**
-- To find a **pitcher** in `v_statcast`, use `WHERE player_name = 'Last, First'`.
-- To find a **hitter** in `v_statcast`, use the `HITTER INFORMATION LOGIC` described above.
-- To find a player in `v_lahman_people`, use `WHERE nameFirst = 'First' AND nameLast = 'Last'`.
-
-**HANDLING FOLLOW-UP REQUESTS:**
-If a `previous_sql` query is provided, the user's new question is a request to MODIFY that query.
-- If they ask to "add a column" (e.g., "add spin rate"), you MUST re-use the entire `FROM`, `WHERE`, `GROUP BY`, and `ORDER BY` clauses from the `previous_sql` and only change the columns in the `SELECT` statement.
-- Treat this as a modification, not a brand-new question.
-
-Only output the raw SQL query.
-"""
+_client: AsyncOpenAI | None = None
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """
+    Returns the process-wide async OpenAI client, creating it on first use.
+
+    The client keeps a pool of keep-alive connections so consecutive requests
+    reuse the same TLS session instead of reconnecting every time.
+    """
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            ),
+            timeout=LLM_TIMEOUT_SECONDS,
+        )
+        _client = AsyncOpenAI(api_key=API_KEY, base_url=BASE_URL, http_client=http_client)
+    return _client
+
+
+async def close_llm_client():
+    """Closes the shared client and its connection pool. Called at API shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+
+# Any edit to the prompt changes this version and invalidates cached translations
+PROMPT_VERSION = hashlib.sha256(f"{MODEL}\n{PROMPT_FINGERPRINT}".encode("utf-8")).hexdigest()[:16]
+
+_translation_cache: TranslationCache | None = None
+
+
+def get_translation_cache() -> TranslationCache:
+    """Returns the process-wide translation cache, opening it on first use."""
+    global _translation_cache
+    if _translation_cache is None:
+        _translation_cache = TranslationCache(PROMPT_VERSION)
+    return _translation_cache
+
 
+def close_translation_cache():
+    global _translation_cache
+    if _translation_cache is not None:
+        _translation_cache.close()
+        _translation_cache = None
+
+
+def describe_players(question: str) -> str:
+    """
+    Resolves player names mentioned in the question to MLBAM IDs, formatted for the prompt.
+    Returns an empty string if nothing resolves or the player index is not loaded.
+    """
+    index = get_player_index()
+    if index is None:
+        return ""
+    lines = []
+    for match in index.find_in_text(question):
+        player = match.player
+        years = f", {player.debut_year}-{player.final_year}" if player.debut_year else ""
+        lines.append(f"- {match.matched_text} -> {player.full_name} (MLBAM {player.mlbam_id}{years})")
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class Translation:
+    sql: str
+    # Which path produced the SQL: "template:<name>", "cache", "llm" or "error"
+    served_by: str
+
+
+_template_stats = {"matched": {}, "fallbacks": 0}
+
+
+def template_stats() -> dict:
+    """Fast-path hits per template and questions that fell through to the cache or LLM."""
+    return {"matched": dict(_template_stats["matched"]), "fallbacks": _template_stats["fallbacks"]}
+
+
+async def translate(question: str, previous_sql: str | None = None) -> Translation:
+    """
+    Translates a question into SQL: a local template when one matches with confidence,
+    else the translation cache, else the LLM.
+    """
+    # Follow-ups modify the previous query, which only the LLM can do
+    if previous_sql is None:
+        template = await asyncio.to_thread(match_template, question)
+        if template is not None:
+            logging.info(f"Template '{template.template}' matched: {template.sql}")
+            _template_stats["matched"][template.template] = _template_stats["matched"].get(template.template, 0) + 1
+            return Translation(template.sql, f"template:{template.template}")
+    _template_stats["fallbacks"] += 1
+
+    # The cache may read or write its SQLite file; keep that off the event loop too
+    cache = get_translation_cache()
+    cached_sql = await asyncio.to_thread(cache.get, question, previous_sql)
+    if cached_sql is not None:
+        logging.info(f"Translation cache hit: {cached_sql}")
+        return Translation(cached_sql, "cache")
+
+    # Fuzzy name matching and column retrieval are CPU work; keep them off the event loop
+    resolved_players = await asyncio.to_thread(describe_players, question)
+    messages = await asyncio.to_thread(build_messages, question, previous_sql, resolved_players)
+
+    start = time.perf_counter()
     try:
+        client = get_llm_client()
         logging.info(f"Sending request to OpenAI API with model {MODEL}...")
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Previous SQL: `{previous_sql if previous_sql else 'None'}`\n\nNew Request: {question}"}
-            ],
+            messages=messages,
             max_tokens=500,
             temperature=0,
         )
+        LLM_SECONDS.observe(time.perf_counter() - start, outcome="ok")
         sql_query = response.choices[0].message.content.strip().replace("```sql", "").replace("```", "").replace(";", "")
         logging.info(f"Received SQL from LLM: {sql_query}")
-        return sql_query
+        await asyncio.to_thread(cache.set, question, previous_sql, sql_query)
+        return Translation(sql_query, "llm")
     
     except Exception as e:
+        LLM_SECONDS.observe(time.perf_counter() - start, outcome="error")
         logging.error(f"Error calling OpenAI API: {e}")
-        return "SELECT 'Error generating SQL, please check API logs' AS error;"
-    
-
+        return Translation("SELECT 'Error generating SQL, please check API logs' AS error;", "error")
 
 
+async def nl_to_sql(question: str, previous_sql: str | None = None) -> str:
+    return (await translate(question, previous_sql)).sql
@@ -0,0 +1,361 @@
+"""
+Cost guard for generated SQL.
+
+Every statement is parsed and EXPLAINed before it runs. The guard estimates the
+rows and files it will scan, rejects plans over budget, and adds a LIMIT when the
+statement has none (which also makes an unfiltered `SELECT *` stop early instead
+of reading every file). Plans that scan a lot must also take one of a few
+"heavy scan" slots, so a burst of full-table queries cannot oversubscribe the process.
+
+DuckDB cuts short the EXPLAIN box of an operator with many columns (a wide `SELECT *`),
+and with it the row estimate. A scan whose estimate is missing is counted as reading
+every row of the files behind the views it may read, taken from the Parquet footers,
+so the guard fails closed.
+"""
+import asyncio
+import logging
+import operator
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from db.duckdb_init import PARQUET_DIR, VIEW_SOURCES
+from .sql_utils import column_name, parse_sql, render_sql, single_select, walk
+
+# --- Guard Configuration ---
+SQL_GUARD = os.getenv("SQL_GUARD", "1") == "1"
+# Plans estimated to read more rows or files than this are rejected (unless they stop early at a LIMIT)
+GUARD_MAX_SCAN_ROWS = int(os.getenv("GUARD_MAX_SCAN_ROWS", "20000000"))
+GUARD_MAX_FILES = int(os.getenv("GUARD_MAX_FILES", "5000"))
+# Cross products and non-equi joins are rejected when the product of their inputs exceeds this
+GUARD_MAX_JOIN_ROWS = int(os.getenv("GUARD_MAX_JOIN_ROWS", "50000000"))
+# LIMIT added to statements without one
+GUARD_ROW_LIMIT = int(os.getenv("GUARD_ROW_LIMIT", "100000"))
+# Plans scanning at least this many rows need a heavy-scan slot
+GUARD_HEAVY_SCAN_ROWS = int(os.getenv("GUARD_HEAVY_SCAN_ROWS", "1000000"))
+GUARD_MAX_HEAVY_SCANS = int(os.getenv("GUARD_MAX_HEAVY_SCANS", "2"))
+GUARD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GUARD_QUEUE_TIMEOUT", "10"))
+# Accepted statements remembered per data version, so repeat queries skip the EXPLAIN
+GUARD_CACHE_SIZE = 1024
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# EXPLAIN draws each operator as a box of this many characters
+_BOX_WIDTH = 29
+_ESTIMATE = re.compile(r"^EC: (\d+)")
+_SCAN_OPERATORS = {"READ_PARQUET", "PARQUET_SCAN", "SEQ_SCAN", "TABLE_SCAN"}
+# Joins whose output can be the product of their inputs
+_PRODUCT_JOINS = {"CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN", "PIECEWISE_MERGE_JOIN"}
+# A plan made only of these stops reading as soon as its LIMIT is filled
+_STREAMING_OPERATORS = _SCAN_OPERATORS | {"PROJECTION", "FILTER", "STREAMING_LIMIT", "LIMIT", "DUMMY_SCAN"}
+# DuckDB scales a scan's estimate by this when filters are pushed into it; undo it to get rows read
+_DUCKDB_FILTER_SELECTIVITY = 0.2
+PARTITION_COLUMNS = ("game_year", "game_month")
+
+_COMPARISONS = {
+    "COMPARE_EQUAL": operator.eq, "COMPARE_LESSTHAN": operator.lt, "COMPARE_LESSTHANOREQUALTO": operator.le,
+    "COMPARE_GREATERTHAN": operator.gt, "COMPARE_GREATERTHANOREQUALTO": operator.ge,
+}
+# `2024 < game_year` is `game_year > 2024`
+_FLIPPED = {operator.eq: operator.eq, operator.lt: operator.gt, operator.le: operator.ge,
+            operator.gt: operator.lt, operator.ge: operator.le}
+
+
+class QueryRejected(Exception):
+    """The statement is not allowed or its plan is over the cost budget."""
+
+
+class ScanCapacityExceeded(Exception):
+    """No heavy-scan slot became free in time."""
+
+
+@dataclass(frozen=True)
+class PlanOperator:
+    name: str
+    cardinality: int | None  # DuckDB's estimate ("EC"), None if the box was cut before it
+    filtered: bool  # Filters were pushed into this scan
+
+
+@dataclass(frozen=True)
+class GuardedQuery:
+    sql: str
+    scanned_rows: int
+    files: int
+    # The LIMIT the guard added, or None if the statement already had one
+    row_limit: int | None
+    heavy: bool
+
+
+def plan_operators(plan: str) -> list[PlanOperator]:
+    """Reads the operators and their estimated cardinalities from EXPLAIN's box drawing."""
+    operators, open_boxes = [], {}
+    for line in plan.splitlines():
+        for start in range(0, len(line), _BOX_WIDTH):
+            cell = line[start:start + _BOX_WIDTH]
+            if cell.startswith("┌"):
+                open_boxes[start] = []
+            elif cell.startswith("└") and start in open_boxes:
+                lines = [text for text in open_boxes.pop(start) if text and not text.startswith("─")]
+                if lines:
+                    ec = next((int(m.group(1)) for m in map(_ESTIMATE.match, lines) if m), None)
+                    filtered = any(text.startswith("Filters:") for text in lines)
+                    operators.append(PlanOperator(lines[0], ec, filtered))
+            elif cell.startswith("│") and start in open_boxes:
+                open_boxes[start].append(cell.strip("│├┤ "))
+    return operators
+
+
+def _constant(node: dict):
+    if node.get("class") != "CONSTANT" or node["value"].get("is_null"):
+        return None
+    try:
+        return int(node["value"]["value"])
+    except (TypeError, ValueError):
+        return None
+
+
+def _conjuncts(node: dict) -> list[dict]:
+    if node.get("type") == "CONJUNCTION_AND":
+        return [c for child in node["children"] for c in _conjuncts(child)]
+    return [node]
+
+
+def _partition_predicate(node: dict) -> tuple[str, Callable[[int], bool]] | None:
+    """(partition column, test on its value) for a literal filter such as `game_year = 2024`, else None."""
+    kind = node.get("type")
+    if kind in _COMPARISONS:
+        compare = _COMPARISONS[kind]
+        left, right = node["left"], node["right"]
+        if column_name(right) in PARTITION_COLUMNS:
+            left, right, compare = right, left, _FLIPPED[compare]
+        column, value = column_name(left), _constant(right)
+        if column in PARTITION_COLUMNS and value is not None:
+            return column, lambda v: compare(v, value)
+    elif kind == "COMPARE_IN":
+        column, values = column_name(node["children"][0]), {_constant(c) for c in node["children"][1:]}
+        if column in PARTITION_COLUMNS and None not in values:
+            return column, lambda v: v in values
+    elif kind == "COMPARE_BETWEEN":
+        column, low, high = column_name(node["input"]), _constant(node["lower"]), _constant(node["upper"])
+        if column in PARTITION_COLUMNS and low is not None and high is not None:
+            return column, lambda v: low <= v <= high
+    return None
+
+
+def _partition_predicates(tree: dict) -> list[tuple[str, Callable[[int], bool]]]:
+    """
+    Literal filters on the partition columns found in any WHERE clause of the statement.
+    This is an estimate: a filter in one subquery is assumed to prune every partitioned scan.
+    """
+    predicates = []
+    for node in walk(tree):
+        if node.get("type") == "SELECT_NODE" and node.get("where_clause"):
+            for conjunct in _conjuncts(node["where_clause"]):
+                predicate = _partition_predicate(conjunct)
+                if predicate is not None:
+                    predicates.append(predicate)
+    return predicates
+
+
+def _hive_keys(path) -> dict[str, int]:
+    keys = {}
+    for part in path.parts:
+        name, _, value = part.partition("=")
+        if value.isdigit():
+            keys[name] = int(value)
+    return keys
+
+
+def has_limit(node: dict) -> bool:
+    return any(m.get("type") in ("LIMIT_MODIFIER", "LIMIT_PERCENT_MODIFIER") for m in node.get("modifiers", []))
+
+
+def add_limit(tree: dict, limit: int) -> str | None:
+    """SQL of the statement with `LIMIT limit` appended, or None if it already has a LIMIT."""
+    node = tree["statements"][0]["node"]
+    if has_limit(node):
+        return None
+    node.setdefault("modifiers", []).append(single_select(parse_sql(f"SELECT 1 LIMIT {limit}"))["modifiers"][0])
+    return render_sql(tree)
+
+
+class SqlGuard:
+    """
+    Checks generated SQL before execution. The file listing behind each view, and the
+    row counts read from their footers, are cached and reloaded whenever the data version changes.
+    """
+
+    def __init__(self, version: Callable[[], str], enabled: bool = SQL_GUARD, max_scan_rows: int = GUARD_MAX_SCAN_ROWS,
+                 max_files: int = GUARD_MAX_FILES, max_join_rows: int = GUARD_MAX_JOIN_ROWS,
+                 row_limit: int = GUARD_ROW_LIMIT, heavy_scan_rows: int = GUARD_HEAVY_SCAN_ROWS,
+                 max_heavy_scans: int = GUARD_MAX_HEAVY_SCANS, parquet_dir: Path = PARQUET_DIR):
+        self.version = version
+        self.parquet_dir = Path(parquet_dir)
+        self.enabled = enabled
+        self.max_scan_rows = max_scan_rows
+        self.max_files = max_files
+        self.max_join_rows = max_join_rows
+        self.row_limit = row_limit
+        self.heavy_scan_rows = heavy_scan_rows
+        self._slots = asyncio.Semaphore(max_heavy_scans)
+        self._lock = threading.Lock()
+        # Counters are updated from executor threads and read by /metrics and /cache/stats
+        self._stats_lock = threading.Lock()
+        self._files: dict[str, list[tuple[Path, dict[str, int]]]] = {}
+        self._rows: dict[Path, int] = {}
+        self._files_version = None
+        self._checked: OrderedDict[tuple, GuardedQuery] = OrderedDict()
+        self.checked = self.rejected = self.limited = self.heavy = self.busy = 0
+
+    def _view_files(self) -> dict[str, list[tuple[Path, dict[str, int]]]]:
+        """Every file behind each view, with its partition keys."""
+        version = self.version()
+        with self._lock:
+            if version != self._files_version:
+                self._files = {view: [(p, _hive_keys(p.relative_to(self.parquet_dir)))
+                                      for p in self.parquet_dir.glob(pattern)]
+                               for view, pattern in VIEW_SOURCES.items()}
+                self._rows = {}
+                self._files_version = version
+            return self._files
+
+    def _file_rows(self, path: Path) -> int:
+        """Row count from the file's Parquet footer, read once per data version."""
+        rows = self._rows.get(path)
+        if rows is None:
+            import pyarrow.parquet as pq
+            rows = self._rows[path] = pq.read_metadata(path).num_rows
+        return rows
+
+    def _scanned_files(self, tree: dict) -> list[list[Path]]:
+        """For each view the statement names, the files left after pruning on literal partition filters."""
+        files = self._view_files()
+        predicates = _partition_predicates(tree)
+        return [[path for path, keys in files[node["table_name"]]
+                 if all(column not in keys or test(keys[column]) for column, test in predicates)]
+                for node in walk(tree) if node.get("type") == "BASE_TABLE" and node.get("table_name") in files]
+
+    def check(self, con, sql: str, add_row_limit: bool = True) -> GuardedQuery:
+        """
+        Parses and EXPLAINs `sql` on the given cursor and returns it ready to run,
+        with a LIMIT added if `add_row_limit` and it has none.
+
+        Raises:
+            QueryRejected: If the statement is not a single SELECT, does not bind, or is over budget.
+        """
+        if not self.enabled:
+            return GuardedQuery(sql, 0, 0, None, False)
+        self._count("checked")
+        key = (self.version(), sql, add_row_limit)
+        with self._lock:
+            cached = self._checked.get(key)
+            if cached is not None:
+                self._checked.move_to_end(key)
+                if cached.row_limit is not None:
+                    self._count("limited")
+                return cached
+        tree = parse_sql(sql)
+        if tree is None or len(tree.get("statements", [])) != 1:
+            self._count("rejected")
+            raise QueryRejected("Only a single SELECT statement can be run.")
+        row_limit = None
+        if add_row_limit:
+            limited_sql = add_limit(tree, self.row_limit)
+            if limited_sql is not None:
+                sql, row_limit = limited_sql, self.row_limit
+                self._count("limited")
+
+        try:
+            plan = "\n".join(row[1] for row in con.execute(f"EXPLAIN {sql}").fetchall())
+        except Exception as e:
+            self._count("rejected")
+            raise QueryRejected(f"The query is not valid: {e}")
+        operators = plan_operators(plan)
+        scanned_files = self._scanned_files(tree)
+        files = sum(map(len, scanned_files))
+        scan_operators = [op for op in operators if op.name in _SCAN_OPERATORS]
+        scans = [op.cardinality / _DUCKDB_FILTER_SELECTIVITY if op.filtered else op.cardinality
+                 for op in scan_operators if op.cardinality is not None]
+        missing = len(scan_operators) - len(scans)
+        if missing:
+            # The box was cut before its estimate: count the scan as reading every row it may read,
+            # the largest views first, or as over budget when the statement names none
+            full_scans = sorted((sum(map(self._file_rows, paths)) for paths in scanned_files), reverse=True)
+            full_scans = full_scans or [self.max_scan_rows + 1]
+            scans += [full_scans[min(i, len(full_scans) - 1)] for i in range(missing)]
+        scanned_rows = int(sum(scans))
+        stops_early = any(op.name in ("STREAMING_LIMIT", "LIMIT") for op in operators) and \
+            all(op.name in _STREAMING_OPERATORS for op in operators)
+
+        reason = None
+        if not stops_early:
+            largest = sorted(scans, reverse=True)[:2]
+            if any(op.name in _PRODUCT_JOINS for op in operators) and len(largest) == 2 \
+                    and largest[0] * largest[1] > self.max_join_rows:
+                reason = f"it joins without an equality condition over ~{int(largest[0] * largest[1]):,} row pairs"
+            elif scanned_rows > self.max_scan_rows:
+                reason = f"it would scan ~{scanned_rows:,} rows (limit {self.max_scan_rows:,})"
+            elif files > self.max_files:
+                reason = f"it would read ~{files:,} files (limit {self.max_files:,})"
+        if reason is not None:
+            self._count("rejected")
+            logging.warning(f"Rejected query because {reason}: {sql}")
+            raise QueryRejected(f"The query is too expensive: {reason}. Add filters on game_year, game_month, "
+                                f"a player or a date range.")
+
+        heavy = not stops_early and scanned_rows >= self.heavy_scan_rows
+        logging.info(f"Guard: ~{scanned_rows:,} rows, ~{files:,} files, heavy={heavy}, limit={row_limit}")
+        guarded = GuardedQuery(sql, scanned_rows, files, row_limit, heavy)
+        with self._lock:
+            self._checked[key] = guarded
+            while len(self._checked) > GUARD_CACHE_SIZE:
+                self._checked.popitem(last=False)
+        return guarded
+
+    async def acquire(self, query: GuardedQuery) -> Callable[[], None]:
+        """
+        Waits for a heavy-scan slot if the query needs one.
+
+        Returns:
+            A function that frees the slot; it may be called from any thread, more than once.
+
+        Raises:
+            ScanCapacityExceeded: If no slot frees up within GUARD_QUEUE_TIMEOUT seconds.
+        """
+        if not query.heavy:
+            return lambda: None
+        try:
+            await asyncio.wait_for(self._slots.acquire(), GUARD_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self._count("busy")
+            raise ScanCapacityExceeded("Too many large queries are running; try again shortly.")
+        self._count("heavy")
+        loop = asyncio.get_running_loop()
+        pending = [self._slots.release]
+
+        def release():
+            try:
+                callback = pending.pop()
+            except IndexError:
+                return
+            loop.call_soon_threadsafe(callback)
+        return release
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "checked": self.checked,
+                "rejected": self.rejected,
+                "limited": self.limited,
+                "heavy": self.heavy,
+                "busy": self.busy,
+            }
@@ -0,0 +1,427 @@
+import datetime as dt
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+from .player_index import PlayerMatch, get_player_index
+from .prompt_builder import get_column_catalog
+
+# --- Template Fast Path Configuration ---
+# Answer common question shapes from SQL templates before calling the LLM
+TEMPLATE_FAST_PATH = os.getenv("TEMPLATE_FAST_PATH", "1") == "1"
+# Fuzzy player matches below this score are not trusted; the LLM gets the question instead
+TEMPLATE_MIN_NAME_SCORE = 0.92
+# A player counts as a pitcher (or batter) when at least this share of their plate appearances are on that side
+ROLE_SHARE = 0.8
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+# Minimum pitches (or batted balls) to appear on an average-metric leaderboard
+LEADERBOARD_MIN_SAMPLE = 50
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@dataclass(frozen=True)
+class Metric:
+    column: str
+    role: str  # "pitcher" or "batter": whose measurement it is
+    decimals: int
+
+
+@dataclass(frozen=True)
+class Event:
+    label: str
+    events: tuple[str, ...]
+    role: str  # default side for leaderboards
+
+
+# Phrases are matched longest first
+METRICS = {
+    "exit velocity": Metric("launch_speed", "batter", 1),
+    "exit velo": Metric("launch_speed", "batter", 1),
+    "exit speed": Metric("launch_speed", "batter", 1),
+    "launch angle": Metric("launch_angle", "batter", 1),
+    "hit distance": Metric("hit_distance_sc", "batter", 0),
+    "bat speed": Metric("bat_speed", "batter", 1),
+    "spin rate": Metric("release_spin_rate", "pitcher", 0),
+    "spin": Metric("release_spin_rate", "pitcher", 0),
+    "velocity": Metric("release_speed", "pitcher", 1),
+    "velo": Metric("release_speed", "pitcher", 1),
+    "speed": Metric("release_speed", "pitcher", 1),
+    "extension": Metric("release_extension", "pitcher", 1),
+}
+EVENTS = {
+    "strikeouts": Event("strikeouts", ("strikeout", "strikeout_double_play"), "pitcher"),
+    "strike outs": Event("strikeouts", ("strikeout", "strikeout_double_play"), "pitcher"),
+    "ks": Event("strikeouts", ("strikeout", "strikeout_double_play"), "pitcher"),
+    "home runs": Event("home_runs", ("home_run",), "batter"),
+    "homers": Event("home_runs", ("home_run",), "batter"),
+    "homeruns": Event("home_runs", ("home_run",), "batter"),
+    "hrs": Event("home_runs", ("home_run",), "batter"),
+    "walks": Event("walks", ("walk",), "batter"),
+    "hits": Event("hits", ("single", "double", "triple", "home_run"), "batter"),
+    "singles": Event("singles", ("single",), "batter"),
+    "doubles": Event("doubles", ("double",), "batter"),
+    "triples": Event("triples", ("triple",), "batter"),
+}
+PITCH_TYPES = {
+    "four-seam fastball": "FF", "four seam fastball": "FF", "4-seam fastball": "FF", "4 seam fastball": "FF",
+    "four-seamer": "FF", "four seamer": "FF", "fastball": "FF",
+    "two-seam fastball": "SI", "two-seamer": "SI", "sinker": "SI",
+    "cut fastball": "FC", "cutter": "FC",
+    "slider": "SL", "sweeper": "ST", "slurve": "SV",
+    "changeup": "CH", "change-up": "CH", "change up": "CH",
+    "knuckle curve": "KC", "curveball": "CU", "curve": "CU",
+    "splitter": "FS", "split-finger": "FS", "knuckleball": "KN",
+}
+MONTHS = {
+    name: number for number, names in enumerate([
+        (), ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"),
+        ("july", "jul"), ("august", "aug"), ("september", "sept", "sep"), ("october", "oct"), ("november", "nov"),
+    ]) for name in names
+}
+# Verbs that say which side of the plate appearance the player was on
+PITCHER_VERBS = {"throw", "threw", "thrown", "allow", "allowed", "give up", "gave up", "record", "recorded"}
+BATTER_VERBS = {"hit", "draw", "drew", "collect", "collected", "strike out", "struck out"}
+
+_FILLER = re.compile(r"^(?:what is|what was|what's|whats|show me|show|give me|tell me|find|list|get) ")
+_DATE_PATTERNS = [
+    ("range", re.compile(r"\b(?:between|from) (\d{4}-\d{2}-\d{2}) (?:and|to|through) (\d{4}-\d{2}-\d{2})\b")),
+    ("day", re.compile(r"\bon (\d{4}-\d{2}-\d{2})\b")),
+    ("month", re.compile(rf"\b(?:in|during) ({'|'.join(MONTHS)}) (\d{{4}})\b")),
+    ("year", re.compile(r"\b(?:in|during) (\d{4})(?: season)?\b")),
+    ("this_season", re.compile(r"\b(?:this|current) (?:season|year)\b")),
+    ("last_season", re.compile(r"\blast (?:season|year)\b")),
+]
+
+
+def _alternatives(phrases) -> str:
+    return "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+
+
+_METRIC_SLOT = re.compile(rf"\b({_alternatives(METRICS)})\b")
+_EVENT_SLOT = re.compile(rf"\b({_alternatives(EVENTS)})\b")
+_PITCH_SLOT = re.compile(rf"\b(?:his |her |their )?({_alternatives(PITCH_TYPES)})s?\b")
+
+_AGG = r"(?:(?P<agg>avg|max|maximum|top|highest|min|minimum|lowest) )?"
+_ON_PITCH = r"(?: (?:on|with|for) {pitch})?"
+_BY_PITCH = r"(?P<by_pitch> by pitch(?: type)?)?"
+_DATE = r"(?: {date})?"
+_PITCHER_VERB = "|".join(sorted(PITCHER_VERBS | BATTER_VERBS | {"have", "had", "get", "got"}, key=len, reverse=True))
+
+# (template name, skeleton pattern). Skeletons are the question with slots replaced and fillers removed.
+PATTERNS = [
+    ("player_metric", rf"^{{player}} {_AGG}{{metric}}{_ON_PITCH}{_BY_PITCH}{_DATE}$"),
+    ("player_metric", rf"^{{player}} {{pitch}} {_AGG}{{metric}}{_DATE}$"),
+    ("player_metric", rf"^{_AGG}{{metric}} (?:of|for|by) {{player}}{_ON_PITCH}{_BY_PITCH}{_DATE}$"),
+    ("player_metric", rf"^{_AGG}{{pitch}} {{metric}} (?:of|for|by) {{player}}{_DATE}$"),
+    ("player_event_count", rf"^how many {{event}} (?:did|does|has|have) {{player}}(?: (?P<verb>{_PITCHER_VERB}))?{_DATE}$"),
+    ("player_event_count", rf"^(?:number of )?{{event}} (?:for|by) {{player}}{_DATE}$"),
+    ("player_event_count", rf"^{{player}} (?:total )?{{event}}{_DATE}$"),
+    ("fastest_pitch", rf"^(?:who threw )?(?:{{top}} )?fastest (?:pitch|(?P<plural>pitches)|{{pitch}})(?: thrown)?(?: by {{player}})?{_DATE}$"),
+    ("fastest_pitch", rf"^{{player}} fastest (?:pitch|(?P<plural>pitches)|{{pitch}}){_DATE}$"),
+    ("hardest_hit", rf"^(?:who hit )?(?:{{top}} )?hardest hit (?:ball|(?P<plural>balls))(?: by {{player}})?{_DATE}$"),
+    ("event_leaders", rf"^(?:who|which (?P<noun>players?|hitters?|batters?|pitchers?)) (?:(?P<verb>{_PITCHER_VERB}) )?most {{event}}{_DATE}$"),
+    ("event_leaders", rf"^(?:{{top}} )?(?:most {{event}}|{{event}} leaders|(?:leaders|leaderboard) (?:in|for) {{event}}){_DATE}$"),
+    ("metric_leaders", rf"^(?:which (?P<noun>pitchers?|hitters?|batters?) (?:has|have|had) |who (?:has|had|throws|threw) )?(?:{{top}} |(?P<dir>highest|best|fastest|hardest|lowest) )(?:avg )?{{metric}}{_ON_PITCH}{_DATE}$"),
+    ("metric_leaders", rf"^(?:{{top}} )?(?:(?P<noun>pitchers|hitters|batters) )?(?:by (?:avg )?{{metric}}|{{metric}} leaders){_ON_PITCH}{_DATE}$"),
+    ("debut", r"^when (?:did|was) {player} (?:make (?:his|her|their) )?(?:mlb |major league )?debut(?: date)?$"),
+    ("debut", r"^{player} (?:mlb |major league )?debut(?: date)?$"),
+    ("final_game", r"^when did {player} play (?:his|her|their) (?:last|final) (?:mlb )?game$"),
+    ("final_game", r"^{player} (?:last|final) (?:mlb )?game$"),
+]
+# Slot markers like {player} are literal text to `re`; {top} stands for "top <n>"
+_COMPILED = [(name, re.compile(pattern.replace("{top}", r"top (?P<n>\d{1,3})"))) for name, pattern in PATTERNS]
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    template: str
+    sql: str
+
+
+@dataclass
+class _Slots:
+    skeleton: str
+    player: PlayerMatch | None = None
+    metric: Metric | None = None
+    event: Event | None = None
+    pitch_type: str | None = None
+    date: tuple | None = None
+
+
+class TemplateContext:
+    """Data-dependent facts the templates need: which side each player is on, and the latest season."""
+
+    def __init__(self, pitcher_pas: dict[int, int], batter_pas: dict[int, int], latest_season: int | None):
+        self.pitcher_pas = pitcher_pas
+        self.batter_pas = batter_pas
+        self.latest_season = latest_season
+
+    def in_data(self, mlbam_id: int) -> bool:
+        return mlbam_id in self.pitcher_pas or mlbam_id in self.batter_pas
+
+    def role(self, mlbam_id: int) -> str | None:
+        pitched, batted = self.pitcher_pas.get(mlbam_id, 0), self.batter_pas.get(mlbam_id, 0)
+        total = pitched + batted
+        if total == 0:
+            return None
+        if pitched / total >= ROLE_SHARE:
+            return "pitcher"
+        if batted / total >= ROLE_SHARE:
+            return "batter"
+        return None  # Two-way players are left to the LLM
+
+
+_context: TemplateContext | None = None
+_context_lock = threading.Lock()
+
+
+def load_template_context(con) -> TemplateContext:
+    """Loads plate-appearance counts per pitcher and batter, and the latest season, with the given DuckDB connection."""
+    global _context
+    pitcher_pas = dict(con.execute("SELECT pitcher, COUNT(*) FROM v_plate_appearances GROUP BY pitcher").fetchall())
+    batter_pas = dict(con.execute("SELECT batter, COUNT(*) FROM v_plate_appearances GROUP BY batter").fetchall())
+    latest_season = con.execute("SELECT MAX(game_year) FROM v_plate_appearances").fetchone()[0]
+    context = TemplateContext(pitcher_pas, batter_pas, latest_season)
+    with _context_lock:
+        _context = context
+    logging.info(f"Loaded template context: {len(pitcher_pas)} pitchers, {len(batter_pas)} batters, latest season {latest_season}.")
+    return context
+
+
+def get_template_context() -> TemplateContext | None:
+    return _context
+
+
+def _resolve_player(question: str, context: TemplateContext | None) -> tuple[str, PlayerMatch | None] | None:
+    """
+    Replaces the single player mentioned in the question with a {player} slot.
+    Returns None when the mention is ambiguous or not confident enough.
+    """
+    index = get_player_index()
+    matches = index.find_in_text(question) if index is not None else []
+    if not matches:
+        return question, None
+    spans = {m.matched_text for m in matches}
+    if len(spans) > 1:
+        return None
+    candidates = [m for m in matches if m.match_type != "fuzzy" or m.score >= TEMPLATE_MIN_NAME_SCORE]
+    if len(candidates) > 1 and context is not None:
+        # Homonyms: keep the ones who actually appear in the Statcast data
+        candidates = [m for m in candidates if context.in_data(m.player.mlbam_id)]
+    if len(candidates) != 1:
+        return None
+    tokens = spans.pop().split()
+    mention = re.compile(r"\b" + r"[\s.]+".join(re.escape(t) for t in tokens) + r"(?:'s|’s|')?", re.IGNORECASE)
+    return mention.sub(" {player} ", question, count=1), candidates[0]
+
+
+def _extract_slots(question: str, context: TemplateContext | None) -> _Slots | None:
+    resolved = _resolve_player(question, context)
+    if resolved is None:
+        return None
+    text, player = resolved
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"'s\b", "", text)
+    text = re.sub(r"[^a-z0-9{}\- ]+", " ", text)
+    text = " ".join(w for w in text.split() if w != "the")
+    text = re.sub(r"\b(?:average|mean)\b", "avg", text)
+    slots = _Slots(skeleton="", player=player)
+
+    for kind, pattern in _DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            slots.date = (kind, *match.groups())
+            text = text[:match.start()] + "{date}" + text[match.end():]
+            break
+    for pattern, table, attribute in ((_EVENT_SLOT, EVENTS, "event"), (_METRIC_SLOT, METRICS, "metric"),
+                                      (_PITCH_SLOT, PITCH_TYPES, "pitch_type")):
+        match = pattern.search(text)
+        if match:
+            setattr(slots, attribute, table[match.group(1)])
+            text = text[:match.start()] + "{" + ("pitch" if attribute == "pitch_type" else attribute) + "}" + text[match.end():]
+    slots.skeleton = _FILLER.sub("", " ".join(text.split()))
+    return slots
+
+
+def _date_filter(date: tuple | None, context: TemplateContext | None, prefix: str = "") -> list[str]:
+    """Date conditions, always with the game_year/game_month partition columns so files are skipped."""
+    if date is None:
+        return []
+    kind, *values = date
+    if kind in ("this_season", "last_season"):
+        latest = (context.latest_season if context and context.latest_season else None) or dt.date.today().year
+        return [f"{prefix}game_year = {latest - (kind == 'last_season')}"]
+    if kind == "year":
+        return [f"{prefix}game_year = {int(values[0])}"]
+    if kind == "month":
+        return [f"{prefix}game_year = {int(values[1])}", f"{prefix}game_month = {MONTHS[values[0]]}"]
+    start = dt.date.fromisoformat(values[0])
+    end = dt.date.fromisoformat(values[-1])
+    conditions = [f"{prefix}game_date BETWEEN '{start}' AND '{end}'"]
+    if start.year == end.year:
+        conditions.append(f"{prefix}game_year = {start.year}")
+        if start.month == end.month:
+            conditions.append(f"{prefix}game_month = {start.month}")
+    return conditions
+
+
+def _where(conditions: list[str]) -> str:
+    return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _has_columns(view: str, *columns: str) -> bool:
+    available = {c.name for c in get_column_catalog().views.get(view, [])}
+    return all(column in available for column in columns)
+
+
+def _limit(match: re.Match, default: int) -> int:
+    n = match.groupdict().get("n")
+    return min(int(n), MAX_LEADERBOARD_SIZE) if n else default
+
+
+def _render(name: str, match: re.Match, slots: _Slots, context: TemplateContext | None) -> str | None:
+    groups = match.groupdict()
+    player = slots.player.player if slots.player else None
+    dates = _date_filter(slots.date, context)
+
+    if name == "player_metric":
+        metric = slots.metric
+        role = context.role(player.mlbam_id) if context else None
+        if role is not None and role != metric.role or not _has_columns("v_statcast", metric.column, metric.role):
+            return None
+        agg = {"max": "MAX", "maximum": "MAX", "top": "MAX", "highest": "MAX",
+               "min": "MIN", "minimum": "MIN", "lowest": "MIN"}.get(groups.get("agg"), "AVG")
+        value = f"ROUND({agg}({metric.column}), {metric.decimals}) AS {agg.lower()}_{metric.column}"
+        sample = "pitches" if metric.role == "pitcher" else "batted_balls"
+        conditions = [f"{metric.role} = {player.mlbam_id}"] + dates
+        if slots.pitch_type:
+            conditions.append(f"pitch_type = {_quote(slots.pitch_type)}")
+        if groups.get("by_pitch"):
+            return (f"SELECT pitch_name, {value}, COUNT({metric.column}) AS {sample} FROM v_statcast "
+                    f"{_where(conditions)} GROUP BY pitch_name ORDER BY {sample} DESC")
+        return f"SELECT {value}, COUNT({metric.column}) AS {sample} FROM v_statcast {_where(conditions)}"
+
+    if name == "player_event_count":
+        event = slots.event
+        verb = groups.get("verb")
+        verb_role = "pitcher" if verb in PITCHER_VERBS else "batter" if verb in BATTER_VERBS else None
+        role = context.role(player.mlbam_id) if context else None
+        if verb_role and role and verb_role != role:
+            return None
+        role = verb_role or role
+        if role is None:
+            return None
+        events = ", ".join(_quote(e) for e in event.events)
+        conditions = [f"{role} = {player.mlbam_id}", f"events IN ({events})"] + dates
+        return f"SELECT COUNT(*) AS {event.label} FROM v_plate_appearances {_where(conditions)}"
+
+    if name == "fastest_pitch":
+        if player and context and context.role(player.mlbam_id) == "batter" or not _has_columns("v_statcast", "release_speed"):
+            return None
+        conditions = ["release_speed IS NOT NULL"] + dates
+        if player:
+            conditions.insert(0, f"pitcher = {player.mlbam_id}")
+        if slots.pitch_type:
+            conditions.append(f"pitch_type = {_quote(slots.pitch_type)}")
+        limit = _limit(match, LEADERBOARD_SIZE if groups.get("plural") else 1)
+        return (f"SELECT game_date, player_name, pitcher, pitch_name, release_speed, des FROM v_statcast "
+                f"{_where(conditions)} ORDER BY release_speed DESC LIMIT {limit}")
+
+    if name == "hardest_hit":
+        if player and context and context.role(player.mlbam_id) == "pitcher" or not _has_columns("v_statcast", "launch_speed"):
+            return None
+        conditions = ["s.launch_speed IS NOT NULL"] + _date_filter(slots.date, context, "s.")
+        if player:
+            conditions.insert(0, f"s.batter = {player.mlbam_id}")
+        limit = _limit(match, LEADERBOARD_SIZE if groups.get("plural") else 1)
+        return (f"SELECT s.game_date, m.name_first, m.name_last, s.batter, s.launch_speed, s.events, s.des "
+                f"FROM v_statcast s LEFT JOIN v_player_map m ON s.batter = m.key_mlbam "
+                f"{_where(conditions)} ORDER BY s.launch_speed DESC LIMIT {limit}")
+
+    if name == "event_leaders":
+        if player:
+            return None
+        event = slots.event
+        noun, verb = groups.get("noun") or "", groups.get("verb")
+        role = ("pitcher" if noun.startswith("pitcher") or verb in PITCHER_VERBS else
+                "batter" if noun.startswith(("hitter", "batter")) or verb in BATTER_VERBS else event.role)
+        events = ", ".join(_quote(e) for e in event.events)
+        conditions = [f"pa.events IN ({events})"] + _date_filter(slots.date, context, "pa.")
+        limit = _limit(match, LEADERBOARD_SIZE)
+        if role == "pitcher":
+            return (f"SELECT ANY_VALUE(pa.player_name) AS player_name, pa.pitcher, COUNT(*) AS {event.label} "
+                    f"FROM v_plate_appearances pa {_where(conditions)} "
+                    f"GROUP BY pa.pitcher ORDER BY {event.label} DESC LIMIT {limit}")
+        return (f"SELECT m.name_first, m.name_last, pa.batter, COUNT(*) AS {event.label} FROM v_plate_appearances pa "
+                f"LEFT JOIN v_player_map m ON pa.batter = m.key_mlbam "
+                f"{_where(conditions)} GROUP BY m.name_first, m.name_last, pa.batter ORDER BY {event.label} DESC LIMIT {limit}")
+
+    if name == "metric_leaders":
+        metric = slots.metric
+        noun = groups.get("noun") or ""
+        if player or (noun and not noun.startswith(metric.role[:3]) and not (metric.role == "batter" and noun.startswith("hitter"))):
+            return None
+        if not _has_columns("v_statcast", metric.column):
+            return None
+        order = "ASC" if groups.get("dir") == "lowest" else "DESC"
+        value = f"ROUND(AVG({metric.column}), {metric.decimals}) AS avg_{metric.column}"
+        sample = "pitches" if metric.role == "pitcher" else "batted_balls"
+        conditions = list(dates)
+        if slots.pitch_type:
+            conditions.append(f"pitch_type = {_quote(slots.pitch_type)}")
+        having = f"HAVING COUNT({metric.column}) >= {LEADERBOARD_MIN_SAMPLE}"
+        limit = _limit(match, LEADERBOARD_SIZE)
+        if metric.role == "pitcher":
+            return (f"SELECT ANY_VALUE(player_name) AS player_name, pitcher, {value}, COUNT({metric.column}) AS {sample} "
+                    f"FROM v_statcast {_where(conditions)} GROUP BY pitcher {having} "
+                    f"ORDER BY avg_{metric.column} {order} LIMIT {limit}")
+        return (f"SELECT m.name_first, m.name_last, b.* FROM ("
+                f"SELECT batter, {value}, COUNT({metric.column}) AS {sample} FROM v_statcast "
+                f"{_where(conditions)} GROUP BY batter {having}) b "
+                f"LEFT JOIN v_player_map m ON b.batter = m.key_mlbam ORDER BY avg_{metric.column} {order} LIMIT {limit}")
+
+    if name in ("debut", "final_game"):
+        column = "debut" if name == "debut" else "finalGame"
+        if not _has_columns("v_lahman_people", "nameFirst", "nameLast", column):
+            return None
+        conditions = [f"nameFirst = {_quote(player.name_first)}", f"nameLast = {_quote(player.name_last)}"]
+        if player.debut_year:
+            # Lahman has homonyms; the index knows which career this player had
+            conditions.append(f"YEAR(TRY_CAST(debut AS DATE)) = {player.debut_year}")
+        return f"SELECT nameFirst, nameLast, {column} FROM v_lahman_people {_where(conditions)} LIMIT 1"
+    return None
+
+
+def match_template(question: str) -> TemplateMatch | None:
+    """
+    Matches a question against the SQL templates.
+
+    Returns:
+        The template name and its SQL, or None when no template matches with confidence
+        (the question should then go to the LLM).
+    """
+    if not TEMPLATE_FAST_PATH:
+        return None
+    context = get_template_context()
+    slots = _extract_slots(question, context)
+    if slots is None:
+        return None
+    for name, pattern in _COMPILED:
+        match = pattern.match(slots.skeleton)
+        if not match:
+            continue
+        needs_player = name in ("player_metric", "player_event_count", "debut", "final_game")
+        if needs_player and slots.player is None:
+            continue
+        sql = _render(name, match, slots, context)
+        if sql is not None:
+            return TemplateMatch(name, re.sub(r" {2,}", " ", sql))
+    return None
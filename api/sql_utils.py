@@ -0,0 +1,87 @@
+import functools
+import json
+import logging
+import threading
+from typing import Iterator
+
+import duckdb
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Parsing needs no catalog or data, so each thread keeps its own in-memory connection
+_local = threading.local()
+
+
+def _parser() -> duckdb.DuckDBPyConnection:
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = _local.con = duckdb.connect()
+    return con
+
+
+def parse_sql(sql: str) -> dict | None:
+    """
+    Parses SQL with DuckDB's own parser and returns its JSON syntax tree
+    (as produced by `json_serialize_sql`), or None if the SQL does not parse.
+    """
+    try:
+        tree = json.loads(_parser().execute("SELECT json_serialize_sql(?::VARCHAR)", [sql]).fetchone()[0])
+    except Exception as e:
+        logging.warning(f"Could not parse SQL: {e}")
+        return None
+    return None if tree.get("error") else tree
+
+
+def render_sql(tree: dict) -> str:
+    """Turns a (possibly modified) syntax tree from `parse_sql` back into SQL."""
+    return _parser().execute("SELECT json_deserialize_sql(?::JSON)", [json.dumps(tree)]).fetchone()[0]
+
+
+def render_expression(node: dict) -> str:
+    """Turns a single expression node back into SQL, e.g. the name DuckDB gives an unaliased result column."""
+    tree = parse_sql("SELECT NULL")
+    single_select(tree)["select_list"] = [node]
+    return render_sql(tree)[len("SELECT "):]
+
+
+def single_select(tree: dict | None) -> dict | None:
+    """Returns the SELECT node of a single plain SELECT statement, or None for anything else."""
+    if tree is None or len(tree.get("statements", [])) != 1:
+        return None
+    node = tree["statements"][0]["node"]
+    return node if node.get("type") == "SELECT_NODE" else None
+
+
+def walk(node) -> Iterator[dict]:
+    """Yields every dict in a syntax tree, parents before children."""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from walk(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from walk(item)
+
+
+def column_name(node: dict) -> str | None:
+    """The unqualified column name of a COLUMN_REF node, or None for other nodes."""
+    if node.get("class") != "COLUMN_REF":
+        return None
+    return node["column_names"][-1]
+
+
+@functools.cache
+def aggregate_functions() -> frozenset[str]:
+    """Names of every aggregate function DuckDB knows (avg, count_star, median, ...)."""
+    rows = _parser().execute(
+        "SELECT DISTINCT function_name FROM duckdb_functions() WHERE function_type = 'aggregate'"
+    ).fetchall()
+    return frozenset(name for (name,) in rows)
+
+
+def parse_expression(expression: str) -> dict:
+    """Parses a single SQL expression into a syntax tree node."""
+    node = single_select(parse_sql(f"SELECT {expression}"))
+    if node is None:
+        raise ValueError(f"Not a valid SQL expression: {expression}")
+    return node["select_list"][0]
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+# --- Cache Configuration ---
+CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_SIZE", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))
+# Optional on-disk tier; point this at a mounted volume so it survives container restarts
+CACHE_DB_PATH = os.getenv("TRANSLATION_CACHE_PATH")
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Bump when normalize_question changes, so keys written under the old rules are never matched
+KEY_FORMAT = "2"
+
+# Punctuation that changes what a number means is kept: signs (-10, +5) and ranges (2023-24),
+# decimal points and separators between digits (100.5, 1,000, 5/1, 3:30), and suffixes (40%, 95+)
+_NUMERIC_PUNCTUATION = r"[-+](?=\d)|(?<=\d)[.,/:](?=\d)|(?<=\d)[%+]"
+_PUNCTUATION = re.compile(rf"(?!{_NUMERIC_PUNCTUATION})[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Folds case, Unicode compatibility forms, punctuation (except inside numbers) and whitespace."""
+    text = unicodedata.normalize("NFKC", question).casefold().replace("\u2212", "-")
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def normalize_sql(sql: str | None) -> str:
+    """Folds whitespace and trailing semicolons. Case is kept, since it matters inside string literals."""
+    if not sql:
+        return ""
+    return _WHITESPACE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+def make_key(question: str, previous_sql: str | None, prompt_version: str) -> str:
+    raw = "\x1f".join([KEY_FORMAT, prompt_version, normalize_question(question), normalize_sql(previous_sql)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    A two-tier cache of question -> SQL translations.
+
+    The first tier is an in-memory LRU. The optional second tier is a SQLite file
+    that outlives the process. Entries written under a different prompt version are
+    never returned, and are purged from disk when the cache is opened.
+    """
+
+    def __init__(self, prompt_version: str, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = CACHE_TTL_SECONDS, db_path: str | Path | None = CACHE_DB_PATH):
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = self._open_disk_tier(db_path) if db_path else None
+
+    def _open_disk_tier(self, db_path: str | Path) -> sqlite3.Connection | None:
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(db_path), check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, prompt_version TEXT NOT NULL, sql TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            purged = db.execute(
+                "DELETE FROM translations WHERE prompt_version != ? OR created_at < ?",
+                (self.prompt_version, time.time() - self.ttl_seconds),
+            ).rowcount
+            db.commit()
+            logging.info(f"Opened translation cache at {db_path} (purged {purged} stale entries).")
+            return db
+        except sqlite3.Error as e:
+            logging.error(f"Could not open translation cache at {db_path}, continuing in memory only: {e}")
+            return None
+
+    def get(self, question: str, previous_sql: str | None) -> str | None:
+        key = make_key(question, previous_sql, self.prompt_version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                sql, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return sql
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT sql, created_at FROM translations WHERE key = ? AND prompt_version = ?",
+                    (key, self.prompt_version),
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, question: str, previous_sql: str | None, sql: str):
+        key = make_key(question, previous_sql, self.prompt_version)
+        now = time.time()
+        with self._lock:
+            self._remember(key, sql, now)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO translations (key, prompt_version, sql, created_at) VALUES (?, ?, ?, ?)",
+                        (key, self.prompt_version, sql, now),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Failed to persist translation cache entry: {e}")
+
+    def _remember(self, key: str, sql: str, created_at: float):
+        self._entries[key] = (sql, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "prompt_version": self.prompt_version,
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
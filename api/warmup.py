@@ -0,0 +1,101 @@
+"""
+Warm-up after startup.
+
+The API accepts connections as soon as the database pool is open and the player index,
+column catalog, template context and rollup router are loaded. With WARMUP=1 the rest
+of the warm-up runs in the background: the LLM client is created, a typical statement
+is planned so the SQL parser and the guard are loaded, the small player tables and
+every view's Parquet footers are read once so the first queries find them in the page
+cache, and the statements in WARMUP_SQL_FILE are run to fill the result cache.
+`GET /health/ready` answers 503 until it has finished, so a readiness probe sends
+traffic only to a warm instance.
+"""
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+from .db_handler import run_in_executor
+
+# --- Warm-up Configuration ---
+# Off by default: on a single CPU the warm-up competes with the first questions instead of speeding them up
+WARMUP = os.getenv("WARMUP", "0") == "1"
+# Optional file of SQL statements, separated by semicolons, whose results are cached at startup
+WARMUP_SQL_FILE = os.getenv("WARMUP_SQL_FILE")
+
+# Small tables read in full, e.g. for joins from player IDs to names
+DIMENSION_VIEWS = ("v_player_map", "v_lahman_people")
+# Planned, not run, to load the parser, planner and guard before the first question
+PLAN_STATEMENT = "SELECT pitch_type, AVG(release_speed) AS avg_speed FROM v_statcast GROUP BY pitch_type"
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def scan_views(con) -> dict[str, float]:
+    """Runs COUNT(*) on every view, which reads each Parquet footer once. Returns seconds per view."""
+    timings = {}
+    views = [row[0] for row in con.execute("SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()]
+    for view in views:
+        start = time.perf_counter()
+        con.execute(f"SELECT COUNT(*) FROM {view}").fetchall()
+        timings[view] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+def read_dimensions(con) -> int:
+    """Reads the player tables in full. Returns the number of rows read."""
+    views = {row[0] for row in con.execute("SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()}
+    return sum(con.execute(f"SELECT * FROM {view}").arrow().num_rows for view in DIMENSION_VIEWS if view in views)
+
+
+def load_statements(path: str | None = WARMUP_SQL_FILE) -> list[str]:
+    """The statements in `path`, or none if it is unset."""
+    if not path:
+        return []
+    return [statement.strip() for statement in Path(path).read_text(encoding="utf-8").split(";") if statement.strip()]
+
+
+def run_statements(run: Callable[[str], object], statements: list[str]) -> int:
+    """Calls `run` on each statement, logging the ones that fail. Returns how many succeeded."""
+    succeeded = 0
+    for sql in statements:
+        try:
+            run(sql)
+            succeeded += 1
+        except Exception as e:
+            logging.warning(f"Warm-up statement failed: {e}")
+    return succeeded
+
+
+class Warmup:
+    """Runs the warm-up steps once, in order, and reports when they are done."""
+
+    def __init__(self, steps: list[tuple[str, Callable[[], object]]], enabled: bool = WARMUP):
+        """
+        Args:
+            steps: (name, function) pairs. Each blocking function runs on the DuckDB executor;
+                a failure is logged and the warm-up moves on to the next step.
+        """
+        self.steps = list(steps)
+        self.enabled = enabled
+        self.ready = False
+        self.failures = 0
+        self.timings: dict[str, float] = {}
+
+    async def run(self):
+        started = time.perf_counter()
+        if self.enabled:
+            for name, step in self.steps:
+                step_started = time.perf_counter()
+                try:
+                    await run_in_executor(step)
+                except Exception as e:
+                    self.failures += 1
+                    logging.warning(f"Warm-up step '{name}' failed: {e}")
+                self.timings[name] = round(time.perf_counter() - step_started, 3)
+            logging.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s: {self.timings}")
+        self.ready = True
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "ready": self.ready, "failures": self.failures, "seconds": self.timings}
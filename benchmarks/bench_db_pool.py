@@ -0,0 +1,111 @@
+"""
+Compares repeated-query latency of a fresh read-only connection per query (the old
+`execute_query` behaviour) against cursors borrowed from the shared pool.
+
+Usage:
+    python -m benchmarks.bench_db_pool --iterations 200
+"""
+import argparse
+import resource
+import statistics
+import sys
+import time
+
+import duckdb
+
+from api import db_handler
+
+DEFAULT_QUERIES = [
+    "SELECT player_name, MAX(release_speed) AS max_speed FROM v_statcast GROUP BY player_name ORDER BY max_speed DESC LIMIT 10",
+    "SELECT pitch_type, AVG(release_spin_rate) AS avg_spin FROM v_statcast GROUP BY pitch_type",
+    "SELECT COUNT(*) AS pitches FROM v_statcast WHERE game_date = (SELECT MAX(game_date) FROM v_statcast)",
+]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """p50/p95/p99/mean of latency samples in milliseconds, for JSON results."""
+    if not samples:
+        return {"n": 0}
+    return {
+        "n": len(samples),
+        **{f"p{pct}_ms": round(percentile(samples, pct), 2) for pct in (50, 95, 99)},
+        "mean_ms": round(statistics.mean(samples), 2),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    # ru_maxrss survives exec, so a child would report its parent's peak if that was higher;
+    # VmHWM starts over with the new program
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(label: str, samples: list[float]):
+    print(
+        f"{label:<22} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):8.2f} ms  "
+        f"p99={percentile(samples, 99):8.2f} ms  "
+        f"mean={statistics.mean(samples):8.2f} ms"
+    )
+
+
+def run_connect_per_query(queries: list[str], iterations: int) -> list[float]:
+    samples = []
+    for i in range(iterations):
+        sql = queries[i % len(queries)]
+        start = time.perf_counter()
+        con = duckdb.connect(database=str(db_handler.DB_FILE), read_only=True)
+        try:
+            con.execute(sql).fetchall()
+        finally:
+            con.close()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_pooled(queries: list[str], iterations: int) -> list[float]:
+    pool = db_handler.init_pool()
+    if pool is None:
+        raise SystemExit(1)
+    samples = []
+    try:
+        for i in range(iterations):
+            sql = queries[i % len(queries)]
+            start = time.perf_counter()
+            with pool.cursor() as con:
+                con.execute(sql).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        db_handler.close_pool()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--query", action="append", help="SQL to run (repeatable). Defaults to a small built-in set.")
+    args = parser.parse_args()
+
+    queries = args.query or DEFAULT_QUERIES
+    print(f"Database: {db_handler.DB_FILE}")
+    summarize("connect-per-query", run_connect_per_query(queries, args.iterations))
+    summarize("pooled cursor", run_pooled(queries, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Time to first successful query of a freshly started API.
+
+Runs `start.sh` (catalog step, then uvicorn) the way the container does, against the
+stub LLM, and sends the first `/query` as soon as the port accepts connections. Each
+run reports, from the moment the script was launched:
+- `listen`: the first HTTP response of any kind (the port is open);
+- `ready`: the first 200 from `GET /health/ready`, if the API has that endpoint;
+- `first_query`: the first `/query` answered with a 200.
+
+With `--wait-ready`, the first query is sent only after `/health/ready`, like a
+load balancer that routes on readiness; otherwise as soon as the port is open, like one
+that only checks the TCP port. `--drop-caches` empties the page cache before each run
+(Linux, as root), so the Parquet files and modules are read from disk as in a new container.
+
+Usage:
+    DATA_DIR=/tmp/hotcorner-bench/season-seed42 python -m benchmarks.cold_start --runs 5
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_db_pool import latency_summary
+from benchmarks.stub_llm import create_app, serve_in_thread
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# The stub answers every question with a GROUP BY over all pitches
+DEFAULT_QUESTION = "What is the average velocity of each pitch type?"
+POLL_INTERVAL = 0.02
+
+
+def drop_caches():
+    subprocess.run(["sync"], check=True)
+    Path("/proc/sys/vm/drop_caches").write_text("3\n")
+
+
+def measure_once(port: int, llm_port: int, question: str, wait_ready: bool = False, timeout: float = 120.0) -> dict:
+    """Starts `start.sh`, waits for the first successful query and stops the server."""
+    env = {**os.environ, "PORT": str(port), "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+           "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "stub"), "PYTHONPATH": str(PROJECT_ROOT)}
+    started = time.perf_counter()
+    process = subprocess.Popen(["bash", "start.sh"], cwd=PROJECT_ROOT, env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    marks = {"listen": None, "ready": None, "first_query": None}
+    has_ready = True
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            while marks["first_query"] is None:
+                if time.perf_counter() - started > timeout or process.poll() is not None:
+                    raise RuntimeError(f"The API did not answer within {timeout:.0f}s:\n{process.stderr.read()[-4000:]}")
+                try:
+                    if has_ready and marks["ready"] is None:
+                        status = client.get("/health/ready").status_code
+                        marks["listen"] = marks["listen"] or time.perf_counter() - started
+                        has_ready = status != 404
+                        if status == 200:
+                            marks["ready"] = time.perf_counter() - started
+                        elif wait_ready and has_ready:
+                            time.sleep(POLL_INTERVAL)
+                            continue
+                    response = client.post("/query", json={"question": question})
+                    marks["listen"] = marks["listen"] or time.perf_counter() - started
+                    if response.status_code == 200:
+                        marks["first_query"] = time.perf_counter() - started
+                except httpx.TransportError:
+                    time.sleep(POLL_INTERVAL)
+            # Readiness may come after the first query when the warm-up runs in the background
+            while has_ready and marks["ready"] is None and time.perf_counter() - started < timeout:
+                if client.get("/health/ready").status_code == 200:
+                    marks["ready"] = time.perf_counter() - started
+                else:
+                    time.sleep(POLL_INTERVAL)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+    return {name: round(seconds * 1000, 1) if seconds is not None else None for name, seconds in marks.items()}
+
+
+def run(runs: int = 3, port: int = 8767, llm_port: int = 8768, question: str = DEFAULT_QUESTION,
+        wait_ready: bool = False, cold_cache: bool = False) -> dict:
+    """
+    Measures `runs` cold starts.
+
+    Returns:
+        Per-run timings and their percentiles in milliseconds, ready for JSON.
+    """
+    serve_in_thread(create_app(delay=0.0), llm_port)
+    samples = []
+    for _ in range(runs):
+        if cold_cache:
+            drop_caches()
+        samples.append(measure_once(port, llm_port, question, wait_ready))
+    return {
+        "suite": "cold_start",
+        "wait_ready": wait_ready,
+        "cold_cache": cold_cache,
+        "runs": samples,
+        **{name: latency_summary([s[name] for s in samples if s[name] is not None]) for name in ("listen", "ready", "first_query")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--llm-port", type=int, default=8768)
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    parser.add_argument("--wait-ready", action="store_true", help="Send the first query after /health/ready answers 200.")
+    parser.add_argument("--drop-caches", action="store_true", help="Empty the page cache before each run (needs root).")
+    parser.add_argument("--json", type=Path, help="Write the results to this file.")
+    args = parser.parse_args()
+
+    if not os.environ.get("DATA_DIR"):
+        sys.exit("Set DATA_DIR to a data set, e.g. one generated by `python -m benchmarks.run`.")
+    results = run(args.runs, args.port, args.llm_port, args.question, args.wait_ready, args.drop_caches)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    for sample in results["runs"]:
+        print("  ".join(f"{name} {ms if ms is not None else '-':>8} ms" for name, ms in sample.items()))
+    for name in ("listen", "ready", "first_query"):
+        if results[name]["n"]:
+            print(f"{name:<12} p50 {results[name]['p50_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
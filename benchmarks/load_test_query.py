@@ -0,0 +1,179 @@
+"""
+Load test for `/query` against a local stub LLM server.
+
+Starts the stub LLM and the API on local ports, fires `--requests` questions with
+`--concurrency` in flight, and reports wall time, throughput and latency percentiles.
+If the request path is non-blocking, wall time approaches
+`requests / concurrency * delay`; if it serializes, it approaches `requests * delay`.
+
+Questions are drawn (with a fixed seed) from a mix of kinds:
+- `llm`: a new question every time. The stub answers with the SQL of one of the
+  `benchmarks.workloads` statements, so the database work is realistic.
+- `template`: player questions answered by the SQL templates, using names from the data.
+- `repeat`: the same question again, served from the translation and result caches.
+
+Usage:
+    python -m benchmarks.load_test_query --requests 40 --concurrency 20 --delay 0.5
+    DATA_DIR=/tmp/hotcorner-bench python -m benchmarks.load_test_query --mix llm=0.5,template=0.3,repeat=0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_db_pool import latency_summary, peak_rss_mb
+from benchmarks.stub_llm import create_app, serve_in_thread
+from benchmarks.workloads import WORKLOADS, workload_params
+
+DEFAULT_MIX = {"llm": 1.0}
+TEMPLATE_QUESTIONS = {
+    "pitcher": ["How many strikeouts did {name} have in {year}", "What was {name}'s fastest pitch"],
+    "batter": ["How many home runs did {name} hit in {year}", "What is {name}'s average exit velocity"],
+}
+# Players with a unique name, so the templates can resolve them
+PLAYERS_SQL = """
+SELECT p.{role}, m.name_first || ' ' || m.name_last AS name
+FROM v_plate_appearances p JOIN v_player_map m ON m.key_mlbam = p.{role}
+WHERE m.name_first || ' ' || m.name_last IN (
+    SELECT name_first || ' ' || name_last FROM v_player_map GROUP BY ALL HAVING COUNT(*) = 1
+)
+GROUP BY ALL ORDER BY COUNT(*) DESC, 1 LIMIT 10
+"""
+
+
+def template_players(con) -> dict[str, list[str]]:
+    """The busiest uniquely named pitchers and batters, for `template` questions."""
+    return {role: [name for _, name in con.execute(PLAYERS_SQL.format(role=role)).fetchall()] for role in TEMPLATE_QUESTIONS}
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """`llm=0.5,template=0.3,repeat=0.2` -> {"llm": 0.5, ...}"""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("llm", "template", "repeat"):
+            raise argparse.ArgumentTypeError(f"Unknown question kind '{kind}'.")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def stub_responses(params: dict) -> dict[str, str]:
+    """Maps each workload's name, as it appears in `llm` questions, to its SQL."""
+    return {f"[{w.name}]": w.sql.format(**params) for w in WORKLOADS}
+
+
+def build_questions(total: int, mix: dict[str, float], players: dict[str, list[str]], year: int, seed: int = 7) -> list[tuple[str, str]]:
+    """Returns `total` (kind, question) pairs drawn from `mix`."""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=total)
+    questions = []
+    for i, kind in enumerate(kinds):
+        if kind == "template" and any(players.values()):
+            role = rng.choice([r for r in players if players[r]])
+            question = rng.choice(TEMPLATE_QUESTIONS[role]).format(name=rng.choice(players[role]), year=year)
+        elif kind == "repeat":
+            question = f"Show me [{WORKLOADS[0].name}]"
+        else:
+            kind = "llm"
+            question = f"Show me [{WORKLOADS[i % len(WORKLOADS)].name}] #{i}"
+        questions.append((kind, question))
+    return questions
+
+
+async def fire(api_url: str, questions: list[tuple[str, str]], concurrency: int) -> tuple[dict[str, list[float]], Counter, Counter]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: dict[str, list[float]] = {}
+    statuses, served_by = Counter(), Counter()
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=120) as client:
+        async def one(kind: str, question: str):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/query", json={"question": question})
+                latencies.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    served_by[response.json().get("served_by", "unknown").split(":")[0]] += 1
+
+        await asyncio.gather(*(one(kind, question) for kind, question in questions))
+    return latencies, statuses, served_by
+
+
+def run(requests: int = 40, concurrency: int = 20, delay: float = 0.5, mix: dict[str, float] | None = None,
+        llm_port: int = 8765, api_port: int = 8766) -> dict:
+    """
+    Starts the stub LLM and the API in this process and runs the load test.
+
+    Returns:
+        Latencies (overall and per question kind), throughput, status and `served_by`
+        counts, LLM calls and peak RSS, ready for JSON.
+    """
+    # Must be set before the API module builds its LLM client
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    from api.db_handler import run_with_cursor
+    from api.main import app
+
+    stub = create_app(delay=delay)
+    serve_in_thread(stub, llm_port)
+    api_server = serve_in_thread(app, api_port)
+    try:
+        params = run_with_cursor(workload_params)
+        players = run_with_cursor(template_players)
+        stub.state.responses = stub_responses(params)
+        questions = build_questions(requests, mix or DEFAULT_MIX, players, int(params["year"]))
+
+        start = time.perf_counter()
+        latencies, statuses, served_by = asyncio.run(fire(f"http://127.0.0.1:{api_port}", questions, concurrency))
+        wall = time.perf_counter() - start
+    finally:
+        api_server.should_exit = True
+
+    samples = [ms for kind_samples in latencies.values() for ms in kind_samples]
+    return {
+        "suite": "query_load",
+        "requests": requests, "concurrency": concurrency, "stub_delay_s": delay, "mix": mix or DEFAULT_MIX,
+        "wall_s": round(wall, 3), "rps": round(requests / wall, 2),
+        "latency": latency_summary(samples),
+        "latency_by_kind": {kind: latency_summary(kind_samples) for kind, kind_samples in latencies.items()},
+        "statuses": {str(code): n for code, n in statuses.items()},
+        "failures": sum(n for code, n in statuses.items() if code != 200),
+        "served_by": dict(served_by),
+        "llm_calls": stub.state.calls,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.5, help="Stub LLM latency in seconds.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Question kinds and weights, e.g. llm=0.5,template=0.3,repeat=0.2.")
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--api-port", type=int, default=8766)
+    parser.add_argument("--json", type=Path, help="Write the results to this file.")
+    args = parser.parse_args()
+
+    results = run(args.requests, args.concurrency, args.delay, args.mix, args.llm_port, args.api_port)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    llm_requests = results["latency_by_kind"].get("llm", {}).get("n", 0)
+    overlapped = llm_requests / args.concurrency * args.delay
+    serialized = llm_requests * args.delay
+    print(f"requests={args.requests} concurrency={args.concurrency} stub_delay={args.delay}s failures={results['failures']}")
+    print(f"wall time       {results['wall_s']:8.2f} s   (LLM questions ideal overlapped {overlapped:.2f} s, fully serialized {serialized:.2f} s)")
+    print(f"throughput      {results['rps']:8.2f} req/s")
+    for pct in (50, 95, 99):
+        print(f"latency p{pct}     {results['latency'][f'p{pct}_ms']:8.1f} ms")
+    print(f"served by       {results['served_by']}   LLM calls {results['llm_calls']}   peak RSS {results['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
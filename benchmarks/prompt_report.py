@@ -0,0 +1,142 @@
+"""
+Compares the legacy single-string prompt with the schema-aware prompt builder
+over a fixed question set: input tokens per request, the share of the prompt that
+is a stable (cacheable) prefix, and LLM round-trip latency.
+
+Tokens are counted with tiktoken (o200k_base, the gpt-4o tokenizer) when it is
+installed and its encoding is available, otherwise estimated at ~4 characters per token.
+
+Latency is measured against a local stub LLM whose delay grows with prompt size
+(`--delay` + `--per-token-delay` per input token), or against the real model with `--live`.
+
+Usage:
+    python -m benchmarks.prompt_report
+    python -m benchmarks.prompt_report --live --repeats 3      # needs OPENAI_API_KEY
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import duckdb
+
+from benchmarks.legacy_prompt import build_legacy_messages
+from benchmarks.stub_llm import create_app, estimate_tokens, serve_in_thread
+
+QUESTIONS = [
+    ("What is Gerrit Cole's average fastball velocity this season?", None),
+    ("Who threw the fastest pitch in May 2024?", None),
+    ("How many strikeouts did Aaron Judge have in 2024?", None),
+    ("Which pitchers have the highest spin rate on sliders?", None),
+    ("Show Shohei Ohtani's home runs with exit velocity and distance", None),
+    ("What is Juan Soto's xwOBA against left-handed pitchers?", None),
+    ("Whiff rate by pitch type for Spencer Strider", None),
+    ("When did Mike Trout make his MLB debut?", None),
+    ("Which team hit the most home runs in the first week of May?", None),
+    ("add spin rate", "SELECT pitch_name, AVG(release_speed) AS avg_velo FROM v_statcast "
+                      "WHERE pitcher = 543037 AND game_year = 2024 GROUP BY pitch_name"),
+]
+
+
+def token_counter():
+    """Returns (count function, method name)."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+    except Exception:
+        return estimate_tokens, "estimate (4 chars/token)"
+
+
+def load_context():
+    """Loads the player index and column catalog from the local database, if it exists."""
+    from api.db_handler import DB_FILE
+    from api.player_index import load_player_index
+    from api.prompt_builder import load_column_catalog
+    if not DB_FILE.exists():
+        print(f"{DB_FILE} not found; using the built-in column list and no player resolution.")
+        return
+    con = duckdb.connect(str(DB_FILE), read_only=True)
+    try:
+        load_column_catalog(con)
+        try:
+            load_player_index(con)
+        except Exception as e:
+            print(f"Player index not loaded: {e}")
+    finally:
+        con.close()
+
+
+def build_prompts() -> list[tuple[str, list[dict], list[dict]]]:
+    from api.prompt_builder import build_messages
+    from api.sql_generator import describe_players
+    prompts = []
+    for question, previous_sql in QUESTIONS:
+        players = describe_players(question)
+        prompts.append((question, build_legacy_messages(question, previous_sql, players),
+                        build_messages(question, previous_sql, players)))
+    return prompts
+
+
+async def time_calls(client, model: str, messages: list[dict], repeats: int) -> float:
+    """Median seconds for one chat completion with `messages`."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await client.chat.completions.create(model=model, messages=messages, max_tokens=500, temperature=0)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+async def measure_latency(prompts, model: str, repeats: int) -> list[tuple[float, float]]:
+    from openai import AsyncOpenAI
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
+    try:
+        results = []
+        for _, legacy, new in prompts:
+            results.append((await time_calls(client, model, legacy, repeats), await time_calls(client, model, new, repeats)))
+        return results
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Call the real model instead of the stub.")
+    parser.add_argument("--repeats", type=int, default=3, help="Calls per prompt; the median is reported.")
+    parser.add_argument("--delay", type=float, default=0.3, help="Stub base latency in seconds.")
+    parser.add_argument("--per-token-delay", type=float, default=0.0002, help="Stub latency per input token in seconds.")
+    parser.add_argument("--llm-port", type=int, default=8767)
+    args = parser.parse_args()
+
+    if not args.live:
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        serve_in_thread(create_app(delay=args.delay, per_token_delay=args.per_token_delay), args.llm_port)
+    from api.sql_generator import MODEL
+
+    load_context()
+    count, method = token_counter()
+    prompts = build_prompts()
+    latencies = asyncio.run(measure_latency(prompts, MODEL, args.repeats))
+
+    print(f"tokens: {method}; latency: {'live ' + MODEL if args.live else 'stub'} (median of {args.repeats})")
+    print(f"{'question':<58} {'legacy':>7} {'new':>6} {'prefix':>7} {'legacy ms':>10} {'new ms':>8}")
+    totals = [0, 0, 0]
+    for (question, legacy, new), (legacy_s, new_s) in zip(prompts, latencies):
+        legacy_tokens = sum(count(m["content"]) for m in legacy)
+        new_tokens = sum(count(m["content"]) for m in new)
+        prefix_tokens = count(new[0]["content"])
+        totals = [totals[0] + legacy_tokens, totals[1] + new_tokens, totals[2] + prefix_tokens]
+        print(f"{question[:58]:<58} {legacy_tokens:>7} {new_tokens:>6} {prefix_tokens:>7} "
+              f"{legacy_s * 1000:>10.0f} {new_s * 1000:>8.0f}")
+    n = len(prompts)
+    print(f"mean input tokens: legacy {totals[0] / n:.0f}, new {totals[1] / n:.0f} "
+          f"({totals[1] / totals[0]:.0%}), of which {totals[2] / totals[1]:.0%} is the stable system prefix")
+    print(f"median latency: legacy {statistics.median(l for l, _ in latencies) * 1000:.0f} ms, "
+          f"new {statistics.median(n for _, n in latencies) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Runs the benchmark suites on a synthetic data set and saves the results as JSON.
+
+1. Generates the synthetic data (`benchmarks.synthetic_data`) for `--scale`/`--seed`,
+   unless it already exists under `--data-dir`.
+2. Runs each suite in its own process with `DATA_DIR` pointing at that data, so peak
+   RSS is per suite and nothing is shared between them:
+   - `workloads`: cold and warm latency of the SQL workloads, and pooled throughput.
+   - `query_load`: end-to-end `/query` load test against the stub LLM.
+   - `cold_start`: time from `start.sh` to the first successful `/query`.
+3. Writes throughput, p50/p95/p99 latency and peak RSS per suite, plus the commit,
+   library versions and machine, to `--out`.
+
+With `--compare BASELINE.json`, prints the change of every metric against an earlier
+run and marks the ones worse than `--threshold`. Everything runs offline.
+
+Usage:
+    python -m benchmarks.run --scale week
+    python -m benchmarks.run --scale month --compare bench-results/abc1234-month.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_data import SUMMARY_FILE, generate
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = PROJECT_ROOT / "bench-results"
+SUITES = {
+    "workloads": ["benchmarks.workloads", "--iterations", "20", "--concurrency", "4", "--rounds", "3"],
+    "query_load": ["benchmarks.load_test_query", "--requests", "200", "--concurrency", "20", "--delay", "0.2",
+                   "--mix", "llm=0.5,template=0.3,repeat=0.2"],
+    "cold_start": ["benchmarks.cold_start", "--runs", "3"],
+}
+# Metrics where a higher value is better; every other compared metric is a cost
+HIGHER_IS_BETTER = {"qps", "rps"}
+COMPARED_KEYS = {"qps", "rps", "p50_ms", "p95_ms", "p99_ms", "cold_ms", "peak_rss_mb"}
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _command_output(*args: str) -> str | None:
+    try:
+        return subprocess.run(args, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """The commit, library versions and machine the results were measured on."""
+    import duckdb
+    import pandas
+    import pyarrow
+    status = _command_output("git", "status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _command_output("git", "rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "pyarrow": pyarrow.__version__,
+        "pandas": pandas.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def ensure_data(data_dir: Path, scale: str, seed: int) -> dict:
+    """Returns the summary of the synthetic data set in `data_dir`, generating it if needed."""
+    summary_path = data_dir / SUMMARY_FILE
+    if summary_path.exists():
+        summary = json.loads(summary_path.read_text())
+        if summary.get("scale") == scale and summary.get("seed") == seed:
+            logging.info(f"Using existing synthetic data in {data_dir}.")
+            return summary
+    return generate(data_dir, scale, seed)
+
+
+def run_suite(name: str, data_dir: Path) -> dict:
+    """Runs one suite in a child process and returns its JSON results."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / f"{name}.json"
+        command = [sys.executable, "-m", *SUITES[name], "--json", str(output)]
+        env = {**os.environ, "DATA_DIR": str(data_dir), "PYTHONPATH": str(PROJECT_ROOT)}
+        logging.info(f"Running {name}: {' '.join(command[2:])}")
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+        if completed.returncode != 0 or not output.exists():
+            logging.error(f"Suite {name} failed (exit {completed.returncode}):\n{completed.stderr[-4000:]}")
+            return {"suite": name, "error": completed.returncode}
+        results = json.loads(output.read_text())
+    results["suite_seconds"] = round(time.perf_counter() - started, 1)
+    return results
+
+
+def _flatten(value, prefix: str = "") -> dict[str, float]:
+    """Nested results -> {"suite.path.metric": number} for the compared metrics."""
+    flat = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            flat.update(_flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool) and prefix.rsplit(".", 1)[-1] in COMPARED_KEYS:
+        flat[prefix] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Prints every compared metric next to the baseline.
+
+    Returns:
+        The metrics that got worse by more than `threshold` (a fraction, e.g. 0.1).
+    """
+    now, before = _flatten(current["suites"]), _flatten(baseline["suites"])
+    regressions = []
+    print(f"\n{'metric':<60} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key in sorted(now.keys() & before.keys()):
+        old, new = before[key], now[key]
+        change = (new - old) / old if old else 0.0
+        worse = -change if key.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            flag = "  <-- worse"
+            regressions.append(key)
+        print(f"{key:<60} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}")
+    print(f"\nBaseline {baseline['environment'].get('commit')} vs. current {current['environment'].get('commit')}: "
+          f"{len(regressions)} metric(s) worse by more than {threshold:.0%}.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="week", help="week, month, season or seasons:N.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", type=Path, help="Where the synthetic data lives (default: a per-scale temp dir).")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma-separated subset of: {', '.join(SUITES)}.")
+    parser.add_argument("--out", type=Path, help="Results file (default: bench-results/<commit>-<scale>.json).")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change that counts as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if any metric regressed.")
+    args = parser.parse_args()
+
+    label = f"{args.scale.replace(':', '-')}-seed{args.seed}"
+    data_dir = args.data_dir or Path(tempfile.gettempdir()) / "hotcorner-bench" / label
+    env = environment()
+    results = {
+        "environment": env,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "data": ensure_data(data_dir, args.scale, args.seed),
+        "suites": {name: run_suite(name, data_dir) for name in args.suites.split(",")},
+    }
+
+    out = args.out or RESULTS_DIR / f"{env['commit'] or 'unknown'}{'-dirty' if env['dirty'] else ''}-{args.scale.replace(':', '-')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    logging.info(f"Results written to {out}")
+
+    for name, suite in results["suites"].items():
+        if "error" in suite:
+            print(f"{name}: FAILED")
+        elif name == "workloads":
+            t = suite["throughput"]
+            print(f"workloads:  {t['qps']:.1f} queries/s, p50 {t['p50_ms']:.1f} ms, p95 {t['p95_ms']:.1f} ms, "
+                  f"p99 {t['p99_ms']:.1f} ms, peak RSS {suite['peak_rss_mb']} MB")
+        elif name == "query_load":
+            lat = suite["latency"]
+            print(f"query_load: {suite['rps']:.1f} req/s, p50 {lat['p50_ms']:.1f} ms, p95 {lat['p95_ms']:.1f} ms, "
+                  f"p99 {lat['p99_ms']:.1f} ms, peak RSS {suite['peak_rss_mb']} MB, failures {suite['failures']}")
+        elif name == "cold_start":
+            print(f"cold_start: port open {suite['listen']['p50_ms']:.0f} ms, "
+                  f"first query {suite['first_query']['p50_ms']:.0f} ms (p50 of {suite['first_query']['n']} starts)")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+    if any("error" in suite for suite in results["suites"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+A minimal OpenAI-compatible chat completions server for offline load tests.
+
+It sleeps for a fixed delay plus an optional per-input-token delay (to mimic LLM
+latency, which grows with prompt size) and answers every request with the same SQL, or with
+the SQL of the first `responses` keyword found in the question. Point the API at it with
+`OPENAI_BASE_URL=http://host:port/v1`.
+
+Usage:
+    python -m benchmarks.stub_llm --port 8765 --delay 0.5
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+DEFAULT_SQL = "SELECT pitch_type, AVG(release_speed) AS avg_speed FROM v_statcast GROUP BY pitch_type ORDER BY avg_speed DESC"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English and SQL text (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def create_app(
+    delay: float = 0.5, sql: str = DEFAULT_SQL, per_token_delay: float = 0.0, responses: dict[str, str] | None = None
+) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    app.state.calls = 0
+    # Can be replaced after startup, e.g. once the data set is known
+    app.state.responses = responses or {}
+
+    def answer(messages: list[dict]) -> str:
+        question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        for keyword, keyword_sql in app.state.responses.items():
+            if keyword in question:
+                return keyword_sql
+        return sql
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in body.get("messages", []))
+        await asyncio.sleep(delay + prompt_tokens * per_token_delay)
+        return {
+            "id": f"chatcmpl-stub-{app.state.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer(body.get("messages", []))},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 0, "total_tokens": prompt_tokens},
+        }
+
+    return app
+
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    """Starts a uvicorn server for `app` on a daemon thread and waits until it accepts connections."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds to wait before answering.")
+    parser.add_argument("--per-token-delay", type=float, default=0.0, help="Extra seconds per estimated prompt token.")
+    parser.add_argument("--sql", default=DEFAULT_SQL, help="SQL returned for every request.")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.delay, args.sql, args.per_token_delay), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+A minimal S3-compatible object store for offline runs of the R2 sync (`etl.sync_r2`).
+
+Objects are plain files under `<root>/<bucket>/<key>`, so a bucket can be seeded by
+copying a `data/parquet` tree into it. It supports what the ETL and the sync use:
+ListObjectsV2 (paginated), GET and HEAD with `Range` and `If-Match`, PUT with `Content-MD5`
+and multipart uploads. ETags are computed like S3's: the MD5 of the content, or the MD5 of
+the part MD5s plus `-<parts>` for multipart uploads. Requests are unsigned and not checked.
+`--latency` and `--bandwidth-mb` slow every request down to mimic a remote bucket; the
+bandwidth limit applies per connection, like most object stores.
+
+Point the ETL at it with `R2_ENDPOINT_URL=http://127.0.0.1:9000`, `R2_BUCKET_NAME=<bucket>`
+and any non-empty `R2_ACCESS_KEY_ID`/`R2_SECRET_ACCESS_KEY`.
+
+Usage:
+    python -m benchmarks.stub_s3 --root /tmp/stub-s3 --port 9000 --latency 0.05 --bandwidth-mb 20
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import time
+import uuid
+from email.utils import formatdate
+from pathlib import Path
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def _error(status: int, code: str, message: str) -> Response:
+    body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>'
+    return Response(body, status_code=status, media_type="application/xml")
+
+
+def _xml(root: str, **fields) -> Response:
+    values = "".join(f"<{name}>{escape(str(value))}</{name}>" for name, value in fields.items())
+    body = f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">{values}</{root}>'
+    return Response(body, media_type="application/xml")
+
+
+def _md5_matches(data: bytes, header: str | None) -> bool:
+    return header is None or base64.b64encode(hashlib.md5(data, usedforsecurity=False).digest()).decode() == header
+
+
+def create_app(root: Path, latency: float = 0.0, bandwidth: float = 0.0) -> FastAPI:
+    """
+    Args:
+        root: Directory holding one subdirectory per bucket.
+        latency: Seconds added to every request.
+        bandwidth: Bytes per second per request or response body; 0 means unlimited.
+    """
+    root = Path(root)
+    app = FastAPI(title="Stub S3")
+    app.state.requests = 0
+    app.state.bytes_sent = 0
+    etags: dict[Path, tuple[int, int, str]] = {}
+    # Upload ID -> (bucket, key, {part number: (md5 hex, data)})
+    uploads: dict[str, tuple[str, str, dict[int, tuple[str, bytes]]]] = {}
+
+    def object_path(bucket: str, key: str) -> Path | None:
+        path = (root / bucket / key).resolve()
+        return path if path.is_relative_to((root / bucket).resolve()) else None
+
+    def etag_of(path: Path) -> str:
+        stat = path.stat()
+        cached = etags.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.md5(usedforsecurity=False)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+    async def throttle():
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+
+    @app.get("/{bucket}")
+    async def list_objects(bucket: str, request: Request, prefix: str = ""):
+        await throttle()
+        bucket_dir = root / bucket
+        if not bucket_dir.is_dir():
+            return _error(404, "NoSuchBucket", f"Bucket {bucket} does not exist.")
+        max_keys = int(request.query_params.get("max-keys", 1000))
+        after = request.query_params.get("continuation-token") or request.query_params.get("start-after") or ""
+        keys = sorted(
+            key for key in (p.relative_to(bucket_dir).as_posix() for p in bucket_dir.rglob("*") if p.is_file())
+            if key.startswith(prefix) and key > after and not key.endswith(".stubtmp")
+        )
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        contents = []
+        for key in page:
+            path = bucket_dir / key
+            stat = path.stat()
+            modified = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(stat.st_mtime))
+            contents.append(
+                f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                f"<ETag>{escape(etag_of(path))}</ETag><Size>{stat.st_size}</Size><StorageClass>STANDARD</StorageClass></Contents>"
+            )
+        token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+            f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{str(truncated).lower()}</IsTruncated>"
+            f"{''.join(contents)}{token}</ListBucketResult>"
+        )
+        return Response(body, media_type="application/xml")
+
+    @app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD"])
+    async def get_object(bucket: str, key: str, request: Request):
+        await throttle()
+        path = object_path(bucket, key)
+        if path is None or not path.is_file():
+            return _error(404, "NoSuchKey", f"The specified key does not exist: {key}")
+        etag, size = etag_of(path), path.stat().st_size
+        if_match = request.headers.get("if-match")
+        if if_match and if_match not in ("*", etag):
+            return _error(412, "PreconditionFailed", "At least one of the preconditions you specified did not hold.")
+
+        start, end, status = 0, size - 1, 200
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(path.stat().st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+        }
+        range_header = request.headers.get("range")
+        if range_header:
+            match = RANGE_PATTERN.match(range_header.strip())
+            if not match or not any(match.groups()):
+                return _error(416, "InvalidRange", "The requested range is not satisfiable.")
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            else:
+                start, end = max(size - int(last), 0), size - 1
+            if start >= size or start > end:
+                return _error(416, "InvalidRange", "The requested range is not satisfiable.")
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if request.method == "HEAD":
+            return Response(status_code=status, headers=headers)
+
+        async def body():
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    app.state.bytes_sent += len(chunk)
+                    if bandwidth:
+                        await asyncio.sleep(len(chunk) / bandwidth)
+                    yield chunk
+
+        return StreamingResponse(body(), status_code=status, headers=headers, media_type="application/octet-stream")
+
+    def store(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.stubtmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    @app.put("/{bucket}/{key:path}")
+    async def put_object(bucket: str, key: str, request: Request):
+        await throttle()
+        path = object_path(bucket, key)
+        if path is None:
+            return _error(400, "InvalidArgument", f"Invalid key: {key}")
+        data = await request.body()
+        if bandwidth:
+            await asyncio.sleep(len(data) / bandwidth)
+        if not _md5_matches(data, request.headers.get("content-md5")):
+            return _error(400, "BadDigest", "The Content-MD5 you specified did not match what was received.")
+        upload_id = request.query_params.get("uploadId")
+        if upload_id is not None:
+            if upload_id not in uploads:
+                return _error(404, "NoSuchUpload", f"Upload {upload_id} does not exist.")
+            md5 = hashlib.md5(data, usedforsecurity=False).hexdigest()
+            uploads[upload_id][2][int(request.query_params["partNumber"])] = (md5, data)
+            return Response(headers={"ETag": f'"{md5}"'})
+        store(path, data)
+        return Response(headers={"ETag": etag_of(path)})
+
+    @app.post("/{bucket}/{key:path}")
+    async def multipart(bucket: str, key: str, request: Request):
+        await throttle()
+        path = object_path(bucket, key)
+        if path is None:
+            return _error(400, "InvalidArgument", f"Invalid key: {key}")
+        if "uploads" in request.query_params:
+            upload_id = uuid.uuid4().hex
+            uploads[upload_id] = (bucket, key, {})
+            return _xml("InitiateMultipartUploadResult", Bucket=bucket, Key=key, UploadId=upload_id)
+        upload_id = request.query_params.get("uploadId")
+        if upload_id not in uploads:
+            return _error(404, "NoSuchUpload", f"Upload {upload_id} does not exist.")
+        parts = uploads[upload_id][2]
+        listed = [
+            (int(part.findtext("{*}PartNumber")), part.findtext("{*}ETag").strip('"'))
+            for part in ElementTree.fromstring(await request.body()).iter("{http://s3.amazonaws.com/doc/2006-03-01/}Part")
+        ]
+        if not listed or any(number not in parts or parts[number][0] != etag for number, etag in listed):
+            return _error(400, "InvalidPart", "One or more of the specified parts could not be found.")
+        del uploads[upload_id]
+        store(path, b"".join(parts[number][1] for number, _ in listed))
+        digest = hashlib.md5(b"".join(bytes.fromhex(parts[number][0]) for number, _ in listed), usedforsecurity=False)
+        etag = f'"{digest.hexdigest()}-{len(listed)}"'
+        stat = path.stat()
+        etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return _xml("CompleteMultipartUploadResult", Bucket=bucket, Key=key, ETag=etag)
+
+    @app.delete("/{bucket}/{key:path}")
+    async def abort_or_delete(bucket: str, key: str, request: Request):
+        await throttle()
+        upload_id = request.query_params.get("uploadId")
+        if upload_id is not None:
+            uploads.pop(upload_id, None)
+        else:
+            path = object_path(bucket, key)
+            if path is not None:
+                path.unlink(missing_ok=True)
+        return Response(status_code=204)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, required=True, help="Directory with one subdirectory per bucket.")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument("--bandwidth-mb", type=float, default=0.0, help="MB/s per connection; 0 means unlimited.")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.root, args.latency, args.bandwidth_mb * 1024 * 1024), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
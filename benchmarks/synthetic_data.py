@@ -0,0 +1,585 @@
+"""
+Deterministic synthetic Statcast, Lahman people and player-map data for offline benchmarks.
+
+Writes the same layout the ETL produces (partitioned pitch files, plate appearances,
+rollups, `lahman_people.parquet`, `player_map.parquet`) and a DuckDB file with the views,
+so the API runs against it unchanged with `DATA_DIR=<out>`.
+
+The data is shaped like the real thing: 30 teams with rotations, bullpens and lineups,
+~15 games a day, ~75 plate appearances per game with realistic outcome rates and pitch
+counts, per-pitcher repertoires with their own velocity, spin and movement, and batted
+balls whose exit velocity and launch angle fit the outcome. Names are drawn from small
+lists, so some players share a name, as real ones do. The same `--seed` and scale always
+produce the same rows.
+
+Usage:
+    python -m benchmarks.synthetic_data --out /tmp/hotcorner-bench --scale month
+    python -m benchmarks.synthetic_data --out /tmp/hotcorner-bench --scale seasons:10
+"""
+import argparse
+import datetime as dt
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from db.duckdb_init import initialize_database
+from etl.plate_appearances import derive_plate_appearances
+from etl.rollups import write_rollups
+from etl.statcast_layout import PLATE_APPEARANCES_PREFIX, day_file_name, write_partitions
+from etl.statcast_schema import normalize_statcast
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Written last, so its presence means the data set is complete
+SUMMARY_FILE = "synthetic.json"
+
+# --- Scale ---
+LAST_SEASON = 2024
+# Opening day and the last regular-season day, the same every year to keep things simple
+SEASON_START = (3, 28)
+SEASON_END = (9, 29)
+MAX_SEASONS = 10
+GAMES_PER_DAY = 15
+TEAMS = [
+    "ARI", "ATL", "BAL", "BOS", "CHC", "CWS", "CIN", "CLE", "COL", "DET", "HOU", "KC", "LAA", "LAD", "MIA",
+    "MIL", "MIN", "NYM", "NYY", "OAK", "PHI", "PIT", "SD", "SF", "SEA", "STL", "TB", "TEX", "TOR", "WSH",
+]
+STARTERS_PER_TEAM = 5
+RELIEVERS_PER_TEAM = 8
+BATTERS_PER_TEAM = 13
+# Share of each roster replaced between seasons
+ROSTER_TURNOVER = 0.12
+# Lahman rows for players who retired before the generated seasons (no Statcast rows)
+HISTORICAL_PLAYERS = 20_000
+
+FIRST_NAMES = [
+    "Aaron", "Adam", "Alex", "Andrew", "Anthony", "Austin", "Ben", "Blake", "Bobby", "Brandon", "Brent", "Bryce",
+    "Caleb", "Carlos", "Chris", "Cody", "Corey", "Dylan", "Eduardo", "Eric", "Felix", "Francisco", "Freddie",
+    "Gabriel", "Gavin", "George", "Hunter", "Ian", "Jack", "Jake", "James", "Jason", "Javier", "Jeff", "Jesus",
+    "Joe", "Jordan", "Jose", "Josh", "Juan", "Julio", "Justin", "Kevin", "Kyle", "Logan", "Luis", "Manny", "Marcus",
+    "Matt", "Max", "Michael", "Miguel", "Mike", "Nick", "Nolan", "Oscar", "Pablo", "Paul", "Pete", "Rafael",
+    "Ramon", "Ricky", "Robert", "Ryan", "Salvador", "Sam", "Sean", "Shane", "Spencer", "Taylor", "Trevor",
+    "Tyler", "Victor", "Vladimir", "Will", "Willy", "Yordan", "Zack",
+]
+LAST_NAMES = [
+    "Abreu", "Acuna", "Adams", "Alonso", "Alvarez", "Anderson", "Arenado", "Baez", "Bailey", "Baker", "Bell",
+    "Betts", "Bichette", "Bregman", "Brown", "Burnes", "Cabrera", "Campbell", "Carpenter", "Carter", "Castillo",
+    "Chapman", "Clark", "Cole", "Collins", "Cook", "Cooper", "Correa", "Cruz", "Davis", "Diaz", "Edwards",
+    "Evans", "Fernandez", "Flores", "Foster", "Freeman", "Garcia", "Gibson", "Gomez", "Gonzalez", "Gray",
+    "Green", "Gutierrez", "Hall", "Harper", "Harris", "Hernandez", "Hill", "Howard", "Hughes", "Jackson",
+    "James", "Jenkins", "Jimenez", "Johnson", "Jones", "Kelly", "Kim", "King", "Lee", "Lewis", "Lindor",
+    "Lopez", "Machado", "Marte", "Martin", "Martinez", "Medina", "Miller", "Mitchell", "Montgomery", "Moore",
+    "Morales", "Morgan", "Murphy", "Myers", "Nelson", "Nunez", "Ohtani", "Olson", "Ortiz", "Parker", "Perez",
+    "Peterson", "Phillips", "Price", "Ramirez", "Ramos", "Reed", "Reyes", "Richardson", "Rivera", "Roberts",
+    "Robinson", "Rodriguez", "Rogers", "Ruiz", "Sanchez", "Santana", "Scott", "Seager", "Smith", "Soto",
+    "Stewart", "Suarez", "Taylor", "Thomas", "Thompson", "Torres", "Turner", "Urias", "Valdez", "Vargas",
+    "Walker", "Ward", "Watson", "Webb", "Wheeler", "White", "Williams", "Wilson", "Witt", "Wood", "Wright",
+    "Young", "Zimmerman",
+]
+COUNTRIES = ["USA"] * 14 + ["D.R.", "D.R.", "D.R.", "Venezuela", "Venezuela", "Cuba", "Mexico", "P.R.", "Japan", "Canada"]
+
+# --- Pitches ---
+# code: (pitch_name, velocity vs. the pitcher's fastball, spin rate, pfx_x arm side, pfx_z, spin axis)
+PITCHES = {
+    "FF": ("4-Seam Fastball", 0.0, 2300, -0.6, 1.35, 210),
+    "SI": ("Sinker", -0.8, 2170, -1.3, 0.75, 225),
+    "FC": ("Cutter", -4.5, 2380, 0.25, 0.7, 190),
+    "SL": ("Slider", -8.5, 2450, 0.4, 0.15, 150),
+    "ST": ("Sweeper", -11.5, 2550, 1.25, 0.05, 90),
+    "CU": ("Curveball", -14.5, 2550, 0.7, -0.85, 40),
+    "KC": ("Knuckle Curve", -13.0, 2480, 0.6, -0.9, 45),
+    "CH": ("Changeup", -8.5, 1780, -1.25, 0.5, 235),
+    "FS": ("Split-Finger", -7.5, 1350, -0.85, 0.3, 230),
+}
+PITCH_CODES = list(PITCHES)
+FASTBALLS = ["FF", "SI"]
+SECONDARY = ["FC", "SL", "ST", "CU", "KC", "CH", "FS"]
+
+# --- Plate appearances ---
+# event: (probability, minimum pitches, woba_value)
+OUTCOMES = {
+    "strikeout": (0.224, 3, 0.0),
+    "walk": (0.082, 4, 0.69),
+    "hit_by_pitch": (0.011, 1, 0.72),
+    "single": (0.141, 1, 0.88),
+    "double": (0.044, 1, 1.25),
+    "triple": (0.004, 1, 1.59),
+    "home_run": (0.031, 1, 2.05),
+    "field_out": (0.385, 1, 0.0),
+    "force_out": (0.021, 1, 0.0),
+    "grounded_into_double_play": (0.021, 1, 0.0),
+    "sac_fly": (0.007, 1, 0.0),
+    "field_error": (0.008, 1, 0.0),
+    "fielders_choice": (0.002, 1, 0.0),
+    "strikeout_double_play": (0.001, 3, 0.0),
+}
+EVENT_NAMES = list(OUTCOMES)
+EVENT_PROBABILITIES = np.array([p for p, _, _ in OUTCOMES.values()])
+EVENT_PROBABILITIES /= EVENT_PROBABILITIES.sum()
+IN_PLAY = {"single", "double", "triple", "home_run", "field_out", "force_out", "grounded_into_double_play",
+           "sac_fly", "field_error", "fielders_choice"}
+HITS = {"single": 1, "double": 2, "triple": 3, "home_run": 4}
+# event: (exit velocity mean, sd, launch angle mean, sd)
+BATTED_BALLS = {
+    "single": (89, 11, 8, 14), "double": (97, 7, 17, 11), "triple": (96, 7, 18, 10), "home_run": (104.5, 3.5, 28, 5),
+    "field_out": (86, 14, 18, 26), "force_out": (84, 10, -6, 9), "grounded_into_double_play": (88, 9, -8, 8),
+    "sac_fly": (92, 7, 38, 7), "field_error": (86, 11, 0, 12), "fielders_choice": (82, 10, -5, 9),
+}
+DESCRIPTIONS = {
+    "strikeout": "strikes out", "walk": "walks", "hit_by_pitch": "is hit by a pitch", "single": "singles",
+    "double": "doubles", "triple": "triples", "home_run": "homers", "field_out": "flies out",
+    "force_out": "grounds into a force out", "grounded_into_double_play": "grounds into a double play",
+    "sac_fly": "hits a sacrifice fly", "field_error": "reaches on a fielding error",
+    "fielders_choice": "reaches on a fielder's choice", "strikeout_double_play": "strikes out, double play",
+}
+RUN_VALUES = {"strikeout": -0.27, "walk": 0.31, "hit_by_pitch": 0.33, "single": 0.46, "double": 0.77, "triple": 1.05,
+              "home_run": 1.4, "sac_fly": -0.1, "field_error": 0.45, "fielders_choice": -0.2,
+              "grounded_into_double_play": -0.75, "strikeout_double_play": -0.75}
+
+
+@dataclass
+class PlayerPool:
+    """Every generated player. Pitchers and batters are separate index ranges of the same arrays."""
+    mlbam: np.ndarray
+    first: np.ndarray
+    last: np.ndarray
+    bats: np.ndarray
+    throws: np.ndarray
+    debut: list[dt.date]
+    final: list[dt.date | None]
+    n_pitchers: int
+    # Per pitcher, per PITCH_CODES entry: usage share, velocity, spin, pfx_x, pfx_z
+    usage: np.ndarray
+    velocity: np.ndarray
+    spin: np.ndarray
+    pfx_x: np.ndarray
+    pfx_z: np.ndarray
+    extension: np.ndarray
+    # Per batter: strike zone top/bottom and a quality factor that shifts exit velocity
+    sz_top: np.ndarray
+    sz_bot: np.ndarray
+    power: np.ndarray
+    # season -> (pitchers by team [30, 13], batters by team [30, 13]), as pool indices
+    rosters: dict[int, tuple[np.ndarray, np.ndarray]]
+
+
+def scale_dates(scale: str) -> list[dt.date]:
+    """
+    Game dates for a scale preset: `week`, `month`, `season` or `seasons:N` (1-10, ending in
+    LAST_SEASON). `week` and `month` start on May 1 of LAST_SEASON.
+    """
+    if scale in ("week", "month"):
+        start = dt.date(LAST_SEASON, 5, 1)
+        end = start + dt.timedelta(days=6) if scale == "week" else dt.date(LAST_SEASON, 5, 31)
+        return [start + dt.timedelta(days=i) for i in range((end - start).days + 1)]
+    if scale == "season":
+        scale = "seasons:1"
+    if not scale.startswith("seasons:") or not scale[8:].isdigit() or not 1 <= int(scale[8:]) <= MAX_SEASONS:
+        raise ValueError(f"Unknown scale '{scale}'; use week, month, season or seasons:1-{MAX_SEASONS}.")
+    dates = []
+    for year in range(LAST_SEASON - int(scale[8:]) + 1, LAST_SEASON + 1):
+        start, end = dt.date(year, *SEASON_START), dt.date(year, *SEASON_END)
+        dates += [start + dt.timedelta(days=i) for i in range((end - start).days + 1)]
+    return dates
+
+
+def _names(rng: np.random.Generator, n: int) -> tuple[np.ndarray, np.ndarray]:
+    return rng.choice(FIRST_NAMES, n), rng.choice(LAST_NAMES, n)
+
+
+def _careers(rng: np.random.Generator, seasons: list[int], per_season: int) -> tuple[list[int], list[int | None]]:
+    """Debut and final season of enough players to fill `per_season` spots every season, with turnover."""
+    first, last = [], []
+    active = []
+    for season in seasons:
+        if not active:
+            for _ in range(per_season):
+                active.append(len(first))
+                first.append(season - int(rng.integers(0, 10)))
+                last.append(None)
+            continue
+        retiring = set(rng.choice(active, int(per_season * ROSTER_TURNOVER), replace=False).tolist())
+        for i in retiring:
+            last[i] = season - 1
+        active = [i for i in active if i not in retiring]
+        while len(active) < per_season:
+            active.append(len(first))
+            first.append(season)
+            last.append(None)
+    return first, last
+
+
+def build_pool(seed: int, dates: list[dt.date]) -> PlayerPool:
+    """Creates the players and the season-by-season rosters for `dates`."""
+    rng = np.random.default_rng([seed, 0])
+    seasons = sorted({d.year for d in dates})
+    pitchers_per_team = STARTERS_PER_TEAM + RELIEVERS_PER_TEAM
+    p_first, p_last = _careers(rng, seasons, len(TEAMS) * pitchers_per_team)
+    b_first, b_last = _careers(rng, seasons, len(TEAMS) * BATTERS_PER_TEAM)
+    n_pitchers, n_batters = len(p_first), len(b_first)
+    n = n_pitchers + n_batters
+    first_names, last_names = _names(rng, n)
+    last_date = dates[-1]
+
+    # Players who debut during the generated dates do so on the first game date of that season
+    opening = {}
+    for d in dates:
+        opening.setdefault(d.year, d)
+    debut = [opening.get(year) or dt.date(year, 4, 1) + dt.timedelta(days=int(rng.integers(0, 150)))
+             for year in p_first + b_first]
+    final = [dt.date(year, 9, 28) if year is not None else last_date for year in p_last + b_last]
+
+    throws = np.where(rng.random(n) < 0.28, "L", "R")
+    bats = np.where(rng.random(n) < 0.33, "L", np.where(rng.random(n) < 0.05, "S", "R"))
+    bats[:n_pitchers] = throws[:n_pitchers]
+
+    # Repertoires: one or two fastballs plus secondaries; starters throw more pitch types
+    k = len(PITCH_CODES)
+    usage = np.zeros((n_pitchers, k))
+    for i in range(n_pitchers):
+        fastballs = rng.choice(FASTBALLS, int(rng.integers(1, 3)), replace=False)
+        secondary = rng.choice(SECONDARY, int(rng.integers(1, 5)), replace=False)
+        for j, code in enumerate([*fastballs, *secondary]):
+            usage[i, PITCH_CODES.index(code)] = (3.0 if code in FASTBALLS else 1.0) * rng.uniform(0.5, 1.5)
+    usage /= usage.sum(axis=1, keepdims=True)
+    fastball = rng.normal(94.0, 2.2, (n_pitchers, 1))
+    offsets = np.array([PITCHES[c][1] for c in PITCH_CODES])
+    velocity = fastball + offsets + rng.normal(0, 1.0, (n_pitchers, k))
+    spin = np.array([PITCHES[c][2] for c in PITCH_CODES]) + rng.normal(0, 140, (n_pitchers, k))
+    arm_side = np.where(throws[:n_pitchers] == "L", -1.0, 1.0)[:, None]
+    pfx_x = (np.array([PITCHES[c][3] for c in PITCH_CODES]) + rng.normal(0, 0.2, (n_pitchers, k))) * arm_side
+    pfx_z = np.array([PITCHES[c][4] for c in PITCH_CODES]) + rng.normal(0, 0.15, (n_pitchers, k))
+    extension = rng.normal(6.4, 0.35, n_pitchers)
+
+    sz_top = rng.normal(3.4, 0.12, n)
+    sz_bot = rng.normal(1.6, 0.08, n)
+    power = rng.normal(0.0, 2.5, n)
+
+    rosters = {}
+    for season in seasons:
+        active_p = np.array([i for i in range(n_pitchers) if p_first[i] <= season and (p_last[i] is None or p_last[i] >= season)])
+        active_b = np.array([i for i in range(n_batters) if b_first[i] <= season and (b_last[i] is None or b_last[i] >= season)])
+        season_rng = np.random.default_rng([seed, season])
+        rosters[season] = (
+            season_rng.permutation(active_p)[:len(TEAMS) * pitchers_per_team].reshape(len(TEAMS), pitchers_per_team),
+            season_rng.permutation(active_b)[:len(TEAMS) * BATTERS_PER_TEAM].reshape(len(TEAMS), BATTERS_PER_TEAM)
+            + n_pitchers,
+        )
+
+    mlbam = 400_000 + rng.choice(300_000, n, replace=False)
+    return PlayerPool(
+        mlbam=mlbam, first=first_names, last=last_names, bats=bats, throws=throws, debut=debut, final=final,
+        n_pitchers=n_pitchers, usage=usage, velocity=velocity, spin=spin, pfx_x=pfx_x, pfx_z=pfx_z,
+        extension=extension, sz_top=sz_top, sz_bot=sz_bot, power=power, rosters=rosters,
+    )
+
+
+def _cumcount(lengths: np.ndarray) -> np.ndarray:
+    """0, 1, ..., n-1 for each run length in `lengths`, concatenated."""
+    return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+def simulate_day(pool: PlayerPool, game_date: dt.date, seed: int, games: int = GAMES_PER_DAY) -> pd.DataFrame:
+    """
+    Generates every pitch of one game date. The rows depend only on the pool, the date and the seed,
+    so any day can be regenerated on its own.
+    """
+    rng = np.random.default_rng([seed, game_date.toordinal()])
+    pitchers_by_team, batters_by_team = pool.rosters[game_date.year]
+    day_of_season = (game_date - dt.date(game_date.year, *SEASON_START)).days
+    matchups = rng.permutation(len(TEAMS))[:2 * games].reshape(games, 2)  # away, home
+
+    # Lineups: mostly the nine regulars, sometimes a bench player
+    lineups = np.empty((games, 2, 9), dtype=np.int64)
+    for g in range(games):
+        for side in range(2):
+            roster = batters_by_team[matchups[g, side]]
+            lineup = roster[:9].copy()
+            rested = rng.random(9) < 0.1
+            lineup[rested] = rng.choice(roster[9:], rested.sum())
+            lineups[g, side] = lineup
+    starter_innings = rng.integers(5, 8, (games, 2))
+    relief = rng.integers(0, RELIEVERS_PER_TEAM, (games, 2, 10))
+
+    # --- Plate appearances ---
+    pa_counts = rng.integers(66, 86, games)
+    game = np.repeat(np.arange(games), pa_counts)
+    at_bat = _cumcount(pa_counts) + 1
+    half = (at_bat - 1) * 18 // pa_counts[game]
+    inning = half // 2 + 1
+    top = half % 2 == 0
+    batting_side = np.where(top, 0, 1)
+    fielding_side = 1 - batting_side
+    slot = pd.Series(game * 2 + batting_side).groupby(game * 2 + batting_side).cumcount().to_numpy() % 9
+    batter = lineups[game, batting_side, slot]
+    fielding_team = matchups[game, fielding_side]
+    starter = pitchers_by_team[fielding_team, (day_of_season + fielding_team) % STARTERS_PER_TEAM]
+    reliever = pitchers_by_team[fielding_team, STARTERS_PER_TEAM + relief[game, fielding_side, np.minimum(inning, 9)]]
+    pitcher = np.where(inning <= starter_innings[game, fielding_side], starter, reliever)
+    in_half = pd.Series(game * 18 + half).groupby(game * 18 + half).cumcount().to_numpy()
+    half_size = np.bincount(game * 18 + half, minlength=games * 18)[game * 18 + half]
+    outs = np.minimum(2, in_half * 3 // np.maximum(half_size, 1))
+
+    event = rng.choice(len(EVENT_NAMES), len(game), p=EVENT_PROBABILITIES)
+    minimum = np.array([m for _, m, _ in OUTCOMES.values()])[event]
+    pitches = np.clip(np.maximum(minimum, 1 + rng.poisson(2.9, len(game))), 1, 12)
+    # Final count before the last pitch
+    event_name = np.array(EVENT_NAMES)[event]
+    strikeout = np.isin(event_name, ["strikeout", "strikeout_double_play"])
+    walk = event_name == "walk"
+    final_balls = np.where(strikeout, np.minimum(3, pitches - 3),
+                  np.where(walk, 3, np.minimum(3, rng.binomial(pitches - 1, 0.45))))
+    final_strikes = np.where(strikeout, 2, np.where(walk, np.minimum(2, pitches - 4),
+                    np.minimum(2, pitches - 1 - final_balls)))
+
+    # --- Pitches ---
+    pa = np.repeat(np.arange(len(game)), pitches)
+    pitch_number = _cumcount(pitches) + 1
+    n = len(pa)
+    last = pitch_number == pitches[pa]
+    progress = np.where(pitches[pa] > 1, (pitch_number - 1) / np.maximum(pitches[pa] - 1, 1), 0)
+    balls = np.floor(final_balls[pa] * progress).astype(int)
+    strikes = np.minimum(final_strikes[pa], pitch_number - 1 - balls)
+    next_balls = np.append(balls[1:], 0)
+    next_strikes = np.append(strikes[1:], 0)
+    strike_kind = rng.choice(["called_strike", "swinging_strike", "foul"], n, p=[0.45, 0.3, 0.25])
+    description = np.where(next_balls > balls, "ball", np.where(next_strikes > strikes, strike_kind, "foul"))
+    final_event = event_name[pa]
+    final_description = np.where(np.isin(final_event, list(IN_PLAY)), "hit_into_play",
+                        np.where(np.isin(final_event, ["strikeout", "strikeout_double_play"]),
+                                 np.where(rng.random(n) < 0.75, "swinging_strike", "called_strike"),
+                        np.where(final_event == "hit_by_pitch", "hit_by_pitch", "ball")))
+    description = np.where(last, final_description, description)
+    pitch_kind = np.where(np.isin(description, ["ball", "hit_by_pitch"]), "B",
+                          np.where(description == "hit_into_play", "X", "S"))
+
+    p = pitcher[pa]
+    cumulative = np.cumsum(pool.usage[p], axis=1)
+    pitch_index = np.minimum((cumulative < rng.random((n, 1))).sum(axis=1), len(PITCH_CODES) - 1)
+    pitch_codes = np.array(PITCH_CODES)[pitch_index]
+    pitch_names = np.array([PITCHES[c][0] for c in PITCH_CODES])[pitch_index]
+    release_speed = np.round(pool.velocity[p, pitch_index] + rng.normal(0, 0.9, n), 1)
+    extension = np.round(pool.extension[p] + rng.normal(0, 0.1, n), 1)
+    effective_speed = np.round(release_speed + (extension - 6.2) * 0.8 + rng.normal(0, 0.4, n), 1)
+    spin_rate = np.round(pool.spin[p, pitch_index] + rng.normal(0, 55, n))
+    axis = np.array([PITCHES[c][5] for c in PITCH_CODES])[pitch_index]
+    lefty = pool.throws[p] == "L"
+    spin_axis = np.round(np.where(lefty, 360 - axis, axis) + rng.normal(0, 12, n)) % 360
+    b = batter[pa]
+    sz_top, sz_bot = np.round(pool.sz_top[b], 2), np.round(pool.sz_bot[b], 2)
+    plate_x = rng.normal(0, 0.85, n)
+    plate_z = rng.normal((sz_top + sz_bot) / 2 - 0.1, 0.9, n)
+    zone_column = np.clip(((plate_x + 0.83) / (1.66 / 3)).astype(int), 0, 2)
+    zone_row = np.clip(((sz_top - plate_z) / ((sz_top - sz_bot) / 3)).astype(int), 0, 2)
+    in_zone = (np.abs(plate_x) <= 0.83) & (plate_z >= sz_bot) & (plate_z <= sz_top)
+    zone = np.where(in_zone, zone_row * 3 + zone_column + 1,
+                    11 + (plate_x > 0).astype(int) + 2 * (plate_z < (sz_top + sz_bot) / 2).astype(int))
+
+    # Batted balls on the last pitch of balls in play
+    batted = last & (description == "hit_into_play")
+    params = np.array([BATTED_BALLS.get(e, (0, 1, 0, 1)) for e in EVENT_NAMES])[event[pa]]
+    launch_speed = np.clip(params[:, 0] + pool.power[b] + params[:, 1] * rng.standard_normal(n), 20, 121)
+    launch_angle = np.round(params[:, 2] + params[:, 3] * rng.standard_normal(n))
+    home_run = final_event == "home_run"
+    launch_angle = np.where(home_run, np.clip(launch_angle, 18, 42), launch_angle)
+    distance = np.where(launch_angle > 0,
+                        (launch_speed - 40) * 5.0 * np.cos(np.radians(launch_angle - 28)),
+                        (launch_speed - 40) * 1.2) + rng.normal(0, 10, n)
+    distance = np.where(home_run, np.maximum(distance, 340), distance)
+    bb_type = np.where(launch_angle < 10, "ground_ball", np.where(launch_angle < 25, "line_drive",
+                       np.where(launch_angle < 50, "fly_ball", "popup")))
+    hit_location = np.where(bb_type == "ground_ball", rng.integers(3, 7, n), rng.integers(7, 10, n))
+    sweet_spot = np.exp(-((launch_angle - 16) / 18) ** 2)
+    xba = np.clip(0.03 + 0.85 * sweet_spot / (1 + np.exp(-(launch_speed - 92) / 5)) + 0.12 * (launch_angle < 10), 0, 0.99)
+    barrel = (launch_speed >= 98) & (launch_angle >= 26) & (launch_angle <= 30 + (launch_speed - 98))
+    xba = np.where(barrel, np.maximum(xba, 0.6), xba)
+    xslg = np.clip(xba * (1 + 2.2 * np.clip((launch_speed - 85) / 20, 0, 1) * (launch_angle > 10)), 0, 3.9)
+    xwoba = np.clip(0.7 * xba + 0.3 * xslg + 0.05, 0, 2.0)
+    speed_angle = np.where(barrel, 6, np.where(launch_speed < 60, 1, np.where(launch_angle < 10, 2,
+                  np.where(launch_angle > 35, 3, np.where(launch_speed >= 95, 5, 4)))))
+
+    woba_value = np.array([w for _, _, w in OUTCOMES.values()])[event[pa]]
+    run_value = np.array([RUN_VALUES.get(e, -0.25) for e in EVENT_NAMES])[event[pa]]
+    delta_run_exp = np.where(last, run_value, np.where(pitch_kind == "B", 0.035, -0.045)) + rng.normal(0, 0.01, n)
+    hit_bases = np.array([HITS.get(e, 0) for e in EVENT_NAMES])[event[pa]]
+
+    names_by_pool = np.char.add(np.char.add(pool.first, " "), pool.last)
+    phrases = np.array([DESCRIPTIONS[e] for e in EVENT_NAMES])[event[pa]]
+    des = np.char.add(np.char.add(names_by_pool[b], " "), np.char.add(phrases, "."))
+    game_pk = 700_000 + (game_date - dt.date(LAST_SEASON - MAX_SEASONS, 1, 1)).days * 20 + game[pa]
+    away = np.array(TEAMS)[matchups[game[pa], 0]]
+    home = np.array(TEAMS)[matchups[game[pa], 1]]
+    release_x = np.where(lefty, 1.0, -1.0) * rng.normal(1.9, 0.3, n)
+
+    def final_only(values, mask=last):
+        return pd.Series(values).where(mask)
+
+    df = pd.DataFrame({
+        "pitch_type": pitch_codes,
+        "game_date": game_date,
+        "release_speed": release_speed,
+        "release_pos_x": np.round(release_x, 2),
+        "release_pos_z": np.round(rng.normal(5.8, 0.3, n), 2),
+        "player_name": np.char.add(np.char.add(pool.last[p], ", "), pool.first[p]),
+        "batter": pool.mlbam[b],
+        "pitcher": pool.mlbam[p],
+        "events": final_only(final_event),
+        "description": description,
+        "zone": zone,
+        "des": final_only(des),
+        "game_type": "R",
+        "stand": np.where(pool.bats[b] == "S", np.where(lefty, "R", "L"), pool.bats[b]),
+        "p_throws": pool.throws[p],
+        "home_team": home,
+        "away_team": away,
+        "type": pitch_kind,
+        "hit_location": final_only(hit_location, batted),
+        "bb_type": final_only(bb_type, batted),
+        "balls": balls,
+        "strikes": strikes,
+        "game_year": game_date.year,
+        "pfx_x": np.round(pool.pfx_x[p, pitch_index] + rng.normal(0, 0.12, n), 2),
+        "pfx_z": np.round(pool.pfx_z[p, pitch_index] + rng.normal(0, 0.12, n), 2),
+        "plate_x": np.round(plate_x, 2),
+        "plate_z": np.round(plate_z, 2),
+        "outs_when_up": outs[pa],
+        "inning": inning[pa],
+        "inning_topbot": np.where(top[pa], "Top", "Bot"),
+        "sz_top": sz_top,
+        "sz_bot": sz_bot,
+        "hit_distance_sc": final_only(np.round(np.maximum(distance, 5)), batted),
+        "launch_speed": final_only(np.round(launch_speed, 1), batted),
+        "launch_angle": final_only(launch_angle, batted),
+        "effective_speed": effective_speed,
+        "release_spin_rate": spin_rate,
+        "release_extension": extension,
+        "game_pk": game_pk,
+        "at_bat_number": at_bat[pa],
+        "pitch_number": pitch_number,
+        "pitch_name": pitch_names,
+        "estimated_ba_using_speedangle": final_only(np.round(xba, 3), batted),
+        "estimated_woba_using_speedangle": final_only(np.round(xwoba, 3), batted),
+        "estimated_slg_using_speedangle": final_only(np.round(xslg, 3), batted),
+        "woba_value": final_only(woba_value),
+        "woba_denom": final_only(np.ones(n)),
+        "babip_value": final_only((hit_bases > 0) & (hit_bases < 4), batted & ~home_run).astype("float"),
+        "iso_value": final_only(np.maximum(hit_bases - 1, 0)),
+        "launch_speed_angle": final_only(speed_angle, batted),
+        "spin_axis": spin_axis,
+        "delta_run_exp": np.round(delta_run_exp, 3),
+    })
+    return normalize_statcast(df)
+
+
+def _retro_ids(first: np.ndarray, last: np.ndarray) -> tuple[list[str], list[str]]:
+    """Lahman playerID (`judgeaa01`) and Retrosheet ID (`judga001`) styles, made unique with a counter."""
+    player_ids, retro_ids = [], []
+    seen: dict[str, int] = {}
+    for first_name, last_name in zip(first, last):
+        last_name, first_name = (last_name.lower() + "xxxxx"), first_name.lower()
+        player_stem, retro_stem = last_name[:5] + first_name[:2], last_name[:4] + first_name[0]
+        seen[player_stem] = seen.get(player_stem, 0) + 1
+        seen[retro_stem] = seen.get(retro_stem, 0) + 1
+        player_ids.append(f"{player_stem}{seen[player_stem]:02d}")
+        retro_ids.append(f"{retro_stem}{seen[retro_stem]:03d}")
+    return player_ids, retro_ids
+
+
+def people_tables(pool: PlayerPool, seed: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """The Lahman people and Chadwick-style player-map tables for the pool plus historical players."""
+    rng = np.random.default_rng([seed, 1])
+    hist_first, hist_last = _names(rng, HISTORICAL_PLAYERS)
+    hist_debut_year = rng.integers(1871, LAST_SEASON - MAX_SEASONS - 5, HISTORICAL_PLAYERS)
+    first = np.concatenate([pool.first, hist_first])
+    last = np.concatenate([pool.last, hist_last])
+    debut = [d.isoformat() for d in pool.debut] + [f"{y}-0{rng.integers(4, 10)}-{rng.integers(10, 29)}" for y in hist_debut_year]
+    final = [d.isoformat() for d in pool.final] + [
+        f"{y + int(rng.integers(0, 15))}-09-{rng.integers(10, 29)}" for y in hist_debut_year]
+    birth_year = np.concatenate([[d.year - int(rng.integers(21, 27)) for d in pool.debut], hist_debut_year - rng.integers(20, 27, HISTORICAL_PLAYERS)])
+    bats = np.concatenate([pool.bats, rng.choice(["R", "L", "B"], HISTORICAL_PLAYERS, p=[0.62, 0.3, 0.08])])
+    bats = np.where(bats == "S", "B", bats)
+    throws = np.concatenate([pool.throws, rng.choice(["R", "L"], HISTORICAL_PLAYERS, p=[0.75, 0.25])])
+    player_ids, retro_ids = _retro_ids(first, last)
+
+    people = pd.DataFrame({
+        "playerID": player_ids,
+        "birthYear": birth_year,
+        "birthCountry": rng.choice(COUNTRIES, len(first)),
+        "nameFirst": first,
+        "nameLast": last,
+        "bats": bats,
+        "throws": throws,
+        "debut": debut,
+        "finalGame": final,
+        "retroID": retro_ids,
+    })
+    # Only the Statcast-era players have MLBAM IDs, like the real register
+    mlbam = pd.array(np.concatenate([pool.mlbam, np.zeros(HISTORICAL_PLAYERS, dtype=np.int64)]), dtype="Int64")
+    mlbam[len(pool.mlbam):] = pd.NA
+    player_map = pd.DataFrame({"key_mlbam": mlbam, "key_retro": retro_ids, "name_first": first, "name_last": last})
+    return people, player_map
+
+
+def generate(out_dir: Path, scale: str = "month", seed: int = 42, workers: int = 4) -> dict:
+    """
+    Writes the synthetic data set under `out_dir` (`parquet/` and `mlb.duckdb`).
+
+    Returns:
+        A summary with the number of days, pitches, plate appearances and players written.
+    """
+    dates = scale_dates(scale)
+    parquet_dir = out_dir / "parquet"
+    parquet_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    pool = build_pool(seed, dates)
+
+    def write_day(game_date: dt.date) -> tuple[int, int]:
+        df = simulate_day(pool, game_date, seed)
+        write_partitions(df, parquet_dir, day_file_name(game_date))
+        pas = derive_plate_appearances(df)
+        write_partitions(pas, parquet_dir, day_file_name(game_date), PLATE_APPEARANCES_PREFIX)
+        write_rollups(df, game_date, parquet_dir)
+        return len(df), len(pas)
+
+    pitches = plate_appearances = 0
+    # Days are independent (each has its own random stream), so they can be written in any order
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, (day_pitches, day_pas) in enumerate(executor.map(write_day, dates)):
+            pitches += day_pitches
+            plate_appearances += day_pas
+            if (i + 1) % 30 == 0:
+                logging.info(f"Generated {i + 1}/{len(dates)} days ({pitches} pitches).")
+
+    people, player_map = people_tables(pool, seed)
+    people.to_parquet(parquet_dir / "lahman_people.parquet", index=False)
+    player_map.to_parquet(parquet_dir / "player_map.parquet", index=False)
+    initialize_database(out_dir / "mlb.duckdb", parquet_dir)
+
+    summary = {
+        "scale": scale, "seed": seed, "days": len(dates), "pitches": pitches,
+        "plate_appearances": plate_appearances, "players": len(pool.mlbam), "people": len(people),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    (out_dir / SUMMARY_FILE).write_text(json.dumps(summary, indent=2))
+    logging.info(f"Synthetic data written to {out_dir}: {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True, help="Output directory; point the API at it with DATA_DIR.")
+    parser.add_argument("--scale", default="month", help=f"week, month, season or seasons:N (N up to {MAX_SEASONS}).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=4, help="Days generated in parallel.")
+    args = parser.parse_args()
+    generate(args.out, args.scale, args.seed, args.workers)
+
+
+if __name__ == "__main__":
+    main()
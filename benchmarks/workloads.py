@@ -0,0 +1,189 @@
+"""
+Fixed set of representative SQL workloads, timed on the API's pooled cursors.
+
+The statements are the shapes `nl_to_sql` and the SQL templates emit: per-player
+aggregates by ID, event counts on the plate-appearance table, top-N leaderboards,
+rollup-eligible aggregates, single-day scans, name joins and Lahman lookups. Player
+IDs, names and dates are filled in from the data set, so the same workloads run on
+any scale. Each statement goes through the rollup router like a `/query` request,
+but skips the result cache so the database does the work every time.
+
+Reports the first (cold) run and warm p50/p95/p99 per workload, then throughput with
+`--concurrency` threads running the whole mix.
+
+Usage:
+    DATA_DIR=/tmp/hotcorner-bench python -m benchmarks.workloads --iterations 20
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from benchmarks.bench_db_pool import latency_summary, peak_rss_mb
+
+
+@dataclass(frozen=True)
+class Workload:
+    name: str
+    # SQL with {pitcher}, {batter}, {year}, {date}, {first}, {last} placeholders
+    sql: str
+
+
+WORKLOADS = [
+    Workload("pitcher_velocity_by_type",
+             "SELECT pitch_type, AVG(release_speed) AS avg_speed, COUNT(*) AS pitches FROM v_statcast "
+             "WHERE pitcher = {pitcher} AND game_year = {year} GROUP BY pitch_type ORDER BY pitches DESC"),
+    Workload("batter_home_runs",
+             "SELECT COUNT(*) AS home_runs FROM v_plate_appearances "
+             "WHERE batter = {batter} AND events = 'home_run' AND game_year = {year}"),
+    Workload("fastest_pitches",
+             "SELECT player_name, release_speed, pitch_type, game_date FROM v_statcast "
+             "WHERE game_year = {year} AND release_speed IS NOT NULL ORDER BY release_speed DESC LIMIT 10"),
+    Workload("hardest_hit_by_batter",
+             "SELECT game_date, launch_speed, launch_angle, events FROM v_statcast "
+             "WHERE batter = {batter} AND launch_speed IS NOT NULL ORDER BY launch_speed DESC LIMIT 10"),
+    Workload("strikeout_leaders",
+             "SELECT pitcher, ANY_VALUE(player_name) AS player_name, COUNT(*) AS strikeouts FROM v_plate_appearances "
+             "WHERE events IN ('strikeout', 'strikeout_double_play') AND game_year = {year} "
+             "GROUP BY pitcher ORDER BY strikeouts DESC LIMIT 10"),
+    Workload("spin_by_pitch_type",
+             "SELECT pitch_name, AVG(release_spin_rate) AS avg_spin, MAX(release_spin_rate) AS max_spin "
+             "FROM v_statcast WHERE game_year = {year} GROUP BY pitch_name ORDER BY avg_spin DESC"),
+    Workload("exit_velocity_leaders",
+             "SELECT batter, AVG(launch_speed) AS avg_exit_velocity, COUNT(launch_speed) AS batted_balls FROM v_statcast "
+             "WHERE game_year = {year} GROUP BY batter HAVING COUNT(launch_speed) >= 50 "
+             "ORDER BY avg_exit_velocity DESC LIMIT 10"),
+    Workload("pitch_mix_by_count",
+             "SELECT balls, strikes, pitch_type, COUNT(*) AS pitches FROM v_statcast WHERE pitcher = {pitcher} "
+             "GROUP BY balls, strikes, pitch_type ORDER BY balls, strikes, pitches DESC"),
+    Workload("whiff_rate_by_type",
+             "SELECT pitch_type, AVG(CASE WHEN description IN ('swinging_strike', 'swinging_strike_blocked') "
+             "THEN 1 ELSE 0 END) AS whiff_rate FROM v_statcast "
+             "WHERE description NOT IN ('ball', 'called_strike', 'hit_by_pitch') AND game_year = {year} "
+             "GROUP BY pitch_type ORDER BY whiff_rate DESC"),
+    Workload("single_day_pitches",
+             "SELECT game_pk, at_bat_number, pitch_number, player_name, batter, pitch_type, release_speed, "
+             "description, events FROM v_statcast WHERE game_date = '{date}' "
+             "ORDER BY game_pk, at_bat_number, pitch_number"),
+    Workload("home_run_leaders_by_name",
+             "SELECT m.name_first, m.name_last, COUNT(*) AS home_runs FROM v_plate_appearances p "
+             "JOIN v_player_map m ON m.key_mlbam = p.batter WHERE p.events = 'home_run' "
+             "GROUP BY m.name_first, m.name_last ORDER BY home_runs DESC LIMIT 10"),
+    Workload("player_debut",
+             "SELECT nameFirst, nameLast, debut FROM v_lahman_people "
+             "WHERE nameFirst = '{first}' AND nameLast = '{last}' LIMIT 1"),
+    Workload("season_summary",
+             "SELECT game_year, COUNT(*) AS pitches, AVG(release_speed) AS avg_speed, AVG(launch_speed) AS avg_exit_velocity "
+             "FROM v_statcast GROUP BY game_year ORDER BY game_year"),
+]
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def workload_params(con) -> dict:
+    """Picks the busiest pitcher and batter, the latest season and game date of the data set."""
+    pitcher, year, date = con.execute(
+        "SELECT pitcher, MAX(game_year), MAX(game_date) FROM v_plate_appearances "
+        "GROUP BY pitcher ORDER BY COUNT(*) DESC, pitcher LIMIT 1"
+    ).fetchone()
+    batter = con.execute(
+        "SELECT batter FROM v_plate_appearances GROUP BY batter ORDER BY COUNT(*) DESC, batter LIMIT 1"
+    ).fetchone()[0]
+    first, last = con.execute("SELECT name_first, name_last FROM v_player_map WHERE key_mlbam = ?", [pitcher]).fetchone()
+    latest = con.execute("SELECT MAX(game_date) FROM v_statcast").fetchone()[0]
+    return {"pitcher": pitcher, "batter": batter, "year": year, "date": latest.isoformat(), "first": first, "last": last}
+
+
+def run(iterations: int = 20, concurrency: int = 4, rounds: int = 5) -> dict:
+    """
+    Runs every workload once cold and `iterations` times warm, then `rounds` passes of the
+    whole mix on `concurrency` threads.
+
+    Returns:
+        Per-workload latencies, throughput and peak RSS, ready for JSON.
+    """
+    # Imported here so DATA_DIR/DUCKDB_* from the environment are read by the caller's process
+    from api import db_handler
+    from api.query_router import QueryRouter
+
+    pool = db_handler.init_pool()
+    if pool is None:
+        raise SystemExit(1)
+    router = QueryRouter(version=db_handler.result_cache.current_version)
+    try:
+        with pool.cursor() as con:
+            router.load(con)
+            params = workload_params(con)
+        statements = {w.name: router.route(w.sql.format(**params)) for w in WORKLOADS}
+
+        def execute(name: str) -> tuple[float, int]:
+            start = time.perf_counter()
+            with pool.cursor() as con:
+                table = con.execute(statements[name].sql).arrow()
+            return (time.perf_counter() - start) * 1000, table.num_rows
+
+        queries = {}
+        for workload in WORKLOADS:
+            cold, rows = execute(workload.name)
+            warm = [execute(workload.name)[0] for _ in range(iterations)]
+            queries[workload.name] = {
+                "rows": rows, "rollup": statements[workload.name].rollup,
+                "cold_ms": round(cold, 2), **latency_summary(warm),
+            }
+            logging.info(f"{workload.name}: cold {cold:.1f} ms, warm p50 {queries[workload.name]['p50_ms']:.1f} ms")
+
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(offset: int):
+            for i in range(rounds * len(WORKLOADS)):
+                elapsed, _ = execute(WORKLOADS[(offset + i) % len(WORKLOADS)].name)
+                with lock:
+                    latencies.append(elapsed)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    finally:
+        db_handler.close_pool()
+
+    return {
+        "suite": "workloads",
+        "params": {k: str(v) for k, v in params.items()},
+        "queries": queries,
+        "throughput": {
+            "concurrency": concurrency, "queries": len(latencies), "wall_s": round(wall, 3),
+            "qps": round(len(latencies) / wall, 2), **latency_summary(latencies),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="Warm runs per workload.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads in the throughput phase.")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the mix per thread in the throughput phase.")
+    parser.add_argument("--json", type=Path, help="Write the results to this file.")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.concurrency, args.rounds)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    for name, stats in results["queries"].items():
+        print(f"{name:<28} rows={stats['rows']:<6} cold={stats['cold_ms']:8.1f} ms  "
+              f"p50={stats['p50_ms']:8.1f} ms  p95={stats['p95_ms']:8.1f} ms  p99={stats['p99_ms']:8.1f} ms")
+    throughput = results["throughput"]
+    print(f"throughput: {throughput['qps']:.1f} queries/s with {throughput['concurrency']} threads "
+          f"(p50 {throughput['p50_ms']:.1f} ms, p99 {throughput['p99_ms']:.1f} ms); peak RSS {results['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
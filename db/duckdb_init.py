@@ -1,46 +1,173 @@
+import argparse
 import duckdb
+import hashlib
 import logging
+import os
+import time
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-DB_FILE = PROJECT_ROOT / "data" / "mlb.duckdb"
-PARQUET_DIR = PROJECT_ROOT / "data" / "parquet"
+# DATA_DIR points everything at another data set, e.g. the synthetic one built by the benchmarks
+DATA_DIR = Path(os.getenv("DATA_DIR", str(PROJECT_ROOT / "data")))
+DB_FILE = DATA_DIR / "mlb.duckdb"
+PARQUET_DIR = DATA_DIR / "parquet"
+# Database files built by hot reloads (see api/data_reload.py); DB_FILE is rebuilt at container start
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+
+# The Parquet files (or globs) behind each view
+VIEW_SOURCES = {
+    "v_statcast": "statcast/**/*.parquet",
+    "v_plate_appearances": "plate_appearances/**/*.parquet",
+    "v_lahman_people": "lahman_people.parquet",
+    "v_player_map": "player_map.parquet",
+    # Pre-aggregated rollups of v_statcast, see etl/rollups.py
+    "v_batter_daily": "rollups/batter_daily/**/*.parquet",
+    "v_pitcher_daily": "rollups/pitcher_daily/**/*.parquet",
+}
+# Extra read_parquet options per view. Statcast is Hive-partitioned by game_year/game_month,
+# so filters on those columns skip whole directories; union_by_name absorbs columns
+# that Statcast added in later seasons.
+VIEW_READ_OPTIONS = {
+    "v_statcast": "hive_partitioning = true, union_by_name = true",
+    "v_plate_appearances": "hive_partitioning = true, union_by_name = true",
+    "v_batter_daily": "hive_partitioning = true, union_by_name = true",
+    "v_pitcher_daily": "hive_partitioning = true, union_by_name = true",
+}
+# Flat files written before the partitioned layout. Migrate them with `python -m etl.migrate_statcast_layout`.
+LEGACY_STATCAST_PATTERN = "statcast_*.parquet"
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def initialize_database():
+def data_files(parquet_dir: Path = PARQUET_DIR) -> list[Path]:
     """
-    Initializes the DuckDB database by dropping and recreating all views.
+    Lists every Parquet file currently behind the views, in a stable order.
+    """
+    files = []
+    for pattern in [*VIEW_SOURCES.values(), LEGACY_STATCAST_PATTERN]:
+        files.extend(sorted(parquet_dir.glob(pattern)))
+    return files
+
+def data_version(parquet_dir: Path = PARQUET_DIR) -> str:
+    """
+    Returns a short hash of the names, sizes and modification times of the files
+    behind the views. It changes whenever a file is added, removed or rewritten.
+    """
+    digest = hashlib.sha256()
+    for path in data_files(parquet_dir):
+        stat = path.stat()
+        digest.update(f"{path.relative_to(parquet_dir)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def view_definitions(parquet_dir: Path = PARQUET_DIR) -> dict[str, str]:
+    """
+    Returns the SELECT behind every view whose files exist under `parquet_dir`.
+    """
+    definitions = {}
+    for view_name, pattern in VIEW_SOURCES.items():
+        options = VIEW_READ_OPTIONS.get(view_name)
+        if view_name == "v_statcast" and not any(parquet_dir.glob(pattern)) and any(parquet_dir.glob(LEGACY_STATCAST_PATTERN)):
+            logging.warning("No partitioned Statcast files found; using legacy flat files. Run `python -m etl.migrate_statcast_layout`.")
+            pattern, options = LEGACY_STATCAST_PATTERN, None
+        if not any(parquet_dir.glob(pattern)):
+            logging.warning(f"No files match {pattern}; skipping view '{view_name}'.")
+            continue
+        source = parquet_dir / pattern
+        read_args = f"'{str(source)}'" + (f", {options}" if options else "")
+        definitions[view_name] = f"SELECT * FROM read_parquet({read_args})"
+    return definitions
+
+def view_signature(definition: str) -> str:
+    """Short hash of a view's SELECT and the DuckDB version, stored as the view's comment."""
+    return hashlib.sha256(f"{duckdb.__version__}\n{definition}".encode("utf-8")).hexdigest()[:16]
+
+def create_views(con: duckdb.DuckDBPyConnection, parquet_dir: Path = PARQUET_DIR) -> list[str]:
+    """
+    Drops and recreates every view whose files exist under `parquet_dir`.
+
+    Returns:
+        The names of the views created.
+    """
+    created = []
+    for view_name, definition in view_definitions(parquet_dir).items():
+        con.execute(f"DROP VIEW IF EXISTS {view_name};")
+        con.execute(f"CREATE VIEW {view_name} AS {definition};")
+        # Lets catalog_is_current() check the view without binding it, which reads every file's schema
+        con.execute(f"COMMENT ON VIEW {view_name} IS '{view_signature(definition)}';")
+        logging.info(f"View '{view_name}' forcefully created.")
+        created.append(view_name)
+    return created
+
+def catalog_is_current(db_file: Path = DB_FILE, parquet_dir: Path = PARQUET_DIR) -> bool:
     """
-    logging.info(f"Connecting to DB at {DB_FILE} to create views...")
+    Checks that `db_file` has exactly the views `create_views` would create now, with the same
+    definitions, e.g. when the catalog was built into the container image. New files under an
+    existing view's glob need no rebuild; a view whose files appeared or a moved data directory do.
+    """
+    if not db_file.exists():
+        return False
+    expected = {name: view_signature(definition) for name, definition in view_definitions(parquet_dir).items()}
     try:
-        con = duckdb.connect(database=str(DB_FILE), read_only=False)
-
-        # View 1: Statcast
-        statcast_files = PARQUET_DIR / "statcast_*.parquet" 
-        con.execute("DROP VIEW IF EXISTS v_statcast;")
-        con.execute(f"CREATE VIEW v_statcast AS SELECT * FROM read_parquet('{str(statcast_files)}');")
-        logging.info("View 'v_statcast' forcefully created.")
-
-        # View 2: Lahman People
-        lahman_file = PARQUET_DIR / "lahman_people.parquet"
-        con.execute("DROP VIEW IF EXISTS v_lahman_people;")
-        con.execute(f"CREATE VIEW v_lahman_people AS SELECT * FROM read_parquet('{str(lahman_file)}');")
-        logging.info("View 'v_lahman_people' forcefully created.")
-            
-        # View 3: Player ID Map
-        map_file = PARQUET_DIR / "player_map.parquet"
-        con.execute("DROP VIEW IF EXISTS v_player_map;")
-        con.execute(f"CREATE VIEW v_player_map AS SELECT * FROM read_parquet('{str(map_file)}');")
-        logging.info("View 'v_player_map' forcefully created.")
+        con = duckdb.connect(database=str(db_file), read_only=True)
+        try:
+            rows = con.execute("SELECT view_name, comment FROM duckdb_views() WHERE NOT internal").fetchall()
+        finally:
+            con.close()
+    except Exception as e:
+        logging.warning(f"Could not read the catalog in {db_file}: {e}")
+        return False
+    return bool(expected) and {name: comment for name, comment in rows if name in expected} == expected
 
+def initialize_database(db_file: Path = DB_FILE, parquet_dir: Path = PARQUET_DIR):
+    """
+    Initializes the DuckDB database by dropping and recreating all views.
+    """
+    logging.info(f"Connecting to DB at {db_file} to create views...")
+    try:
+        con = duckdb.connect(database=str(db_file), read_only=False)
+        create_views(con, parquet_dir)
         con.close()
         logging.info("Database connection closed.")
 
     except Exception as e:
         logging.error(f"An error occurred during database initialization: {e}")
 
-if __name__ == "__main__":
-    initialize_database()
+def build_snapshot(snapshot_dir: Path = SNAPSHOT_DIR, parquet_dir: Path = PARQUET_DIR) -> Path:
+    """
+    Builds a new database file with the views, next to (not over) the one the API has open.
+    The file is written under a temporary name and renamed into place, so it is never seen half-built.
 
+    Returns:
+        The path of the new snapshot.
+    """
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    path = snapshot_dir / f"mlb-{data_version(parquet_dir)}-{time.time_ns()}.duckdb"
+    tmp_path = path.with_suffix(".duckdb.tmp")
+    con = duckdb.connect(database=str(tmp_path), read_only=False)
+    try:
+        if not create_views(con, parquet_dir):
+            raise RuntimeError(f"No Parquet files found under {parquet_dir}.")
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+    tmp_path.replace(path)
+    tmp_path.with_suffix(".tmp.wal").unlink(missing_ok=True)
+    logging.info(f"Built database snapshot {path}.")
+    return path
 
+def remove_snapshots(snapshot_dir: Path = SNAPSHOT_DIR):
+    """
+    Deletes the snapshots left by reloads of a previous API process. Only safe while no API is running.
+    """
+    for path in snapshot_dir.glob("mlb-*.duckdb*"):
+        path.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Creates the views over data/parquet in the DuckDB database file.")
+    parser.add_argument("--check", action="store_true",
+                        help="Keep the existing views if they still match the Parquet files; rebuild them otherwise.")
+    args = parser.parse_args()
+    if args.check and catalog_is_current():
+        logging.info(f"Catalog in {DB_FILE} matches the Parquet files; not rebuilding it.")
+    else:
+        initialize_database()
+    remove_snapshots()
@@ -1,33 +1,296 @@
-# --- REVISED ingest_statcast.py ---
+"""
+Incremental Statcast ingest.
+
+Keeps a watermark manifest of which game dates are already stored and only fetches
+the missing ones, including gaps left by failed days below the watermark. Large ranges
+(whole seasons) are split into day-sized chunks and fetched by a bounded worker pool
+with retries. Each day is written to its own file in the partitioned layout, so
+re-running is idempotent and re-fetching a day (--refresh-days / --dates) upserts late
+Statcast corrections. A re-fetch that comes back empty for a day that has pitches
+stored keeps the stored file: an empty pull is far more likely an upstream hiccup than
+a retracted game. The derived plate-appearance table and the rollups are written for
+the same day alongside it. A day whose files fail to write is not recorded, so the
+next run retries it.
+
+Usage:
+    python -m etl.ingest_statcast                                   # daily: every missing day up to yesterday
+    python -m etl.ingest_statcast --start 2024-03-28 --end 2024-09-30 --workers 8
+    python -m etl.ingest_statcast --refresh-days 3                  # also re-fetch the last 3 days
+    python -m etl.ingest_statcast --local --fixtures tests/fixtures # offline, into data/parquet
+"""
 from utils.warnings_config import suppress_warnings
 suppress_warnings()
-from pybaseball import statcast
+import argparse
+import datetime as dt
+import json
 import logging
-from utils.r2_uploader import upload_df_to_r2 # <-- Import our new function
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Protocol
+
+import pandas as pd
 
-START_DATE = "2024-05-01"
-END_DATE = "2024-05-07"
-OBJECT_NAME = f"statcast_{START_DATE}_to_{END_DATE}.parquet" # <-- This is the filename in R2
+from etl.plate_appearances import derive_plate_appearances
+from etl.rollups import ROLLUPS, derive_rollup
+from etl.statcast_layout import (
+    MANIFEST_KEY, PARQUET_OPTIONS, PLATE_APPEARANCES_PREFIX, STATCAST_PREFIX,
+    day_file_name, day_key, parse_day_key, split_partitions, write_partitions,
+)
+from etl.statcast_schema import normalize_statcast
+
+# --- Configuration ---
+DEFAULT_WORKERS = 4
+FETCH_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 2.0
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_and_upload_statcast_data(start_date: str, end_date: str, object_name: str):
-    logging.info(f"Fetching Statcast data from {start_date} to {end_date}...")
-    try:
-        df = statcast(start_dt=start_date, end_dt=end_date)
-        logging.info(f"Successfully fetched {len(df)} records.")
-        
-        # Call the uploader function
-        upload_df_to_r2(df, object_name)
+# A fetcher returns every pitch for one game date (an empty frame on off days)
+Fetcher = Callable[[dt.date], pd.DataFrame]
 
-    except Exception as e:
-        logging.error(f"An error occurred during Statcast ETL: {e}")
 
-if __name__ == "__main__":
-    fetch_and_upload_statcast_data(START_DATE, END_DATE, OBJECT_NAME)
+def pybaseball_fetcher(game_date: dt.date) -> pd.DataFrame:
+    """Fetches one day of Statcast from Baseball Savant via pybaseball."""
+    from pybaseball import statcast
+    day = game_date.isoformat()
+    return statcast(start_dt=day, end_dt=day, verbose=False, parallel=False)
+
+
+class FixtureFetcher:
+    """
+    Offline fetcher that reads `<directory>/<YYYY-MM-DD>.parquet` (or `.csv`).
+    Dates without a fixture file are treated as off days.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def __call__(self, game_date: dt.date) -> pd.DataFrame:
+        for suffix, reader in ((".parquet", pd.read_parquet), (".csv", pd.read_csv)):
+            path = self.directory / f"{game_date.isoformat()}{suffix}"
+            if path.exists():
+                return reader(path)
+        return pd.DataFrame()
+
+
+class StatcastStore(Protocol):
+    def write_day(self, game_date: dt.date, df: pd.DataFrame, prefix: str = STATCAST_PREFIX): ...
+    def read_manifest(self) -> dict | None: ...
+    def write_manifest(self, manifest: dict): ...
+    def stored_dates(self) -> set[dt.date]: ...
+
+
+class LocalStore:
+    """Writes the partitioned layout under a local directory (data/parquet by default)."""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+
+    def write_day(self, game_date: dt.date, df: pd.DataFrame, prefix: str = STATCAST_PREFIX):
+        write_partitions(df, self.base_dir, day_file_name(game_date), prefix)
+
+    def read_manifest(self) -> dict | None:
+        path = self.base_dir / MANIFEST_KEY
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def write_manifest(self, manifest: dict):
+        path = self.base_dir / MANIFEST_KEY
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+        tmp_path.replace(path)
+
+    def stored_dates(self) -> set[dt.date]:
+        paths = (self.base_dir / STATCAST_PREFIX).glob("**/*.parquet")
+        return {d for d in map(parse_day_key, paths) if d is not None}
+
+
+class R2Store:
+    """Uploads the partitioned layout to the R2 bucket."""
+
+    def write_day(self, game_date: dt.date, df: pd.DataFrame, prefix: str = STATCAST_PREFIX):
+        from utils.r2_uploader import upload_parquet_to_r2
+        # A single day always falls in one partition. Upload errors propagate, so the day is not recorded.
+        for _, _, part in split_partitions(df):
+            upload_parquet_to_r2(part, day_key(game_date, prefix), **PARQUET_OPTIONS)
 
+    def read_manifest(self) -> dict | None:
+        from utils.r2_uploader import download_bytes_from_r2
+        data = download_bytes_from_r2(MANIFEST_KEY)
+        return json.loads(data) if data else None
 
+    def write_manifest(self, manifest: dict):
+        from utils.r2_uploader import upload_bytes_to_r2
+        upload_bytes_to_r2(json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"), MANIFEST_KEY)
 
+    def stored_dates(self) -> set[dt.date]:
+        from utils.r2_uploader import list_r2_keys
+        return {d for d in map(parse_day_key, list_r2_keys(STATCAST_PREFIX + "/")) if d is not None}
 
 
+def load_manifest(store: StatcastStore) -> dict:
+    """
+    Loads the watermark manifest. If none exists yet, it is seeded from the
+    per-day files already in the store.
+    """
+    manifest = store.read_manifest()
+    if manifest is None:
+        stored = store.stored_dates()
+        logging.info(f"No manifest found; seeding it from {len(stored)} stored day file(s).")
+        manifest = {"dates": {d.isoformat(): {"rows": None} for d in stored}}
+    manifest.setdefault("dates", {})
+    return manifest
+
+
+def watermark(manifest: dict) -> dt.date | None:
+    """The latest game date recorded in the manifest."""
+    dates = manifest["dates"]
+    return dt.date.fromisoformat(max(dates)) if dates else None
+
+
+def first_stored(manifest: dict) -> dt.date | None:
+    """The earliest game date recorded in the manifest."""
+    dates = manifest["dates"]
+    return dt.date.fromisoformat(min(dates)) if dates else None
+
+
+def has_pitches(entry: dict | None) -> bool:
+    """Whether a manifest entry stands for a stored day file (seeded entries have unknown rows)."""
+    return entry is not None and entry.get("rows") != 0
+
+
+def plan_dates(manifest: dict, start: dt.date, end: dt.date, refresh_days: int = 0,
+               force: list[dt.date] | None = None) -> list[dt.date]:
+    """
+    Returns the game dates to fetch: every date in [start, end] missing from the
+    manifest, the last `refresh_days` dates up to `end` (to pick up corrections),
+    and any `force`d dates.
+    """
+    stored = manifest["dates"]
+    wanted = set(force or [])
+    day = start
+    while day <= end:
+        if day.isoformat() not in stored:
+            wanted.add(day)
+        day += dt.timedelta(days=1)
+    for offset in range(refresh_days):
+        wanted.add(end - dt.timedelta(days=offset))
+    return sorted(wanted)
+
+
+def fetch_with_retry(fetcher: Fetcher, game_date: dt.date, retries: int = FETCH_RETRIES) -> pd.DataFrame:
+    for attempt in range(1, retries + 1):
+        try:
+            return fetcher(game_date)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logging.warning(f"Fetch for {game_date} failed (attempt {attempt}/{retries}): {e}; retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+
+def ingest(fetcher: Fetcher, store: StatcastStore, start: dt.date | None = None, end: dt.date | None = None,
+           refresh_days: int = 0, force: list[dt.date] | None = None, workers: int = DEFAULT_WORKERS,
+           on_day: Callable[[dt.date, pd.DataFrame], None] | None = None) -> dict:
+    """
+    Fetches and stores every planned game date and updates the manifest.
+
+    Args:
+        fetcher: Source of one day of Statcast data.
+        store: Destination for day files and the manifest.
+        start: First date to consider. Defaults to the first stored date, so every gap up to `end` is
+            retried, or `end` when nothing is stored.
+        end: Last date to consider. Defaults to yesterday.
+        refresh_days: Re-fetch this many days up to `end` even if already stored.
+        force: Dates to re-fetch regardless of the manifest.
+        workers: Maximum number of days fetched concurrently.
+        on_day: Optional hook called with each successfully fetched day (e.g. to build derived tables).
+
+    Returns:
+        A summary dict with the dates ingested, kept (empty re-fetches of stored days), failed
+        and the new watermark.
+    """
+    manifest = load_manifest(store)
+    end = end or dt.date.today() - dt.timedelta(days=1)
+    start = start or first_stored(manifest) or end
+    dates = plan_dates(manifest, start, end, refresh_days, force)
+    logging.info(f"Ingesting {len(dates)} day(s) between {start} and {end} with {workers} worker(s).")
+
+    lock = threading.Lock()
+    ingested, kept, failed = [], [], []
+    stored_before = dict(manifest["dates"])
+
+    def process(game_date: dt.date) -> int | None:
+        """Fetches and writes one day. Returns its pitch count, or None if the stored file was kept."""
+        df = fetch_with_retry(fetcher, game_date)
+        if df.empty and has_pitches(stored_before.get(game_date.isoformat())):
+            return None
+        if not df.empty:
+            df = normalize_statcast(df)
+            store.write_day(game_date, df)
+            store.write_day(game_date, derive_plate_appearances(df), PLATE_APPEARANCES_PREFIX)
+            for rollup in ROLLUPS:
+                store.write_day(game_date, derive_rollup(df, rollup), rollup.prefix)
+            if on_day is not None:
+                on_day(game_date, df)
+        return len(df)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process, d): d for d in dates}
+        for future in as_completed(futures):
+            game_date = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                logging.error(f"Giving up on {game_date}: {e}")
+                failed.append(game_date)
+                continue
+            if rows is None:
+                logging.warning(f"Re-fetch of {game_date} returned no pitches; keeping the stored file.")
+                kept.append(game_date)
+                continue
+            with lock:
+                manifest["dates"][game_date.isoformat()] = {
+                    "rows": rows,
+                    "ingested_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+                }
+                ingested.append(game_date)
+            logging.info(f"Stored {game_date}: {rows} pitches.")
+
+    if ingested:
+        store.write_manifest(manifest)
+    summary = {
+        "ingested": sorted(d.isoformat() for d in ingested),
+        "kept": sorted(d.isoformat() for d in kept),
+        "failed": sorted(d.isoformat() for d in failed),
+        "watermark": watermark(manifest).isoformat() if manifest["dates"] else None,
+    }
+    logging.info(f"Ingest finished: {len(ingested)} stored, {len(kept)} kept, {len(failed)} failed, "
+                 f"watermark {summary['watermark']}.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=dt.date.fromisoformat,
+                        help="First game date (default: the first stored date, so gaps are retried).")
+    parser.add_argument("--end", type=dt.date.fromisoformat, help="Last game date (default: yesterday).")
+    parser.add_argument("--refresh-days", type=int, default=0, help="Re-fetch the last N days to pick up corrections.")
+    parser.add_argument("--dates", type=dt.date.fromisoformat, nargs="*", default=[], help="Specific dates to (re-)fetch.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--local", action="store_true", help="Write to data/parquet instead of R2.")
+    parser.add_argument("--fixtures", type=Path, help="Read days from a local fixture directory instead of pybaseball.")
+    args = parser.parse_args()
 
+    if args.local:
+        from db.duckdb_init import PARQUET_DIR
+        target = LocalStore(PARQUET_DIR)
+    else:
+        target = R2Store()
+    source = FixtureFetcher(args.fixtures) if args.fixtures else pybaseball_fetcher
+    result = ingest(source, target, args.start, args.end, args.refresh_days, args.dates, args.workers)
+    if result["failed"]:
+        raise SystemExit(1)
@@ -0,0 +1,56 @@
+"""
+Rewrites legacy flat Statcast files (data/parquet/statcast_*.parquet) into the
+Hive-partitioned layout (data/parquet/statcast/game_year=/game_month=/).
+
+Each game date becomes its own file (the same layout the incremental ingest writes),
+normalized to the declared schema in etl/statcast_schema.py, sorted by game_date and pitcher, written with zstd and bounded row groups.
+The legacy files are kept unless --delete-legacy is passed. Re-running is safe,
+since a game date always maps to the same file name.
+
+Usage:
+    python -m etl.migrate_statcast_layout [--delete-legacy] [--dry-run]
+"""
+import argparse
+import logging
+
+import pandas as pd
+
+from db.duckdb_init import LEGACY_STATCAST_PATTERN, PARQUET_DIR
+from etl.statcast_layout import day_file_name, split_days, write_partitions
+from etl.statcast_schema import normalize_statcast
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def migrate(delete_legacy: bool = False, dry_run: bool = False) -> int:
+    """
+    Migrates every legacy file and returns the number of files migrated.
+    """
+    legacy_files = sorted(PARQUET_DIR.glob(LEGACY_STATCAST_PATTERN))
+    if not legacy_files:
+        logging.info(f"No legacy Statcast files found in {PARQUET_DIR}.")
+        return 0
+
+    migrated = 0
+    for legacy_file in legacy_files:
+        if dry_run:
+            logging.info(f"[dry run] Would migrate {legacy_file.name}")
+            continue
+        try:
+            df = normalize_statcast(pd.read_parquet(legacy_file))
+            written = []
+            for game_date, day_df in split_days(df):
+                written.extend(write_partitions(day_df, PARQUET_DIR, day_file_name(game_date)))
+            logging.info(f"Migrated {legacy_file.name} ({len(df)} rows) into {len(written)} day file(s).")
+            if delete_legacy:
+                legacy_file.unlink()
+            migrated += 1
+        except Exception as e:
+            logging.error(f"Failed to migrate {legacy_file.name}: {e}")
+    return migrated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delete-legacy", action="store_true", help="Remove each legacy file after it is migrated.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be migrated.")
+    args = parser.parse_args()
+    migrate(delete_legacy=args.delete_legacy, dry_run=args.dry_run)
@@ -0,0 +1,98 @@
+"""
+Derives the plate-appearance fact table from pitch-level Statcast.
+
+One row per (game_pk, at_bat_number), carrying the batter/pitcher, the final
+`events`, the pitch count, the count on the final pitch and the batted-ball
+metrics of the final pitch. At-bat outcome questions (strikeouts, home runs,
+walks) become a COUNT(*) over roughly a tenth of the rows of v_statcast, with no
+DISTINCT and no cross-game collisions on at_bat_number.
+
+The incremental Statcast ingest writes one file per game date next to the pitch
+data. To (re)build it from pitch files already in data/parquet, run:
+    python -m etl.plate_appearances [--start 2024-05-01] [--end 2024-05-31]
+"""
+import argparse
+import datetime as dt
+import logging
+
+import duckdb
+import pandas as pd
+
+from db.duckdb_init import PARQUET_DIR
+from etl.statcast_layout import PLATE_APPEARANCES_PREFIX, STATCAST_PREFIX, day_file_name, parse_day_key, write_partitions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Columns taken from the last pitch of each plate appearance, when present in the source
+FINAL_PITCH_COLUMNS = [
+    "events", "des", "balls", "strikes", "outs_when_up", "bb_type", "hit_location",
+    "launch_speed", "launch_angle", "hit_distance_sc", "launch_speed_angle",
+    "estimated_ba_using_speedangle", "estimated_woba_using_speedangle", "estimated_slg_using_speedangle",
+    "woba_value", "woba_denom", "babip_value", "iso_value", "delta_run_exp",
+]
+# Columns constant within a plate appearance
+PA_CONSTANT_COLUMNS = [
+    "game_date", "game_year", "game_type", "batter", "pitcher", "player_name", "stand", "p_throws",
+    "home_team", "away_team", "inning", "inning_topbot",
+]
+
+
+def derive_plate_appearances(pitches: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapses pitch rows into one row per (game_pk, at_bat_number).
+
+    Args:
+        pitches: Pitch-level Statcast rows, e.g. one day as fetched by the ingest.
+
+    Returns:
+        The plate-appearance rows, or an empty frame if `pitches` is empty.
+    """
+    if pitches.empty:
+        return pd.DataFrame()
+    available = set(pitches.columns)
+    constant = [c for c in PA_CONSTANT_COLUMNS if c in available]
+    final = [c for c in FINAL_PITCH_COLUMNS if c in available]
+    select = ["game_pk", "at_bat_number"]
+    select += [f'any_value("{c}") AS "{c}"' for c in constant]
+    select += ["COUNT(*)::SMALLINT AS pitches"]
+    select += [f'arg_max("{c}", pitch_number) AS "{c}"' for c in final]
+
+    con = duckdb.connect()
+    try:
+        con.register("pitches", pitches)
+        plate_appearances = con.execute(
+            f"SELECT {', '.join(select)} FROM pitches GROUP BY game_pk, at_bat_number ORDER BY game_pk, at_bat_number"
+        ).df()
+    finally:
+        con.close()
+    if "game_date" in plate_appearances.columns:
+        # DuckDB hands DATEs back to pandas as timestamps; keep the Parquet column a real DATE
+        plate_appearances["game_date"] = pd.to_datetime(plate_appearances["game_date"]).dt.date
+    return plate_appearances
+
+
+def rebuild(start: dt.date | None = None, end: dt.date | None = None) -> int:
+    """
+    Rebuilds plate-appearance files from the local per-day pitch files.
+
+    Returns:
+        The number of game dates written.
+    """
+    written = 0
+    for path in sorted((PARQUET_DIR / STATCAST_PREFIX).glob("**/*.parquet")):
+        game_date = parse_day_key(path)
+        if game_date is None or (start and game_date < start) or (end and game_date > end):
+            continue
+        plate_appearances = derive_plate_appearances(pd.read_parquet(path).assign(game_date=game_date))
+        write_partitions(plate_appearances, PARQUET_DIR, day_file_name(game_date), PLATE_APPEARANCES_PREFIX)
+        logging.info(f"{game_date}: {len(plate_appearances)} plate appearances.")
+        written += 1
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=dt.date.fromisoformat)
+    parser.add_argument("--end", type=dt.date.fromisoformat)
+    args = parser.parse_args()
+    rebuild(args.start, args.end)
@@ -0,0 +1,165 @@
+"""
+Pre-aggregated rollups of pitch-level Statcast.
+
+Each rollup groups one game date of pitches by a set of key columns and stores,
+for every measurement column, its sum, non-null count, min and max, plus the
+pitch count. Averages are recombined as SUM(x_sum) / SUM(x_count), so any
+aggregate over the keys can be answered from the rollup exactly.
+
+Rollups use the same per-day partitioned layout as the pitch files
+(rollups/<name>/game_year=/game_month=/<date>.parquet), so the incremental
+ingest refreshes them day by day. `refresh` rebuilds only the days whose
+pitch file is newer than the rollup file:
+    python -m etl.rollups [--all]
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import duckdb
+import pyarrow as pa
+
+from db.duckdb_init import PARQUET_DIR
+from etl.statcast_layout import STATCAST_PREFIX, day_file_name, parse_day_key, write_partitions
+
+# The API reads the rollup definitions below; pandas is only imported when rollups are built
+if TYPE_CHECKING:
+    import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ROLLUPS_PREFIX = "rollups"
+# Numeric columns summarized in every rollup, when present in the source
+MEASURE_COLUMNS = [
+    "release_speed", "effective_speed", "release_spin_rate", "release_extension", "spin_axis",
+    "pfx_x", "pfx_z", "plate_x", "plate_z",
+    "launch_speed", "launch_angle", "hit_distance_sc",
+    "estimated_ba_using_speedangle", "estimated_woba_using_speedangle", "estimated_slg_using_speedangle",
+    "woba_value", "woba_denom", "babip_value", "iso_value", "delta_run_exp",
+]
+MEASURE_SUFFIXES = ("_sum", "_count", "_min", "_max")
+# Column holding COUNT(*) of the pitches behind each rollup row
+PITCH_COUNT_COLUMN = "pitches"
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    # Grouping columns, besides the game_year/game_month partition columns
+    keys: tuple[str, ...]
+
+    @property
+    def view(self) -> str:
+        return f"v_{self.name}"
+
+    @property
+    def prefix(self) -> str:
+        return f"{ROLLUPS_PREFIX}/{self.name}"
+
+
+# Ordered from fewest to most rows per game date; the query router uses the first one that fits
+ROLLUPS = [
+    Rollup("batter_daily", (
+        "game_date", "game_type", "batter", "stand", "p_throws", "home_team", "away_team", "inning_topbot",
+    )),
+    Rollup("pitcher_daily", (
+        "game_date", "game_type", "pitcher", "player_name", "p_throws", "stand", "pitch_type", "pitch_name",
+        "home_team", "away_team", "inning_topbot",
+    )),
+]
+
+def derive_rollup(pitches: pd.DataFrame, rollup: Rollup) -> pd.DataFrame:
+    """
+    Aggregates pitch rows (e.g. one day as fetched by the ingest) into a rollup.
+
+    Returns:
+        One row per distinct key combination, or an empty frame if `pitches` is empty.
+    """
+    import pandas as pd
+    if pitches.empty:
+        return pd.DataFrame()
+    keys = [c for c in rollup.keys if c in pitches.columns]
+    categorical = [c for c in keys if isinstance(pitches[c].dtype, pd.CategoricalDtype)]
+    # Categoricals arrive in DuckDB as ENUMs, which Arrow cannot hand back to pandas; group on the strings
+    select = [f'"{c}"::VARCHAR AS "{c}"' if c in categorical else f'"{c}"' for c in keys]
+    select.append(f"COUNT(*)::INTEGER AS {PITCH_COUNT_COLUMN}")
+    for column in MEASURE_COLUMNS:
+        if column not in pitches.columns:
+            continue
+        # Integer sums stay integers so that SUM over the rollup has the same type as SUM over pitches
+        sum_type = "BIGINT" if pd.api.types.is_integer_dtype(pitches[column]) else "DOUBLE"
+        select += [
+            f'SUM("{column}")::{sum_type} AS "{column}_sum"',
+            f'COUNT("{column}")::INTEGER AS "{column}_count"',
+            f'MIN("{column}") AS "{column}_min"',
+            f'MAX("{column}") AS "{column}_max"',
+        ]
+    group_by = ", ".join(str(i) for i in range(1, len(keys) + 1))
+
+    con = duckdb.connect()
+    try:
+        con.register("pitches", pitches)
+        table = con.execute(
+            f"SELECT {', '.join(select)} FROM pitches GROUP BY {group_by} ORDER BY {group_by}"
+        ).arrow()
+    finally:
+        con.close()
+    # Keep nullable integer columns as integers instead of letting pandas turn them into floats
+    pandas_types = {
+        pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype(),
+    }
+    rolled = table.to_pandas(types_mapper=pandas_types.get)
+    # Dictionary-encode them again in Parquet, like the pitch files
+    return rolled.astype({c: "category" for c in categorical})
+
+
+def write_rollups(pitches: pd.DataFrame, game_date: dt.date, base_dir: Path = PARQUET_DIR):
+    """Writes every rollup of one game date of pitches into the local partitioned layout."""
+    for rollup in ROLLUPS:
+        write_partitions(derive_rollup(pitches, rollup), base_dir, day_file_name(game_date), rollup.prefix)
+
+
+def stale_days(rollup: Rollup, base_dir: Path = PARQUET_DIR) -> list[dt.date]:
+    """Game dates whose rollup file is missing or older than the pitch file."""
+    built = {parse_day_key(p): p.stat().st_mtime_ns for p in (base_dir / rollup.prefix).glob("**/*.parquet")}
+    stale = []
+    for path in (base_dir / STATCAST_PREFIX).glob("**/*.parquet"):
+        game_date = parse_day_key(path)
+        if game_date is not None and built.get(game_date, -1) < path.stat().st_mtime_ns:
+            stale.append(game_date)
+    return sorted(stale)
+
+
+def refresh(base_dir: Path = PARQUET_DIR, rebuild_all: bool = False) -> int:
+    """
+    Rebuilds the rollups of every stale game date (or of every date with `rebuild_all`)
+    from the local per-day pitch files.
+
+    Returns:
+        The number of game dates written.
+    """
+    import pandas as pd
+    days = set()
+    for rollup in ROLLUPS:
+        days.update(stale_days(rollup, base_dir))
+    written = 0
+    for path in sorted((base_dir / STATCAST_PREFIX).glob("**/*.parquet")):
+        game_date = parse_day_key(path)
+        if game_date is None or not (rebuild_all or game_date in days):
+            continue
+        write_rollups(pd.read_parquet(path).assign(game_date=game_date), game_date, base_dir)
+        written += 1
+    logging.info(f"Rebuilt rollups for {written} game date(s).")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Rebuild every day, not only stale ones.")
+    args = parser.parse_args()
+    refresh(rebuild_all=args.all)
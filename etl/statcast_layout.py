@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import datetime as dt
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+# pandas is imported where it is used, so the API can read the layout constants without loading it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# --- Statcast Parquet Layout ---
+# <prefix>/game_year=YYYY/game_month=M/<name>.parquet
+# Partition columns live in the directory names, not in the files.
+STATCAST_PREFIX = "statcast"
+# Derived one-row-per-plate-appearance table, same layout
+PLATE_APPEARANCES_PREFIX = "plate_appearances"
+PARTITION_COLUMNS = ["game_year", "game_month"]
+SORT_COLUMNS = ["game_date", "pitcher"]
+# Rows per row group. Smaller groups give finer min/max pruning on game_date/pitcher,
+# larger ones compress better; ~100k rows is a few days of pitches.
+ROW_GROUP_SIZE = 100_000
+COMPRESSION = "zstd"
+PARQUET_OPTIONS = {"compression": COMPRESSION, "row_group_size": ROW_GROUP_SIZE}
+# Watermark manifest of stored game dates, kept next to the partitions
+MANIFEST_KEY = f"{STATCAST_PREFIX}/_manifest.json"
+
+_DAY_FILE = re.compile(r"(\d{4}-\d{2}-\d{2})\.parquet$")
+
+
+def partition_key(game_year: int, game_month: int, file_name: str, prefix: str = STATCAST_PREFIX) -> str:
+    """Returns the relative path/object key of a file inside a partition."""
+    return f"{prefix}/game_year={game_year}/game_month={game_month}/{file_name}"
+
+
+def day_file_name(game_date: dt.date) -> str:
+    """Incremental ingest writes one file per game date, so re-ingesting a day replaces exactly one file."""
+    return f"{game_date.isoformat()}.parquet"
+
+
+def day_key(game_date: dt.date, prefix: str = STATCAST_PREFIX) -> str:
+    return partition_key(game_date.year, game_date.month, day_file_name(game_date), prefix)
+
+
+def parse_day_key(key: str) -> dt.date | None:
+    """Returns the game date of a per-day file key/path, or None for other files."""
+    match = _DAY_FILE.search(str(key))
+    return dt.date.fromisoformat(match.group(1)) if match else None
+
+
+def split_days(df: pd.DataFrame) -> Iterator[tuple[dt.date, pd.DataFrame]]:
+    """Splits a Statcast DataFrame into one frame per game date."""
+    import pandas as pd
+    if df.empty:
+        return
+    game_dates = pd.to_datetime(df["game_date"]).dt.date
+    for game_date, part in df.groupby(game_dates, sort=True):
+        yield game_date, part
+
+
+def split_partitions(df: pd.DataFrame) -> Iterator[tuple[int, int, pd.DataFrame]]:
+    """
+    Splits a Statcast DataFrame into (game_year, game_month, frame) partitions.
+    Each frame is sorted by game_date and pitcher so Parquet min/max statistics
+    are tight, and has the partition columns removed.
+    """
+    import pandas as pd
+    if df.empty:
+        return
+    game_dates = pd.to_datetime(df["game_date"])
+    df = df.assign(game_year=game_dates.dt.year, game_month=game_dates.dt.month)
+    # Derived tables (e.g. the batter rollup) may not have every sort column
+    sort_columns = [c for c in SORT_COLUMNS if c in df.columns]
+    for (game_year, game_month), part in df.groupby(PARTITION_COLUMNS, sort=True):
+        part = part.sort_values(sort_columns, kind="stable").drop(columns=PARTITION_COLUMNS)
+        yield int(game_year), int(game_month), part.reset_index(drop=True)
+
+
+def write_partitions(df: pd.DataFrame, base_dir: Path, file_name: str, prefix: str = STATCAST_PREFIX) -> list[Path]:
+    """
+    Writes a Statcast DataFrame into the partitioned layout under `base_dir`.
+
+    Returns:
+        The paths written, one per (game_year, game_month) present in the data.
+    """
+    written = []
+    for game_year, game_month, part in split_partitions(df):
+        path = base_dir / partition_key(game_year, game_month, file_name, prefix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".parquet.tmp")
+        part.to_parquet(tmp_path, index=False, **PARQUET_OPTIONS)
+        tmp_path.replace(path)  # Readers never see a half-written file
+        written.append(path)
+    return written
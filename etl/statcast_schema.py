@@ -0,0 +1,132 @@
+"""
+Declared storage schema for Statcast pitch data.
+
+`normalize_statcast` is applied to every pull before it is written:
+- integer-valued measurements, counts and IDs become the smallest nullable int type that holds them
+- ball-tracking internals (release point, movement, trajectory fit, plate location) become float32
+- low-cardinality strings become pandas categoricals (dictionary-encoded in Parquet)
+- `game_date` becomes a real DATE
+- deprecated/always-empty columns are dropped
+
+Headline measurements that users read directly (velocities, exit velocity, expected stats,
+win/run expectancy) stay float64: float32 cannot represent values like 96.1 exactly and
+they would surface in results as 96.0999984741211.
+
+Usage (size and scan-time report for existing files):
+    python -m etl.statcast_schema --report data/parquet/statcast/game_year=2024/game_month=5/2024-05-01.parquet
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DROP_COLUMNS = [
+    "tfs_deprecated", "tfs_zulu_deprecated", "sv_id", "umpire",
+    "spin_dir", "spin_rate_deprecated", "break_angle_deprecated", "break_length_deprecated",
+]
+
+CATEGORICAL_COLUMNS = [
+    "pitch_type", "pitch_name", "events", "description", "game_type", "stand", "p_throws",
+    "home_team", "away_team", "type", "bb_type", "inning_topbot",
+    "if_fielding_alignment", "of_fielding_alignment",
+]
+
+FLOAT32_COLUMNS = [
+    "release_pos_x", "release_pos_y", "release_pos_z", "pfx_x", "pfx_z", "plate_x", "plate_z",
+    "hc_x", "hc_y", "vx0", "vy0", "vz0", "ax", "ay", "az", "sz_top", "sz_bot",
+    "api_break_z_with_gravity", "api_break_x_arm", "api_break_x_batter_in",
+    "intercept_ball_minus_batter_pos_x_inches", "intercept_ball_minus_batter_pos_y_inches",
+]
+
+INT_COLUMNS = {
+    # IDs
+    "batter": "Int32", "pitcher": "Int32", "game_pk": "Int32",
+    "on_1b": "Int32", "on_2b": "Int32", "on_3b": "Int32",
+    **{f"fielder_{n}": "Int32" for n in range(2, 10)},
+    # Game state
+    "game_year": "Int16", "inning": "Int8", "balls": "Int8", "strikes": "Int8", "outs_when_up": "Int8",
+    "at_bat_number": "Int16", "pitch_number": "Int8", "zone": "Int8", "hit_location": "Int8",
+    "home_score": "Int16", "away_score": "Int16", "bat_score": "Int16", "fld_score": "Int16",
+    "post_home_score": "Int16", "post_away_score": "Int16", "post_bat_score": "Int16", "post_fld_score": "Int16",
+    "home_score_diff": "Int16", "bat_score_diff": "Int16",
+    "n_thruorder_pitcher": "Int8", "n_priorpa_thisgame_player_at_bat": "Int8",
+    "pitcher_days_since_prev_game": "Int16", "batter_days_since_prev_game": "Int16",
+    "pitcher_days_until_next_game": "Int16", "batter_days_until_next_game": "Int16",
+    "age_pit_legacy": "Int8", "age_bat_legacy": "Int8", "age_pit": "Int8", "age_bat": "Int8",
+    # Integer-valued measurements
+    "release_spin_rate": "Int16", "spin_axis": "Int16", "launch_angle": "Int16", "hit_distance_sc": "Int16",
+    "launch_speed_angle": "Int8", "woba_denom": "Int8", "babip_value": "Int8", "iso_value": "Int8",
+}
+
+
+def _to_int(series: pd.Series, dtype: str) -> pd.Series:
+    """Casts to a nullable int type, or returns the series unchanged if values are fractional or out of range."""
+    values = pd.to_numeric(series, errors="coerce")
+    present = values.dropna()
+    info = np.iinfo(dtype.lower())
+    if not present.empty and ((present % 1 != 0).any() or present.min() < info.min or present.max() > info.max):
+        logging.warning(f"Column '{series.name}' does not fit {dtype}; leaving it as {series.dtype}.")
+        return series
+    return values.round().astype(dtype)
+
+
+def normalize_statcast(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the declared schema to a Statcast DataFrame. Columns not mentioned in
+    the schema (e.g. ones Statcast adds in future seasons) pass through unchanged.
+    """
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    converted = {}
+    if "game_date" in df.columns:
+        converted["game_date"] = pd.to_datetime(df["game_date"]).dt.date
+    for column, dtype in INT_COLUMNS.items():
+        if column in df.columns:
+            converted[column] = _to_int(df[column], dtype)
+    for column in FLOAT32_COLUMNS:
+        if column in df.columns:
+            converted[column] = pd.to_numeric(df[column], errors="coerce").astype("float32")
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            converted[column] = df[column].astype("category")
+    return df.assign(**converted)
+
+
+def _scan_seconds(path: Path, repeats: int = 5) -> float:
+    con = duckdb.connect()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        con.execute(f"SELECT * FROM read_parquet('{path}')").fetch_arrow_table()
+        best = min(best, time.perf_counter() - start)
+    con.close()
+    return best
+
+
+def report(paths: list[Path]):
+    """Prints file size and best-of-5 full-scan time before and after normalization."""
+    from etl.statcast_layout import PARQUET_OPTIONS
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in paths:
+            df = pd.read_parquet(path)
+            before, after = Path(tmp) / "before.parquet", Path(tmp) / "after.parquet"
+            df.to_parquet(before, index=False, **PARQUET_OPTIONS)
+            normalize_statcast(df).to_parquet(after, index=False, **PARQUET_OPTIONS)
+            size_before, size_after = before.stat().st_size, after.stat().st_size
+            scan_before, scan_after = _scan_seconds(before), _scan_seconds(after)
+            print(f"{path.name}: {len(df)} rows, {len(df.columns)} columns")
+            print(f"  file size  {size_before / 1e6:8.2f} MB -> {size_after / 1e6:8.2f} MB ({size_after / size_before:6.1%})")
+            print(f"  full scan  {scan_before * 1e3:8.1f} ms -> {scan_after * 1e3:8.1f} ms ({scan_after / scan_before:6.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", type=Path, nargs="+", required=True, help="Parquet file(s) to compare.")
+    args = parser.parse_args()
+    report(args.report)
@@ -0,0 +1,447 @@
+"""
+Keeps a local mirror of the R2 bucket under data/parquet, so the views read what the ETL uploaded.
+
+Each run lists the bucket and compares every object's ETag and size with the mirror
+manifest (`data/mirror/manifest.json`); only new or changed objects are downloaded.
+- Objects larger than `--part-mb` are fetched as parallel ranged GETs. Every request is
+  pinned to the listed ETag with `If-Match`, so an object rewritten mid-download fails
+  (and is retried on the next run) instead of mixing two versions.
+- A download is checked against the listed size, and against the ETag when it is a
+  plain MD5, then stored once by its SHA-256 under `data/mirror/objects/`. It is
+  hard-linked to its key under data/parquet through a temporary name and an atomic
+  rename, so readers never see a half-written file and identical content is stored once.
+- With a disk budget (`--max-gb`), the newest game months are kept and older months
+  are evicted whole, across Statcast, plate appearances and rollups alike. Objects
+  outside the partitioned layout (Lahman, player map, manifests) are always kept.
+
+The manifest records each mirrored key's ETag, size, hash, partition and view, and the
+keys left out by the budget. The API's reload watcher picks the new files up on its own;
+`--init-db` rebuilds the database file instead, for use before the API starts.
+
+Set `R2_ENDPOINT_URL` to sync from any S3-compatible store, e.g. `python -m benchmarks.stub_s3`.
+
+Usage:
+    python -m etl.sync_r2 [--prefix statcast/] [--max-gb 20] [--dry-run]
+"""
+import argparse
+import fcntl
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from db.duckdb_init import DATA_DIR, LEGACY_STATCAST_PATTERN, PARQUET_DIR, VIEW_SOURCES
+
+# --- Mirror Configuration ---
+MIRROR_DIR = Path(os.getenv("MIRROR_DIR", str(DATA_DIR / "mirror")))
+# Concurrent GET requests (whole small objects and ranges of large ones)
+MIRROR_WORKERS = int(os.getenv("MIRROR_WORKERS", "8"))
+# Objects larger than this are downloaded in ranges of this size
+MIRROR_PART_MB = float(os.getenv("MIRROR_PART_MB", "8"))
+# Disk budget for the mirrored objects in GB; 0 keeps everything
+MIRROR_MAX_GB = float(os.getenv("MIRROR_MAX_GB", "0"))
+MANIFEST_FILE = "manifest.json"
+RETRIES = 3
+READ_CHUNK = 1 << 20
+PARTITION_PATTERN = re.compile(r"(?:^|/)game_year=(\d{4})/game_month=(\d{1,2})/")
+MD5_ETAG = re.compile(r"[0-9a-f]{32}")
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class SyncInProgress(Exception):
+    """Raised when another sync holds the mirror lock."""
+
+
+def partition_of(key: str) -> str | None:
+    """`statcast/game_year=2024/game_month=5/x.parquet` -> `2024-05`; None for unpartitioned keys."""
+    match = PARTITION_PATTERN.search(key)
+    return f"{match.group(1)}-{int(match.group(2)):02d}" if match else None
+
+
+def view_of(key: str) -> str | None:
+    """The view that reads `key`, if any."""
+    for view_name, pattern in VIEW_SOURCES.items():
+        if fnmatch.fnmatch(key, pattern):
+            return view_name
+    return "v_statcast" if fnmatch.fnmatch(key, LEGACY_STATCAST_PATTERN) else None
+
+
+def _etag(obj: dict) -> str:
+    return obj["ETag"].strip('"')
+
+
+@dataclass
+class SyncPlan:
+    # Listed objects that are new or changed
+    download: list[dict] = field(default_factory=list)
+    # Listed objects already mirrored; relinked if their local file has gone
+    keep: list[dict] = field(default_factory=list)
+    # Mirrored keys that were deleted from the bucket or no longer fit the budget
+    evict: list[str] = field(default_factory=list)
+    # Listed keys left out by the budget -> their listing
+    skipped: dict[str, dict] = field(default_factory=dict)
+    wanted_bytes: int = 0
+
+
+def plan_sync(remote: list[dict], mirrored: dict[str, dict], max_bytes: int = 0) -> SyncPlan:
+    """
+    Decides what to download, keep and evict.
+
+    Args:
+        remote: The bucket listing (Key, ETag, Size).
+        mirrored: The manifest's objects.
+        max_bytes: Disk budget; 0 keeps everything. Unpartitioned objects are always kept,
+            then whole game months from the newest down until the next one would not fit.
+    """
+    plan = SyncPlan()
+    fixed, months = [], {}
+    for obj in remote:
+        partition = partition_of(obj["Key"])
+        if partition is None:
+            fixed.append(obj)
+        else:
+            months.setdefault(partition, []).append(obj)
+
+    wanted = list(fixed)
+    used = sum(obj["Size"] for obj in fixed)
+    full = False
+    for partition in sorted(months, reverse=True):
+        size = sum(obj["Size"] for obj in months[partition])
+        if max_bytes and (full or used + size > max_bytes):
+            full = True  # Keep the mirrored months contiguous
+            plan.skipped.update({obj["Key"]: obj for obj in months[partition]})
+            continue
+        wanted.extend(months[partition])
+        used += size
+    plan.wanted_bytes = used
+
+    for obj in wanted:
+        entry = mirrored.get(obj["Key"])
+        if entry and entry["etag"] == _etag(obj) and entry["size"] == obj["Size"]:
+            plan.keep.append(obj)
+        else:
+            plan.download.append(obj)
+    wanted_keys = {obj["Key"] for obj in wanted}
+    plan.evict = sorted(key for key in mirrored if key not in wanted_keys)
+    return plan
+
+
+@dataclass
+class _Download:
+    obj: dict
+    tmp_path: Path
+    ranges: list[tuple[int, int]]
+    remaining: int = 0
+    error: Exception | None = None
+
+
+class R2Mirror:
+    """A content-addressed local mirror of an S3-compatible bucket."""
+
+    def __init__(self, client, bucket: str, parquet_dir: Path = PARQUET_DIR, mirror_dir: Path = MIRROR_DIR,
+                 workers: int = MIRROR_WORKERS, part_size: int = int(MIRROR_PART_MB * 1024 * 1024)):
+        self.client = client
+        self.bucket = bucket
+        self.parquet_dir = Path(parquet_dir)
+        self.mirror_dir = Path(mirror_dir)
+        self.objects_dir = self.mirror_dir / "objects"
+        self.tmp_dir = self.mirror_dir / "tmp"
+        self.workers = workers
+        self.part_size = part_size
+
+    # --- Manifest and layout ---
+
+    def read_manifest(self) -> dict:
+        path = self.mirror_dir / MANIFEST_FILE
+        return json.loads(path.read_text()) if path.exists() else {"objects": {}, "skipped": {}}
+
+    def write_manifest(self, manifest: dict):
+        path = self.mirror_dir / MANIFEST_FILE
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+        tmp_path.replace(path)
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.objects_dir / sha256[:2] / sha256
+
+    def local_path(self, key: str) -> Path | None:
+        """Where `key` is mirrored, or None for keys that would land outside data/parquet."""
+        path = (self.parquet_dir / key).resolve()
+        if key.endswith("/") or not path.is_relative_to(self.parquet_dir.resolve()):
+            return None
+        return path
+
+    def _link(self, blob: Path, key: str):
+        """Puts `blob` at the key's path with an atomic rename; copies it if hard links are not possible."""
+        target = self.local_path(key)
+        if target.exists() and os.path.samefile(blob, target):
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            os.link(blob, tmp_path)
+        except OSError:
+            shutil.copyfile(blob, tmp_path)
+        os.replace(tmp_path, target)
+
+    def _unlink(self, key: str):
+        target = self.local_path(key)
+        if target is None:
+            return
+        target.unlink(missing_ok=True)
+        # Drop partition directories left empty
+        parent = target.parent
+        while parent != self.parquet_dir.resolve() and parent.is_relative_to(self.parquet_dir.resolve()):
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    # --- Downloads ---
+
+    def _fetch_range(self, job: _Download, start: int, end: int):
+        """GETs bytes start..end of the object (all of it when it is a single range) into its temp file."""
+        from botocore.exceptions import ClientError
+        args = {"Bucket": self.bucket, "Key": job.obj["Key"], "IfMatch": job.obj["ETag"]}
+        if len(job.ranges) > 1:
+            args["Range"] = f"bytes={start}-{end}"
+        for attempt in range(1, RETRIES + 1):
+            if job.error is not None:
+                return  # Another range of this object already failed
+            try:
+                response = self.client.get_object(**args)
+                written = 0
+                with open(job.tmp_path, "r+b") as f:
+                    f.seek(start)
+                    for chunk in response["Body"].iter_chunks(READ_CHUNK):
+                        f.write(chunk)
+                        written += len(chunk)
+                if written != end - start + 1:
+                    raise IOError(f"got {written} bytes, expected {end - start + 1}")
+                return
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "412", "NoSuchKey", "404"):
+                    raise  # Changed or deleted since the listing; retrying will not help
+                error = e
+            except Exception as e:
+                error = e
+            if attempt == RETRIES:
+                raise error
+            logging.warning(f"Download of {job.obj['Key']} bytes {start}-{end} failed (attempt {attempt}): {error}")
+            time.sleep(2 ** attempt)
+
+    def _store(self, job: _Download) -> dict:
+        """Verifies a finished download, moves it into the object store and links it into place."""
+        md5, sha256 = hashlib.md5(usedforsecurity=False), hashlib.sha256()
+        with open(job.tmp_path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                md5.update(chunk)
+                sha256.update(chunk)
+        key, etag, size = job.obj["Key"], _etag(job.obj), job.obj["Size"]
+        if job.tmp_path.stat().st_size != size:
+            raise IOError(f"size {job.tmp_path.stat().st_size} does not match the listed {size}")
+        # Multipart ETags ("<md5>-<parts>") are not a hash of the content
+        if MD5_ETAG.fullmatch(etag) and md5.hexdigest() != etag:
+            raise IOError(f"MD5 {md5.hexdigest()} does not match the ETag {etag}")
+
+        blob = self.blob_path(sha256.hexdigest())
+        if blob.exists():
+            job.tmp_path.unlink()
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(job.tmp_path, blob)
+        self._link(blob, key)
+        return self._entry(job.obj, sha256.hexdigest())
+
+    @staticmethod
+    def _entry(obj: dict, sha256: str) -> dict:
+        modified = obj.get("LastModified")
+        return {
+            "etag": _etag(obj),
+            "size": obj["Size"],
+            "sha256": sha256,
+            "partition": partition_of(obj["Key"]),
+            "view": view_of(obj["Key"]),
+            "last_modified": modified.isoformat() if hasattr(modified, "isoformat") else modified,
+        }
+
+    def download(self, objects: list[dict]) -> tuple[dict[str, dict], list[str]]:
+        """
+        Downloads `objects` on a pool of `workers` threads shared by all their ranges.
+
+        Returns:
+            Manifest entries of the objects stored, and the keys that failed.
+        """
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        jobs = []
+        for obj in objects:
+            size = obj["Size"]
+            ranges = [(start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)]
+            job = _Download(obj, self.tmp_dir / f"{uuid.uuid4().hex}.part", ranges or [(0, -1)])
+            job.remaining = len(job.ranges)
+            with open(job.tmp_path, "wb") as f:
+                f.truncate(size)
+            jobs.append(job)
+
+        stored, failed = {}, []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch_range, job, start, end): job for job in jobs for start, end in job.ranges}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    job.error = job.error or e
+                job.remaining -= 1
+                if job.remaining:
+                    continue
+                try:
+                    if job.error is not None:
+                        raise job.error
+                    stored[job.obj["Key"]] = self._store(job)
+                except Exception as e:
+                    logging.error(f"Could not mirror {job.obj['Key']}: {e}")
+                    failed.append(job.obj["Key"])
+                    job.tmp_path.unlink(missing_ok=True)
+        return stored, failed
+
+    # --- Sync ---
+
+    def list_remote(self, prefixes: list[str]) -> list[dict]:
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for prefix in prefixes:
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                objects.extend(page.get("Contents", []))
+        return [obj for obj in objects if self.local_path(obj["Key"]) is not None]
+
+    def collect_garbage(self, manifest: dict) -> int:
+        """Deletes stored objects no mirrored key refers to. Returns the bytes freed."""
+        referenced = {entry["sha256"] for entry in manifest["objects"].values()}
+        freed = 0
+        for blob in self.objects_dir.glob("*/*"):
+            if blob.name not in referenced:
+                freed += blob.stat().st_size
+                blob.unlink()
+        return freed
+
+    def sync(self, prefixes: list[str] = ("",), max_bytes: int = 0, dry_run: bool = False) -> dict:
+        """
+        Brings the mirror up to date with the bucket.
+
+        Returns:
+            Counts and bytes of what was downloaded, kept, evicted and skipped.
+
+        Raises:
+            SyncInProgress: If another sync is running on the same mirror.
+        """
+        self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.mirror_dir / ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise SyncInProgress(f"Another sync is running on {self.mirror_dir}.")
+            return self._sync(list(prefixes), max_bytes, dry_run)
+
+    def _sync(self, prefixes: list[str], max_bytes: int, dry_run: bool) -> dict:
+        started = time.perf_counter()
+        manifest = self.read_manifest()
+        mirrored = manifest["objects"]
+        # Keys outside the listed prefixes are not ours to evict on this run
+        in_scope = {key: entry for key, entry in mirrored.items() if any(key.startswith(p) for p in prefixes)}
+        remote = self.list_remote(prefixes)
+        plan = plan_sync(remote, in_scope, max_bytes)
+        download_bytes = sum(obj["Size"] for obj in plan.download)
+        logging.info(f"Bucket '{self.bucket}': {len(remote)} objects. Downloading {len(plan.download)} "
+                     f"({download_bytes / 1e6:.1f} MB), keeping {len(plan.keep)}, evicting {len(plan.evict)}, "
+                     f"skipping {len(plan.skipped)} over the budget.")
+        stats = {
+            "listed": len(remote),
+            "downloaded": len(plan.download),
+            "downloaded_bytes": download_bytes,
+            "kept": len(plan.keep),
+            "evicted": len(plan.evict),
+            "skipped": len(plan.skipped),
+            "mirrored_bytes": plan.wanted_bytes,
+            "dry_run": dry_run,
+        }
+        if dry_run:
+            return stats
+
+        for path in self.tmp_dir.glob("*.part"):
+            path.unlink()  # Left by an interrupted run
+        # Evict first so the budget holds while downloading
+        for key in plan.evict:
+            self._unlink(key)
+            mirrored.pop(key, None)
+
+        stored, failed = self.download(plan.download)
+        mirrored.update(stored)
+        for obj in plan.keep:
+            entry = mirrored[obj["Key"]]
+            blob = self.blob_path(entry["sha256"])
+            if blob.exists():
+                self._link(blob, obj["Key"])
+            else:
+                logging.warning(f"Stored copy of {obj['Key']} is missing; it is downloaded on the next run.")
+                mirrored.pop(obj["Key"])
+                failed.append(obj["Key"])
+
+        manifest.update({
+            "endpoint": self.client.meta.endpoint_url,
+            "bucket": self.bucket,
+            "synced_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "max_bytes": max_bytes,
+            "objects": mirrored,
+            "skipped": {
+                **{k: v for k, v in manifest.get("skipped", {}).items() if not any(k.startswith(p) for p in prefixes)},
+                **{key: {"etag": _etag(obj), "size": obj["Size"], "partition": partition_of(key)} for key, obj in plan.skipped.items()},
+            },
+        })
+        self.write_manifest(manifest)
+        freed = self.collect_garbage(manifest)
+
+        stats.update({
+            "downloaded": len(stored),
+            "failed": failed,
+            "freed_bytes": freed,
+            "seconds": round(time.perf_counter() - started, 2),
+        })
+        logging.info(f"Mirror synced in {stats['seconds']:.1f}s: {len(stored)} downloaded, {len(failed)} failed, "
+                     f"{len(plan.evict)} evicted, {freed / 1e6:.1f} MB freed.")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefix", action="append", help="Only sync keys under this prefix (repeatable; default: the whole bucket).")
+    parser.add_argument("--max-gb", type=float, default=MIRROR_MAX_GB, help="Disk budget; the oldest game months are evicted first. 0 keeps everything.")
+    parser.add_argument("--workers", type=int, default=MIRROR_WORKERS, help="Concurrent GET requests.")
+    parser.add_argument("--part-mb", type=float, default=MIRROR_PART_MB, help="Range size for large objects.")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would change.")
+    parser.add_argument("--init-db", action="store_true", help="Rebuild the database file afterwards.")
+    args = parser.parse_args()
+
+    from utils.r2_uploader import BUCKET_NAME, get_s3_client
+    mirror = R2Mirror(get_s3_client(), BUCKET_NAME, workers=args.workers, part_size=int(args.part_mb * 1024 * 1024))
+    stats = mirror.sync(args.prefix or [""], int(args.max_gb * 1e9), args.dry_run)
+    print(json.dumps(stats, indent=2))
+    if args.init_db and not args.dry_run:
+        from db.duckdb_init import initialize_database
+        initialize_database()
+    if stats.get("failed"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,12 @@ import SimpleBarChart from './components/BarChart';
 interface QueryResult {
   sql_query: string;
   results: Record<string, string | number | boolean | null>[];
+  next_cursor?: string | null;
 }
 
+// Rows fetched per request; more pages are loaded on demand with the returned cursor
+const PAGE_SIZE = 500;
+
 const getVisualizationType = (results: Record<string, string | number | boolean | null>[] | undefined): 'barchart' | 'table' => {    if (!results || results.length === 0) {
       return 'table';
     }
@@ -29,6 +33,7 @@ export default function HomePage() {
   // MODIFICATION: Removed unused 'queryResult' state
   const [lastSuccessfulResult, setLastSuccessfulResult] = useState<QueryResult | null>(null);
   const [isLoading, setIsLoading] = useState<boolean>(false);
+  const [isLoadingMore, setIsLoadingMore] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
   const [sortConfig, setSortConfig] = useState<{ key: string; direction: 'ascending' | 'descending' } | null>(null);
 
@@ -42,6 +47,7 @@ export default function HomePage() {
       const requestBody = {
         question: question,
         previous_sql: lastSuccessfulResult ? lastSuccessfulResult.sql_query : null,
+        page_size: PAGE_SIZE,
       };
 
       const response = await fetch(process.env.NEXT_PUBLIC_API_URL + '/query', { // Using the environment variable
@@ -65,6 +71,39 @@ export default function HomePage() {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!lastSuccessfulResult?.next_cursor) return;
+    setIsLoadingMore(true);
+    setError(null);
+
+    try {
+      const response = await fetch(process.env.NEXT_PUBLIC_API_URL + '/query', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          question: '',
+          page_size: PAGE_SIZE,
+          cursor: lastSuccessfulResult.next_cursor,
+        }),
+      });
+      if (!response.ok) {
+        throw new Error(`API request failed with status ${response.status}`);
+      }
+      const data: QueryResult = await response.json();
+      setLastSuccessfulResult({
+        ...lastSuccessfulResult,
+        results: [...lastSuccessfulResult.results, ...data.results],
+        next_cursor: data.next_cursor,
+      });
+
+    } catch (err) {
+      const error = err as Error;
+      setError(error.message || 'An unexpected error occurred.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleReset = () => {
     setLastSuccessfulResult(null);
     setQuestion('');
@@ -233,6 +272,18 @@ export default function HomePage() {
                   ) : (
                     <p className="p-4 bg-gray-800/50 border border-gray-600 rounded-lg text-gray-400">The query ran successfully but returned no results.</p>
                   )}
+                  {lastSuccessfulResult.next_cursor && (
+                    <button
+                      onClick={handleLoadMore}
+                      disabled={isLoadingMore}
+                      className="mt-4 px-5 py-2 rounded-full text-sm text-white 
+                                 bg-[rgba(55,65,81,0.57)] border border-[rgba(209,213,219,0.28)] 
+                                 hover:bg-[rgba(75,85,99,0.7)] backdrop-blur-sm transition-colors
+                                 disabled:cursor-not-allowed disabled:opacity-60"
+                    >
+                      {isLoadingMore ? 'Loading...' : 'Load more results'}
+                    </button>
+                  )}
                 </div>
               </div>
             )}
@@ -2,13 +2,24 @@
 
 # This script runs every time the container starts.
 
-# Step 1: Run the database initialization script to create/update
-# the mlb.duckdb file with the correct, container-relative paths.
-echo "Running database initialization..."
-python -m db.duckdb_init
+# Step 0 (optional): With MIRROR_ON_START=1, pull new and changed Parquet files from the
+# R2 bucket into data/parquet first. A failed sync leaves the previous mirror in place.
+if [ "${MIRROR_ON_START:-0}" = "1" ]; then
+    echo "Syncing the R2 mirror..."
+    python -m etl.sync_r2 || echo "R2 sync failed; starting with the files already on disk."
+fi
+
+# Step 1: Check the views in mlb.duckdb, which the image build creates, and rebuild them
+# only if they no longer match data/parquet (e.g. a mounted data directory or a sync added a view).
+# `python -m db.duckdb_init` without --check always rebuilds them.
+# It also removes snapshots left by hot reloads (POST /admin/reload) of the previous run.
+echo "Checking the database catalog..."
+python -m db.duckdb_init --check
 
 # Step 2: Start the Uvicorn server as the main process.
-# The --host 0.0.0.0 is crucial for Docker networking.
+# The --host 0.0.0.0 is crucial for Docker networking. PORT is set by platforms such as Cloud Run.
+# The port opens once the database and player index are loaded; GET /health/ready answers 200
+# after the optional background warm-up (WARMUP=1).
 echo "Starting Uvicorn server..."
-exec uvicorn api.main:app --host 0.0.0.0 --port 8080
+exec uvicorn api.main:app --host 0.0.0.0 --port "${PORT:-8080}"
 
@@ -0,0 +1,34 @@
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from db.duckdb_init import create_views
+
+ROWS_PER_MONTH = 1000
+# Enough columns for DuckDB to cut the EXPLAIN box of a `SELECT *` scan before its estimate
+WIDE_COLUMNS = 40
+
+
+@pytest.fixture
+def parquet_dir(tmp_path):
+    """A small, wide v_statcast: one file each for May and June 2024, with 100 pitchers."""
+    for month in (5, 6):
+        directory = tmp_path / "statcast" / "game_year=2024" / f"game_month={month}"
+        directory.mkdir(parents=True)
+        columns = {
+            "pitcher": pa.array([i % 100 for i in range(ROWS_PER_MONTH)]),
+            "pitch_type": pa.array(["FF", "SL", "CH", "CU"] * (ROWS_PER_MONTH // 4)),
+            "release_speed": pa.array([80.0 + i % 20 for i in range(ROWS_PER_MONTH)]),
+        }
+        columns.update({f"extra_{i}": pa.array([i] * ROWS_PER_MONTH) for i in range(WIDE_COLUMNS)})
+        pq.write_table(pa.table(columns), directory / f"2024-0{month}-01.parquet")
+    return tmp_path
+
+
+@pytest.fixture
+def con(parquet_dir):
+    con = duckdb.connect()
+    create_views(con, parquet_dir)
+    yield con
+    con.close()
@@ -0,0 +1,67 @@
+import json
+import time
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+from api import db_handler
+from api.db_handler import QueryTimeout, open_stream
+
+ROWS = 1_000_000
+QUERY = f"SELECT i FROM range({ROWS}) r(i)"
+
+
+@pytest.fixture(autouse=True)
+def pool(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.duckdb"
+    duckdb.connect(str(db_file)).close()
+    pool = db_handler.ConnectionPool(db_file, 1, 2, "1GB")
+    monkeypatch.setattr(db_handler, "_pool", pool)
+    yield pool
+    pool.close()
+
+
+def slow_read(stream, pause):
+    """Reads the first chunk, then waits like a slow client before reading the rest."""
+    chunks = [next(stream)]
+    time.sleep(pause)
+    return chunks + list(stream)
+
+
+def test_query_timeout_only_covers_first_batch(monkeypatch):
+    monkeypatch.setattr(db_handler, "QUERY_TIMEOUT_SECONDS", 0.2)
+    chunks = slow_read(open_stream(QUERY, batch_rows=100_000), 0.5)
+    lines = b"".join(chunks).splitlines()
+    assert len(lines) == ROWS
+    assert json.loads(lines[-1]) == {"i": ROWS - 1}
+
+
+def test_slow_first_batch_times_out(monkeypatch):
+    monkeypatch.setattr(db_handler, "QUERY_TIMEOUT_SECONDS", 0.2)
+    with pytest.raises(QueryTimeout):
+        open_stream("SELECT COUNT(*) FROM range(1000000000000) a(i) WHERE i % 7 = 3")
+
+
+def test_stream_timeout_ends_ndjson_with_error_line(monkeypatch):
+    monkeypatch.setattr(db_handler, "STREAM_TIMEOUT_SECONDS", 0.3)
+    chunks = slow_read(open_stream(QUERY, batch_rows=1000), 0.6)
+    lines = b"".join(chunks).splitlines()
+    assert len(lines) < ROWS
+    assert json.loads(lines[-1]) == {"error": "The stream was cancelled after 0.3s."}
+
+
+def test_stream_timeout_ends_arrow_with_error_metadata(monkeypatch):
+    monkeypatch.setattr(db_handler, "STREAM_TIMEOUT_SECONDS", 0.3)
+    chunks = slow_read(open_stream(QUERY, "arrow", batch_rows=1000), 0.6)
+    reader = pa.ipc.open_stream(b"".join(chunks))
+    batches = []
+    while True:
+        try:
+            batches.append(reader.read_next_batch_with_custom_metadata())
+        except StopIteration:
+            break
+    last, metadata = batches[-1]
+    assert last.num_rows == 0
+    assert metadata[b"error"] == b"The stream was cancelled after 0.3s."
+    assert all(md is None for _, md in batches[:-1])
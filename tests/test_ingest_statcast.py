@@ -0,0 +1,100 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import build_pool, simulate_day
+from etl import ingest_statcast
+from etl.ingest_statcast import LocalStore, R2Store, ingest
+from etl.statcast_layout import day_key
+
+DAYS = [dt.date(2024, 5, 1) + dt.timedelta(days=i) for i in range(4)]
+SEED = 7
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ingest_statcast, "RETRY_BACKOFF_SECONDS", 0)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    return build_pool(SEED, DAYS)
+
+
+class Fetcher:
+    """One game a day of synthetic pitches, failing or empty on the given dates."""
+
+    def __init__(self, pool, failing=(), empty=()):
+        self.pool, self.failing, self.empty = pool, set(failing), set(empty)
+        self.fetched = []
+
+    def __call__(self, game_date):
+        self.fetched.append(game_date)
+        if game_date in self.failing:
+            raise ConnectionError("Savant is down")
+        if game_date in self.empty:
+            return pd.DataFrame()
+        return simulate_day(self.pool, game_date, SEED, games=1)
+
+
+def day_file(base_dir, game_date):
+    return base_dir / day_key(game_date)
+
+
+def test_failed_day_below_the_watermark_is_retried(tmp_path, pool):
+    store = LocalStore(tmp_path)
+    first = ingest(Fetcher(pool, failing=[DAYS[1]]), store, DAYS[0], DAYS[-1], workers=2)
+    assert first["failed"] == [DAYS[1].isoformat()]
+    assert first["watermark"] == DAYS[-1].isoformat()
+
+    fetcher = Fetcher(pool)
+    second = ingest(fetcher, store, end=DAYS[-1], workers=2)
+    assert fetcher.fetched == [DAYS[1]]
+    assert second["ingested"] == [DAYS[1].isoformat()]
+    assert day_file(tmp_path, DAYS[1]).exists()
+
+
+def test_failed_write_leaves_the_day_missing(tmp_path, pool):
+    class FailingStore(LocalStore):
+        def write_day(self, game_date, df, prefix=ingest_statcast.STATCAST_PREFIX):
+            if game_date == DAYS[2]:
+                raise OSError("disk full")
+            super().write_day(game_date, df, prefix)
+
+    summary = ingest(Fetcher(pool), FailingStore(tmp_path), DAYS[0], DAYS[-1], workers=2)
+    assert summary["failed"] == [DAYS[2].isoformat()]
+    assert DAYS[2].isoformat() not in LocalStore(tmp_path).read_manifest()["dates"]
+
+
+def test_r2_upload_errors_propagate(monkeypatch, pool):
+    import utils.r2_uploader
+
+    def upload(*args, **kwargs):
+        raise ConnectionError("R2 is down")
+    monkeypatch.setattr(utils.r2_uploader, "upload_parquet_to_r2", upload)
+    with pytest.raises(ConnectionError):
+        R2Store().write_day(DAYS[0], simulate_day(pool, DAYS[0], SEED, games=1))
+
+
+def test_empty_refetch_keeps_the_stored_day(tmp_path, pool):
+    store = LocalStore(tmp_path)
+    ingest(Fetcher(pool), store, DAYS[0], DAYS[0])
+    stored = day_file(tmp_path, DAYS[0]).read_bytes()
+    rows = store.read_manifest()["dates"][DAYS[0].isoformat()]["rows"]
+
+    summary = ingest(Fetcher(pool, empty=[DAYS[0]]), store, force=[DAYS[0]], end=DAYS[0])
+    assert summary["kept"] == [DAYS[0].isoformat()]
+    assert day_file(tmp_path, DAYS[0]).read_bytes() == stored
+    assert store.read_manifest()["dates"][DAYS[0].isoformat()]["rows"] == rows
+
+
+def test_empty_day_is_recorded_as_an_off_day(tmp_path, pool):
+    store = LocalStore(tmp_path)
+    ingest(Fetcher(pool, empty=[DAYS[1]]), store, DAYS[0], DAYS[2])
+    assert store.read_manifest()["dates"][DAYS[1].isoformat()]["rows"] == 0
+    assert not day_file(tmp_path, DAYS[1]).exists()
+
+    fetcher = Fetcher(pool)
+    ingest(fetcher, store, end=DAYS[2])
+    assert fetcher.fetched == []
@@ -0,0 +1,75 @@
+import asyncio
+
+import pyarrow as pa
+import pytest
+
+from api import main
+from api.main import render_result, verified_route
+from api.query_router import QueryRouter, RoutedQuery
+from api.serializers import RESULT_FORMATS
+from api.sql_guard import GuardedQuery, QueryRejected
+
+ORIGINAL = "SELECT pitch_type, COUNT(*) AS n FROM v_statcast GROUP BY pitch_type"
+ROLLUP = "SELECT pitch_type, SUM(pitch_count) AS n FROM rollup_pitch_type GROUP BY pitch_type"
+
+
+@pytest.mark.parametrize("fmt", RESULT_FORMATS)
+def test_every_format_carries_x_served_by(fmt):
+    table = pa.table({"pitch_type": ["FF", "SL"], "avg_speed": [95.1, 86.4]})
+    response = render_result("SELECT 1", table, fmt, {"served_by": "template:player_metric"})
+    assert response.headers["X-Served-By"] == "template:player_metric"
+
+
+class FakeGuard:
+    """Rejects the statements in `rejected` and adds a LIMIT of `row_limit` to the others."""
+
+    def __init__(self, rejected=(), row_limit=100):
+        self.rejected, self.row_limit = set(rejected), row_limit
+
+    def check(self, con, sql, add_row_limit=True):
+        if sql in self.rejected:
+            raise QueryRejected("over budget")
+        return GuardedQuery(f"{sql} LIMIT {self.row_limit}", 0, 0, self.row_limit, False)
+
+    async def acquire(self, query):
+        return lambda: None
+
+
+@pytest.fixture
+def verifying(monkeypatch):
+    """Verify mode, with ORIGINAL routed to ROLLUP; returns the statements `execute_arrow` ran."""
+    router = QueryRouter(version=lambda: "1", verify=True)
+    monkeypatch.setattr(router, "route", lambda sql: RoutedQuery(ROLLUP, "rollup_pitch_type"))
+    monkeypatch.setattr(main, "query_router", router)
+    monkeypatch.setattr(main, "run_with_cursor", lambda fn, *args: fn(None, *args))
+    executed = []
+
+    def execute_arrow(sql):
+        executed.append(sql)
+        return pa.table({"pitch_type": ["FF", "SL"], "n": [2, 1]})
+
+    monkeypatch.setattr(main, "execute_arrow", execute_arrow)
+    return executed
+
+
+def test_verification_runs_guarded_statements(verifying, monkeypatch):
+    monkeypatch.setattr(main, "sql_guard", FakeGuard())
+    routed = asyncio.run(verified_route(ORIGINAL))
+    assert routed == RoutedQuery(ROLLUP, "rollup_pitch_type")
+    assert verifying == [f"{ORIGINAL} LIMIT 100", f"{ROLLUP} LIMIT 100"]
+    assert main.query_router.verified == 1
+
+
+def test_verification_is_skipped_when_the_guard_rejects_the_original(verifying, monkeypatch):
+    monkeypatch.setattr(main, "sql_guard", FakeGuard(rejected={ORIGINAL}))
+    routed = asyncio.run(verified_route(ORIGINAL))
+    assert routed.rollup == "rollup_pitch_type"
+    assert verifying == []
+    assert main.query_router.verified == 0
+
+
+def test_verification_is_skipped_when_the_original_reaches_the_row_limit(verifying, monkeypatch):
+    monkeypatch.setattr(main, "sql_guard", FakeGuard(row_limit=2))
+    routed = asyncio.run(verified_route(ORIGINAL))
+    assert routed.rollup == "rollup_pitch_type"
+    assert main.query_router.verified == 0
@@ -0,0 +1,43 @@
+import duckdb
+import pytest
+
+from api.pagination import is_ordered, page_sql
+
+GROUPS = 5000
+GROUP_BY = "SELECT g, COUNT(*) AS n, SUM(v) AS total FROM pitches GROUP BY g"
+
+
+@pytest.fixture(scope="module")
+def con():
+    con = duckdb.connect(config={"threads": 4})
+    con.execute(f"CREATE TABLE pitches AS SELECT i % {GROUPS} AS g, i AS v FROM range(2000000) r(i)")
+    yield con
+    con.close()
+
+
+def pages(con, sql, page_size):
+    offset = 0
+    while True:
+        rows = con.execute(page_sql(sql, offset, page_size)).fetchall()
+        yield rows[:page_size]
+        if len(rows) <= page_size:
+            return
+        offset += page_size
+
+
+def test_group_by_pages_cover_every_group_once(con):
+    seen = [row[0] for page in pages(con, GROUP_BY, 700) for row in page]
+    assert len(seen) == GROUPS
+    assert set(seen) == set(range(GROUPS))
+
+
+def test_same_page_every_time(con):
+    sql = page_sql(GROUP_BY, 100, 50)
+    assert len({tuple(con.execute(sql).fetchall()) for _ in range(8)}) == 1
+
+
+def test_statement_order_is_kept(con):
+    sql = f"{GROUP_BY} ORDER BY g DESC"
+    assert is_ordered(sql)
+    assert "ORDER BY ALL" not in page_sql(sql, 0, 10)
+    assert [row[0] for row in con.execute(page_sql(sql, 0, 3)).fetchall()] == [GROUPS - 1, GROUPS - 2, GROUPS - 3, GROUPS - 4]
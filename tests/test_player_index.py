@@ -0,0 +1,59 @@
+import pytest
+
+from api.player_index import Player, PlayerIndex
+
+JUDGE = Player(592450, "Aaron", "Judge", 2016, 2024)
+OHTANI = Player(660271, "Shohei", "Ohtani", 2018, 2024)
+JOSE_RAMIREZ = Player(608070, "José", "Ramírez", 2013, 2024)
+HAROLD_RAMIREZ = Player(623912, "Harold", "Ramírez", 2019, 2024)
+MANNY_RAMIREZ = Player(120903, "Manny", "Ramírez", 1993, 2011)
+DE_LA_CRUZ = Player(682829, "Elly", "De La Cruz", 2023, 2024)
+# A minor leaguer with the same surname: no Lahman debut
+MINOR_JUDGE = Player(999001, "Aaron", "Judge", None, None)
+TREVOR_MAY = Player(571948, "Trevor", "May", 2014, 2023)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PlayerIndex([JUDGE, OHTANI, JOSE_RAMIREZ, HAROLD_RAMIREZ, MANNY_RAMIREZ, DE_LA_CRUZ, MINOR_JUDGE, TREVOR_MAY])
+
+
+def found(index, text):
+    return [(m.player.mlbam_id, m.match_type) for m in index.find_in_text(text)]
+
+
+def test_exact_name(index):
+    assert found(index, "Aaron Judge home runs in 2024")[0] == (JUDGE.mlbam_id, "exact")
+
+
+def test_accent_folded_name(index):
+    assert found(index, "jose ramirez stolen bases") == [(JOSE_RAMIREZ.mlbam_id, "folded")]
+    assert [m.player for m in index.resolve("Ramirez, Jose")] == [JOSE_RAMIREZ]
+
+
+def test_fuzzy_name(index):
+    assert found(index, "Aron Judge exit velocity")[0] == (JUDGE.mlbam_id, "fuzzy")
+    assert found(index, "Shohei Otani strikeouts") == [(OHTANI.mlbam_id, "fuzzy")]
+
+
+def test_fuzzy_needs_a_capitalized_span(index):
+    assert found(index, "aron judge exit velocity") == []
+
+
+@pytest.mark.parametrize("question, player", [
+    ("Ohtani's exit velocity", OHTANI),
+    ("Judge home runs", JUDGE),
+    ("Strikeouts by De La Cruz's teammates", DE_LA_CRUZ),
+])
+def test_surname_alone(index, question, player):
+    assert found(index, question) == [(player.mlbam_id, "surname")]
+
+
+def test_ambiguous_surname_resolves_nothing(index):
+    # Two Ramírezes played in 2024
+    assert found(index, "Ramirez batting average") == []
+
+
+def test_lowercase_or_question_words_are_not_surnames(index):
+    assert found(index, "how did the judge rule") == []
+    assert found(index, "Strikeouts In May 2024") == []
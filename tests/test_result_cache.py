@@ -0,0 +1,17 @@
+import pyarrow as pa
+
+from api.result_cache import ResultCache
+
+
+def test_entries_are_sized_by_arrow_buffers():
+    cache = ResultCache(version_check_interval=3600)
+    table = pa.table({"release_speed": [95.0] * 1000})
+    assert cache.get_or_compute("SELECT 1", lambda: table) is table
+    assert cache.stats()["bytes"] == table.nbytes
+
+
+def test_results_over_the_entry_budget_are_not_kept():
+    table = pa.table({"release_speed": [95.0] * 1000})
+    cache = ResultCache(max_entry_bytes=table.nbytes - 1, version_check_interval=3600)
+    cache.get_or_compute("SELECT 1", lambda: table)
+    assert cache.stats()["entries"] == 0
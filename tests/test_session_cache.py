@@ -0,0 +1,106 @@
+import pytest
+
+from api.session_cache import SessionCache, filtered_scan
+from api.sql_guard import QueryRejected, SqlGuard
+from tests.conftest import ROWS_PER_MONTH
+
+PREVIOUS = "SELECT pitch_type, AVG(release_speed) FROM v_statcast WHERE pitcher = 7 GROUP BY pitch_type"
+FOLLOW_UP = "SELECT pitch_type, MAX(release_speed) FROM v_statcast WHERE pitcher = 7 GROUP BY pitch_type ORDER BY 1"
+
+
+@pytest.fixture
+def executed(con):
+    """Every statement the cache runs, and a cache that runs them on `con`."""
+    statements = []
+
+    def execute(sql):
+        statements.append(sql)
+        return con.execute(sql).arrow()
+    return statements, execute
+
+
+def run_scoped(con, scoped):
+    for name, table in scoped.tables.items():
+        con.register(name, table)
+    return con.execute(scoped.sql).fetchall()
+
+
+def test_follow_up_reads_the_row_set_and_matches_the_view(con, executed):
+    statements, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    scoped = cache.prepare(FOLLOW_UP, PREVIOUS)
+    assert scoped.row_set is not None
+    assert run_scoped(con, scoped) == con.execute(FOLLOW_UP).fetchall()
+    assert len(statements) == 1
+
+
+def test_row_set_has_only_the_columns_the_follow_up_reads(con, executed):
+    _, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    scoped = cache.prepare(FOLLOW_UP, PREVIOUS)
+    assert sorted(scoped.tables[scoped.row_set].column_names) == ["pitch_type", "pitcher", "release_speed"]
+
+
+def test_follow_up_reading_other_columns_builds_a_new_row_set(con, executed):
+    statements, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    first = cache.prepare(FOLLOW_UP, PREVIOUS)
+    wider = "SELECT pitch_type, AVG(extra_3) FROM v_statcast WHERE pitcher = 7 GROUP BY pitch_type ORDER BY 1"
+    assert cache.build_sql(wider, PREVIOUS) is not None
+    second = cache.prepare(wider, PREVIOUS)
+    assert second.row_set not in (None, first.row_set)
+    assert run_scoped(con, second) == con.execute(wider).fetchall()
+    assert len(statements) == 2
+
+
+def test_select_star_follow_up_fetches_every_column(executed):
+    _, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    build_sql = cache.build_sql("SELECT * FROM v_statcast WHERE pitcher = 7 AND pitch_type = 'FF'", PREVIOUS)
+    assert build_sql.startswith("SELECT * FROM v_statcast WHERE")
+
+
+def test_build_sql_is_none_once_a_row_set_covers_the_statement(executed):
+    _, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    cache.prepare(FOLLOW_UP, PREVIOUS)
+    assert cache.build_sql(FOLLOW_UP, PREVIOUS) is None
+    assert cache.prepare(FOLLOW_UP).row_set is not None
+
+
+def test_follow_up_dropping_a_predicate_builds_nothing(executed):
+    statements, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    broader = "SELECT pitch_type, COUNT(*) FROM v_statcast GROUP BY pitch_type"
+    assert cache.build_sql(broader, PREVIOUS) is None
+    assert cache.prepare(broader, PREVIOUS).row_set is None
+    assert statements == []
+
+
+def test_materialization_is_capped_at_max_rows(executed):
+    statements, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True, max_rows=10)
+    assert cache.prepare(FOLLOW_UP, PREVIOUS).row_set is None
+    assert statements[0].endswith("LIMIT 11")
+    assert cache.stats()["too_large"] == 1
+    # The filter is remembered as too large and not fetched again
+    assert cache.build_sql(FOLLOW_UP, PREVIOUS) is None
+    cache.prepare(FOLLOW_UP, PREVIOUS)
+    assert len(statements) == 1
+
+
+def test_materialization_query_is_costed_without_its_row_cap(con, parquet_dir, executed):
+    _, execute = executed
+    cache = SessionCache(version=lambda: "v1", execute=execute, enabled=True)
+    build_sql = cache.build_sql(FOLLOW_UP, PREVIOUS)
+    guard = SqlGuard(version=lambda: "v1", enabled=True, parquet_dir=parquet_dir, heavy_scan_rows=ROWS_PER_MONTH)
+    assert guard.check(con, build_sql, False).heavy
+    with pytest.raises(QueryRejected):
+        SqlGuard(version=lambda: "v1", enabled=True, parquet_dir=parquet_dir,
+                 max_scan_rows=ROWS_PER_MONTH).check(con, build_sql, False)
+
+
+def test_filtered_scan_collects_referenced_columns():
+    scan = filtered_scan("SELECT a.pitch_type, COUNT(*) FROM v_statcast a WHERE a.pitcher = 7 GROUP BY 1")
+    assert {"pitch_type", "pitcher"} <= scan.columns
+    assert filtered_scan("SELECT * FROM v_statcast WHERE pitcher = 7").columns is None
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.pagination import page_sql
+from api.sql_guard import QueryRejected, SqlGuard, plan_operators
+from tests.conftest import ROWS_PER_MONTH
+
+
+def make_guard(parquet_dir, **limits) -> SqlGuard:
+    options = {"max_scan_rows": 10 * ROWS_PER_MONTH, "max_join_rows": 10 * ROWS_PER_MONTH,
+               "heavy_scan_rows": ROWS_PER_MONTH, **limits}
+    return SqlGuard(version=lambda: "test", enabled=True, parquet_dir=parquet_dir, **options)
+
+
+def test_narrow_scan_uses_the_plan_estimate(con, parquet_dir):
+    guarded = make_guard(parquet_dir).check(con, "SELECT pitcher, release_speed FROM v_statcast ORDER BY release_speed")
+    assert guarded.scanned_rows == 2 * ROWS_PER_MONTH
+    assert guarded.heavy
+
+
+def test_wide_select_star_plan_has_no_estimate(con):
+    plan = "\n".join(row[1] for row in con.execute("EXPLAIN SELECT * FROM v_statcast ORDER BY release_speed DESC").fetchall())
+    scans = [op for op in plan_operators(plan) if op.name == "READ_PARQUET"]
+    assert scans and scans[0].cardinality is None
+
+
+def test_wide_select_star_counts_every_row(con, parquet_dir):
+    guarded = make_guard(parquet_dir).check(con, "SELECT * FROM v_statcast ORDER BY release_speed DESC")
+    assert guarded.scanned_rows == 2 * ROWS_PER_MONTH
+    assert guarded.files == 2
+    assert guarded.heavy
+
+
+def test_wide_select_star_prunes_partitions(con, parquet_dir):
+    guarded = make_guard(parquet_dir).check(con, "SELECT * FROM v_statcast WHERE game_month = 6 ORDER BY release_speed")
+    assert guarded.scanned_rows == ROWS_PER_MONTH
+    assert guarded.files == 1
+
+
+def test_wide_select_star_over_budget_is_rejected(con, parquet_dir):
+    with pytest.raises(QueryRejected):
+        make_guard(parquet_dir, max_scan_rows=ROWS_PER_MONTH).check(con, "SELECT * FROM v_statcast ORDER BY release_speed")
+
+
+def test_wide_select_star_with_limit_stops_early(con, parquet_dir):
+    guarded = make_guard(parquet_dir, max_scan_rows=ROWS_PER_MONTH).check(con, "SELECT * FROM v_statcast")
+    assert guarded.row_limit is not None
+    assert not guarded.heavy
+
+
+@pytest.mark.parametrize("add_row_limit", [True, False])
+def test_wide_cross_join_is_rejected(con, parquet_dir, add_row_limit):
+    # add_row_limit=False is how streamed queries are checked
+    with pytest.raises(QueryRejected, match="joins without an equality condition"):
+        make_guard(parquet_dir).check(con, "SELECT * FROM v_statcast a, v_statcast b", add_row_limit)
+
+
+def test_narrow_cross_join_is_rejected(con, parquet_dir):
+    with pytest.raises(QueryRejected, match="joins without an equality condition"):
+        make_guard(parquet_dir).check(con, "SELECT a.pitcher, b.pitcher FROM v_statcast a, v_statcast b", False)
+
+
+def test_page_query_is_not_capped(con, parquet_dir):
+    guard = make_guard(parquet_dir, row_limit=10)
+    guarded = guard.check(con, page_sql("SELECT pitcher FROM v_statcast ORDER BY pitcher", 1500, 100))
+    assert guarded.row_limit is None
+    assert len(con.execute(guarded.sql).fetchall()) == 101
+
+
+def test_counters_add_up_under_concurrent_checks(con, parquet_dir):
+    guard = make_guard(parquet_dir)
+    sql = "SELECT pitcher FROM v_statcast WHERE pitcher = 1"
+    guard.check(con, sql)
+
+    def check_many(_):
+        cursor = con.cursor()
+        for _ in range(500):
+            guard.check(cursor, sql)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(check_many, range(8)))
+    assert guard.stats()["checked"] == 1 + 8 * 500
+    assert guard.stats()["limited"] == 1 + 8 * 500
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+
+from api import sql_generator
+from api.translation_cache import TranslationCache, make_key, normalize_question
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Pitchers below -10 run value", "Pitchers below 10 run value"),
+    ("Who threw 100.5 mph?", "Who threw 100 5 mph?"),
+    ("Batters over 40% whiff rate", "Batters over 40 whiff rate"),
+    ("Fastballs at 95+ mph", "Fastballs at 95 mph"),
+    ("Games on 5/1", "Games on 51"),
+    ("OPS in 2023-24", "OPS in 2023 24"),
+])
+def test_numbers_keep_their_meaning(first, second):
+    assert make_key(first, None, "p") != make_key(second, None, "p")
+
+
+@pytest.mark.parametrize("first, second", [
+    ("What's Ohtani's average exit velocity?", "what s ohtani s average exit velocity"),
+    ("Left-handed hitters!", "left handed hitters"),
+    ("Velocity over 95.", "velocity over 95"),
+    ("Run value below −10", "run value below -10"),
+    ("  Spin   rate\tby pitch type ", "spin rate by pitch type"),
+])
+def test_wording_differences_share_a_key(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+def test_cached_translation_is_returned_for_the_same_question(tmp_path):
+    cache = TranslationCache("p", db_path=tmp_path / "cache.sqlite")
+    cache.set("Below -10 run value", None, "SELECT 1")
+    assert cache.get("below -10 run value?", None) == "SELECT 1"
+    assert cache.get("below 10 run value", None) is None
+    cache.close()
+
+
+def test_translate_reads_the_cache_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class Cache:
+        def get(self, question, previous_sql):
+            threads.append(threading.current_thread())
+            return "SELECT 1"
+    monkeypatch.setattr(sql_generator, "get_translation_cache", lambda: Cache())
+
+    async def translate():
+        return threading.current_thread(), await sql_generator.translate("and by month?", "SELECT 0")
+    loop_thread, translation = asyncio.run(translate())
+    assert translation.served_by == "cache"
+    assert threads and threads[0] is not loop_thread
@@ -1,7 +1,13 @@
 import os
-import boto3
+import base64
+import hashlib
+import threading
+import time
 import pandas as pd
-from io import BytesIO
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable
 from dotenv import load_dotenv
 import logging
 
@@ -13,48 +19,286 @@ ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID")
 SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
 BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
 
-# The R2 endpoint URL is specific to your account ID
-ENDPOINT_URL = f"https://{ACCOUNT_ID}.r2.cloudflarestorage.com"
+# The R2 endpoint URL is specific to your account ID. R2_ENDPOINT_URL points the client at any
+# other S3-compatible store instead, e.g. `python -m benchmarks.stub_s3` for offline runs.
+ENDPOINT_URL = os.getenv("R2_ENDPOINT_URL") or f"https://{ACCOUNT_ID}.r2.cloudflarestorage.com"
 
-# Setup the S3 client for R2
-s3_client = boto3.client(
-    service_name='s3',
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=ACCESS_KEY_ID,
-    aws_secret_access_key=SECRET_ACCESS_KEY,
-    region_name='auto',
-)
+# HTTP connections kept by the shared client; covers concurrent part uploads and mirror downloads
+R2_MAX_CONNECTIONS = int(os.getenv("R2_MAX_CONNECTIONS", "16"))
+# Multipart uploads: part size (S3 requires at least 5 MB for all but the last part),
+# parts uploading at once, and attempts per part
+R2_PART_MB = float(os.getenv("R2_PART_MB", "16"))
+R2_UPLOAD_CONCURRENCY = int(os.getenv("R2_UPLOAD_CONCURRENCY", "4"))
+R2_PART_RETRIES = 3
+MIN_PART_SIZE = 5 * 1024 * 1024
+# pyarrow's default, used when no row_group_size is given
+DEFAULT_ROW_GROUP_SIZE = 1024 * 1024
 
-def upload_df_to_r2(df: pd.DataFrame, object_name: str):
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Returns the S3 client for R2, built on first use and shared by all threads.
+    boto3 is only imported then, so importing this module stays cheap.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import boto3
+                from botocore.config import Config
+                _client = boto3.client(
+                    service_name='s3',
+                    endpoint_url=ENDPOINT_URL,
+                    aws_access_key_id=ACCESS_KEY_ID,
+                    aws_secret_access_key=SECRET_ACCESS_KEY,
+                    region_name='auto',
+                    config=Config(max_pool_connections=R2_MAX_CONNECTIONS, retries={"mode": "standard"}),
+                )
+    return _client
+
+
+def _content_md5(data: bytes) -> tuple[str, str]:
+    """Returns the MD5 of `data` as hex (what S3 reports as the ETag) and base64 (the Content-MD5 header)."""
+    digest = hashlib.md5(data, usedforsecurity=False).digest()
+    return digest.hex(), base64.b64encode(digest).decode("ascii")
+
+
+class MultipartUploadStream:
+    """
+    A write-only file object that uploads to R2 as it is written.
+
+    Writes are buffered into parts of `part_size` bytes, which are uploaded on a thread pool
+    while writing continues. At most `max_in_flight` parts are held in memory: a write that
+    would fill another part waits for one to finish. Each part is sent with its Content-MD5,
+    checked against the returned ETag and retried on its own. If the stream ends within the
+    first part, it is sent as a single PUT instead.
+    """
+
+    def __init__(self, object_name: str, part_size: int = int(R2_PART_MB * 1024 * 1024),
+                 max_in_flight: int = R2_UPLOAD_CONCURRENCY, bucket: str | None = None):
+        self.object_name = object_name
+        self.bucket = bucket or BUCKET_NAME
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.client = get_s3_client()
+        self.upload_id = None
+        self.closed = False
+        self._buffer = bytearray()
+        self._position = 0
+        self._parts: list[Future] = []
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="r2-part")
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit(part)
+        return len(data)
+
+    def _submit(self, part: bytes):
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.object_name)
+            self.upload_id = response["UploadId"]
+        failed = next((f for f in self._parts if f.done() and f.exception()), None)
+        if failed is not None:
+            raise failed.exception()
+        self._slots.acquire()  # Bounds the parts held in memory
+        future = self._pool.submit(self._upload_part, len(self._parts) + 1, part)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._parts.append(future)
+
+    def _upload_part(self, number: int, part: bytes) -> dict:
+        md5_hex, md5_b64 = _content_md5(part)
+        for attempt in range(1, R2_PART_RETRIES + 1):
+            try:
+                response = self.client.upload_part(
+                    Bucket=self.bucket, Key=self.object_name, UploadId=self.upload_id,
+                    PartNumber=number, Body=part, ContentMD5=md5_b64,
+                )
+                etag = response["ETag"].strip('"')
+                if etag != md5_hex:
+                    raise IOError(f"ETag {etag} of part {number} does not match its MD5 {md5_hex}")
+                return {"PartNumber": number, "ETag": response["ETag"], "md5": md5_hex}
+            except Exception as e:
+                if attempt == R2_PART_RETRIES:
+                    raise
+                logging.warning(f"Upload of part {number} of {self.object_name} failed (attempt {attempt}): {e}")
+                time.sleep(2 ** attempt)
+
+    def close(self):
+        """Uploads what is left and completes the upload; aborts it if any part failed."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.upload_id is None:
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                md5_hex, md5_b64 = _content_md5(data)
+                self.client.put_object(Bucket=self.bucket, Key=self.object_name, Body=data, ContentMD5=md5_b64)
+                return
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            parts = [future.result() for future in self._parts]
+            response = self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.object_name, UploadId=self.upload_id,
+                MultipartUpload={"Parts": [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in parts]},
+            )
+            expected = hashlib.md5(b"".join(bytes.fromhex(p["md5"]) for p in parts), usedforsecurity=False).hexdigest()
+            if response.get("ETag", "").strip('"') != f"{expected}-{len(parts)}":
+                logging.warning(f"ETag of {self.object_name} is {response.get('ETag')}, expected \"{expected}-{len(parts)}\".")
+            logging.info(f"Uploaded {self.object_name} in {len(parts)} parts ({self._position / 1e6:.1f} MB).")
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def abort(self):
+        """Cancels the upload so no orphaned parts are billed. The object is left as it was."""
+        self.closed = True
+        for future in self._parts:
+            future.cancel()
+        self._pool.shutdown(wait=True)
+        if self.upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.object_name, UploadId=self.upload_id)
+            except Exception as e:
+                logging.warning(f"Could not abort the upload of {self.object_name}: {e}")
+            self.upload_id = None
+
+
+def _as_tables(data, schema: pa.Schema | None) -> Iterable[pa.Table]:
+    """Yields Arrow tables from a DataFrame, Arrow table or batch, or an iterable of any of them."""
+    if isinstance(data, (pd.DataFrame, pa.Table, pa.RecordBatch)):
+        data = [data]
+    for chunk in data:
+        if isinstance(chunk, pd.DataFrame):
+            yield pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        elif isinstance(chunk, pa.RecordBatch):
+            yield pa.Table.from_batches([chunk])
+        else:
+            yield chunk
+
+
+def upload_parquet_to_r2(data, object_name: str, schema: pa.Schema | None = None, **parquet_kwargs) -> int:
+    """
+    Writes Parquet row groups straight into a multipart upload, so neither the whole file nor
+    a second copy of it is held in memory.
+
+    Args:
+        data: A DataFrame, an Arrow table or record batch, or an iterable of any of them
+            (e.g. `pd.read_csv(..., chunksize=...)` or a `pyarrow.dataset` scanner's batches).
+        object_name: The key in the R2 bucket.
+        schema: Schema of the file; by default the first chunk's. Later DataFrame chunks are
+            converted to it.
+        **parquet_kwargs: `row_group_size` (chunks are combined up to it); the rest (e.g.
+            compression) for `pyarrow.parquet.ParquetWriter`.
+
+    Returns:
+        The number of rows written. Nothing is uploaded when there are none.
+    """
+    row_group_size = parquet_kwargs.pop("row_group_size", None) or DEFAULT_ROW_GROUP_SIZE
+    stream, writer, rows = None, None, 0
+    # Small chunks are collected into full row groups, so e.g. per-day batches do not each become one
+    pending, pending_rows = [], 0
+    try:
+        for table in _as_tables(data, schema):
+            if writer is None:
+                if schema is None:
+                    schema = table.schema
+                stream = MultipartUploadStream(object_name)
+                writer = pq.ParquetWriter(stream, schema, **parquet_kwargs)
+            elif table.schema != schema:
+                table = table.cast(schema)
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows >= row_group_size:
+                writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+                rows += pending_rows
+                pending, pending_rows = [], 0
+        if writer is None:
+            return 0
+        if pending_rows:
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+            rows += pending_rows
+        writer.close()
+        if rows == 0:
+            stream.abort()
+            return 0
+        stream.close()
+        return rows
+    except Exception:
+        if stream is not None:
+            stream.abort()
+        raise
+
+
+def upload_df_to_r2(df: pd.DataFrame, object_name: str, **parquet_kwargs):
     """
-    Converts a pandas DataFrame to a Parquet file in memory and uploads it to R2.
+    Converts a pandas DataFrame to a Parquet file and streams it to R2.
 
     Args:
-        df: The pandas DataFrame to upload.
+        df: The pandas DataFrame to upload, or an iterable of DataFrames or Arrow record batches.
         object_name: The desired filename/key in the R2 bucket (e.g., 'statcast.parquet').
+        **parquet_kwargs: Parquet options (e.g. compression, row_group_size).
     """
-    if df.empty:
+    if isinstance(df, pd.DataFrame) and df.empty:
         logging.warning(f"DataFrame is empty. Skipping upload for {object_name}.")
         return
 
     logging.info(f"Preparing to upload '{object_name}' to R2 bucket '{BUCKET_NAME}'...")
     try:
-        # Create an in-memory buffer
-        parquet_buffer = BytesIO()
-        
-        # Write the DataFrame to the in-memory buffer as a Parquet file
-        df.to_parquet(parquet_buffer, index=False)
-        
-        # Reset the buffer's cursor to the beginning
-        parquet_buffer.seek(0)
-        
-        # Upload the in-memory file to R2
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=object_name,
-            Body=parquet_buffer.read()
-        )
-        logging.info(f"Successfully uploaded {object_name} to R2.")
-    
+        rows = upload_parquet_to_r2(df, object_name, **parquet_kwargs)
+        if rows:
+            logging.info(f"Successfully uploaded {object_name} to R2.")
+        else:
+            logging.warning(f"No rows to upload. Skipping upload for {object_name}.")
+
     except Exception as e:
-        logging.error(f"Failed to upload {object_name} to R2: {e}")
\ No newline at end of file
+        logging.error(f"Failed to upload {object_name} to R2: {e}")
+
+
+def upload_bytes_to_r2(data: bytes, object_name: str):
+    """Uploads raw bytes (e.g. a JSON manifest) to R2 under `object_name`."""
+    _, md5_b64 = _content_md5(data)
+    get_s3_client().put_object(Bucket=BUCKET_NAME, Key=object_name, Body=data, ContentMD5=md5_b64)
+
+
+def download_bytes_from_r2(object_name: str) -> bytes | None:
+    """Downloads an object from R2, or returns None if it does not exist."""
+    client = get_s3_client()
+    try:
+        response = client.get_object(Bucket=BUCKET_NAME, Key=object_name)
+    except client.exceptions.NoSuchKey:
+        return None
+    return response["Body"].read()
+
+
+def list_r2_objects(prefix: str = "") -> list[dict]:
+    """Lists every object in the bucket that starts with `prefix`, with its Key, ETag, Size and LastModified."""
+    objects = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix):
+        objects.extend(page.get("Contents", []))
+    return objects
+
+
+def list_r2_keys(prefix: str) -> list[str]:
+    """Lists every object key in the bucket that starts with `prefix`."""
+    return [obj["Key"] for obj in list_r2_objects(prefix)]